@@ -5,7 +5,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory
 from flask_cors import CORS
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO
 from src.models.user import db, User, bcrypt
 from src.models.client import Client
 from src.models.service_type import ServiceType
@@ -28,6 +28,17 @@ from src.routes.debug_logs import debug_logs_bp
 from src.utils.global_logging_middleware import global_logging_middleware
 from src.utils.database_logging_hooks import database_logging_hooks
 from src.utils.log_cleanup import log_cleanup_manager
+from src.utils.notification_retention import notification_retention_manager
+from src.utils.sla_analytics import sla_analytics
+from src.utils.olap_snapshot import olap_snapshot
+from src.utils.status_counters import status_counters
+from src.utils.empresa_backfill import empresa_backfill
+from src.utils.schema_migrations import schema_migrations
+from src.utils.reference_cache import reference_cache
+from src.utils.change_tracking import change_tracking, etag_condicional
+from src.utils.notification_store import notification_store
+from src.utils.realtime import realtime_notifier, opcoes_fila
+from src.utils.change_broadcast import change_broadcast
 from werkzeug.security import generate_password_hash
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
@@ -36,8 +47,31 @@ app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 # Habilita CORS para todas as rotas
 CORS(app, supports_credentials=True)
 
+# Fila de mensagens do Socket.IO (ex.: redis://localhost:6379/0, requer o pacote redis;
+# local://teste simula a fila dentro de um processo, para testes).
+# Obrigatória para rodar mais de um processo: o que um processo emite chega aos sockets dos outros,
+# os commits de um processo invalidam os caches dos outros (src.utils.change_broadcast) e a presença
+# (quem está online e dispensa o email de novo chamado) é compartilhada (src.utils.realtime).
+# Sem fila a presença é do próprio processo: rode um único worker, ou todos recebem email
+# (NOTIFICATION_EMAIL_POLICY=todos).
+# Jobs fora do servidor web emitem pela mesma fila (src.utils.realtime.criar_emissor_externo)
+app.config['SOCKETIO_MESSAGE_QUEUE'] = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+app.config['SOCKETIO_CHANNEL'] = os.getenv('SOCKETIO_CHANNEL', 'aurum-socketio')
+app.config['NOTIFICATION_EMAIL_POLICY'] = os.getenv('NOTIFICATION_EMAIL_POLICY', 'offline')
+
+# Transportes aceitos. Com long-polling (padrão) e vários processos o balanceador precisa de
+# sessões fixas (sticky: ip_hash/cookie); só "websocket" dispensa sessões fixas
+app.config['SOCKETIO_TRANSPORTS'] = os.getenv('SOCKETIO_TRANSPORTS', 'polling,websocket').split(',')
+
 # Inicializa SocketIO para notificações em tempo real
-socketio = SocketIO(app, cors_allowed_origins="*", logger=True, engineio_logger=True)
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    logger=True,
+    engineio_logger=True,
+    transports=app.config['SOCKETIO_TRANSPORTS'],
+    **opcoes_fila(app.config['SOCKETIO_MESSAGE_QUEUE'], app.config['SOCKETIO_CHANNEL'])
+)
 
 # Inicializa o bcrypt
 bcrypt.init_app(app)
@@ -65,22 +99,21 @@ app.register_blueprint(debug_logs_bp)
 
 # APIs para os filtros dos relatórios
 @app.route('/helpdesk/dados/empresas')
+@etag_condicional('helpdesk_empresas', 'helpdesk_usuarios')
 def api_dados_empresas():
     from flask import jsonify, session
+    from src.utils.current_user import usuario_atual
     try:
         user_type = session.get('user_type')
-        user_id = session.get('user_id')
         
         if user_type == 'cliente':
             # Clientes só podem ver sua própria empresa
-            usuario_atual = Usuario.query.get(user_id)
-            if usuario_atual and usuario_atual.empresa_id:
-                empresas = [usuario_atual.empresa]
-            else:
-                empresas = []
+            usuario = usuario_atual()
+            empresa = reference_cache.empresa(usuario.empresa_id) if usuario else None
+            empresas = [empresa] if empresa else []
         else:
             # Administradores e técnicos podem ver todas as empresas
-            empresas = Empresa.query.filter_by(ativa=True).all()
+            empresas = reference_cache.empresas_ativas()
         
         resultado = [{
             'id': empresa.id,
@@ -91,6 +124,7 @@ def api_dados_empresas():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/helpdesk/dados/tecnicos')
+@etag_condicional('helpdesk_usuarios')
 def api_dados_tecnicos():
     from flask import jsonify, session
     try:
@@ -98,47 +132,78 @@ def api_dados_tecnicos():
         user_type = session.get('user_type')
         user_id = session.get('user_id')
         
+        # Lista de usuários ativos em cache (por tipo e nome)
+        usuarios = reference_cache.usuarios_ativos()
+        
         if user_type == 'administrador':
             # Administradores podem ver todos os usuários
-            tecnicos = Usuario.query.filter_by(ativo=True).order_by(Usuario.tipo_usuario, Usuario.nome).all()
             resultado = [{
                 'id': tecnico.id,
                 'nome': f"{tecnico.nome} ({tecnico.tipo_usuario.title()})"
-            } for tecnico in tecnicos]
+            } for tecnico in usuarios]
         elif user_type == 'tecnico':
             # Técnicos veem a si mesmos e todos os clientes
-            tecnicos = Usuario.query.filter(
-                Usuario.ativo == True,
-                (Usuario.id == user_id) | (Usuario.tipo_usuario == 'cliente')
-            ).order_by(Usuario.tipo_usuario, Usuario.nome).all()
             resultado = [{
                 'id': tecnico.id,
                 'nome': f"{tecnico.nome} ({tecnico.tipo_usuario.title()})"
-            } for tecnico in tecnicos]
+            } for tecnico in usuarios if tecnico.id == user_id or tecnico.tipo_usuario == 'cliente']
         elif user_type == 'cliente':
             # Clientes veem apenas a si mesmos
-            tecnicos = Usuario.query.filter_by(id=user_id, ativo=True).all()
             resultado = [{
                 'id': tecnico.id,
                 'nome': tecnico.nome
-            } for tecnico in tecnicos]
+            } for tecnico in usuarios if tecnico.id == user_id]
         else:
             # Outros usuários veem apenas técnicos
-            tecnicos = Usuario.query.filter_by(tipo_usuario='tecnico', ativo=True).all()
             resultado = [{
                 'id': tecnico.id,
                 'nome': tecnico.nome
-            } for tecnico in tecnicos]
+            } for tecnico in usuarios if tecnico.tipo_usuario == 'tecnico']
         return jsonify(resultado)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # Database configurations
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# DATABASE_URL troca o banco (ex.: um SQLite temporário nos testes)
+app.config['SQLALCHEMY_DATABASE_URI'] = (os.getenv('DATABASE_URL')
+                                         or f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Limite de chamados listados nos PDFs de relatório (0 = sem limite)
+app.config['PDF_EXPORT_MAX_CHAMADOS'] = int(os.getenv('PDF_EXPORT_MAX_CHAMADOS', '5000')) or None
+
 db.init_app(app)
 
+# Inicializa migrações versionadas de índices (flask migrate-schema / flask explain-queries)
+schema_migrations.init_app(app)
+
+# Inicializa métricas de SLA (cache em memória)
+sla_analytics.init_app(app)
+
+# Inicializa fotografia colunar dos chamados (/relatorio/cubo)
+olap_snapshot.init_app(app)
+
+# Inicializa contadores de chamados por status (atualizados a cada commit)
+status_counters.init_app(app)
+
+# Inicializa cache de usuários/empresas/serviços (invalidado a cada commit)
+reference_cache.init_app(app)
+
+# Inicializa versões por tabela (ETag das respostas JSON de leitura)
+change_tracking.init_app(app)
+
+# Inicializa armazenamento das notificações (NOTIFICATION_STORAGE_MODE: broadcast ou fanout_escrita)
+notification_store.init_app(app)
+
+# Repassa os commits aos outros processos pela fila (SOCKETIO_MESSAGE_QUEUE)
+change_broadcast.init_app(app)
+
+# Inicializa retenção das notificações (flask cleanup-notifications / notification-stats)
+notification_retention_manager.init_app(app)
+
+# Inicializa preenchimento da empresa dos chamados legados (flask backfill-empresa-chamados)
+empresa_backfill.init_app(app)
+
 # Inicializar sistema de limpeza de cache
 cache_cleaner = init_cache_cleaner(app)
 cache_cleaner.start_scheduler()
@@ -146,6 +211,13 @@ cache_cleaner.start_scheduler()
 with app.app_context():
     db.create_all()
     
+    # create_all não cria índices novos em tabelas já existentes: migrações pendentes + ANALYZE
+    schema_migrations.migrar()
+    
+    # Chamados antigos sem empresa herdam a empresa do solicitante
+    if empresa_backfill.config['on_startup']:
+        empresa_backfill.preencher()
+    
     # Cria usuários padrão se não existirem
     if User.query.count() == 0:
         admin = User(username='admin.sistema', profile='administrador')
@@ -273,35 +345,23 @@ def serve(path):
         else:
             return "index.html not found", 404
 
-# WebSocket Events para Notificações em Tempo Real
-@socketio.on('connect')
-def handle_connect():
-    print('Cliente conectado ao WebSocket')
-
-@socketio.on('disconnect')
-def handle_disconnect():
-    print('Cliente desconectado do WebSocket')
-
-@socketio.on('join_notifications')
-def handle_join_notifications(data):
-    """Cliente se registra para receber notificações baseado no tipo de usuário"""
-    user_type = data.get('user_type')
-    if user_type in ['administrador', 'tecnico']:
-        print(f'Usuário {user_type} registrado para notificações')
-
-def emit_new_ticket_notification(ticket_data):
-    """Emite notificação para todos os administradores e técnicos conectados"""
-    socketio.emit('new_ticket', {
-        'message': 'Novo chamado aberto!',
-        'ticket': ticket_data,
-        'timestamp': ticket_data.get('created_at')
-    }, broadcast=True)
-
-# Tornar a função disponível globalmente
-app.emit_new_ticket_notification = emit_new_ticket_notification
+# WebSocket: conexão, salas por usuário e envio de contagens/notificações após commit
+realtime_notifier.init_app(app, socketio)
+
+# Emissor de novos chamados usado pelas rotas (salas role:administrador e role:tecnico)
+app.emit_new_ticket_notification = realtime_notifier.emitir_novo_chamado
 
 if __name__ == '__main__':
-    socketio.run(app, host='0.0.0.0', port=8180, debug=True)
+    # Vários processos: um por porta (PORT), todos com a mesma SOCKETIO_MESSAGE_QUEUE, atrás de
+    # um balanceador com sessões fixas (ou SOCKETIO_TRANSPORTS=websocket)
+    if app.config['SOCKETIO_MESSAGE_QUEUE'] and 'polling' in app.config['SOCKETIO_TRANSPORTS']:
+        print("Socket.IO com fila de mensagens e long-polling: use sessões fixas (sticky) no balanceador")
+    socketio.run(
+        app,
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', '8180')),
+        debug=os.getenv('FLASK_DEBUG', '1') == '1'
+    )
 
 
 
@@ -1,5 +1,6 @@
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import query_expression
 from src.models.user import db
 from src.utils.timezone_utils import get_brazil_time
 
@@ -82,6 +83,10 @@ class Chamado(db.Model):
     # Relacionamentos
     respostas = db.relationship('RespostaChamado', backref='chamado', lazy=True, cascade='all, delete-orphan')
     
+    # Preenchidos pelo perfil de carregamento 'lista' (src/utils/loader_profiles.py)
+    descricao_resumo = query_expression()
+    total_respostas = query_expression()
+    
     def __repr__(self):
         return f'<Chamado {self.titulo}>'
 
@@ -121,4 +126,87 @@ class Notificacao(db.Model):
     chamado = db.relationship('Chamado', backref='notificacoes')
     
     def __repr__(self):
-        return f'<Notificacao {self.titulo} para Usuario {self.usuario_id}>'
\ No newline at end of file
+        return f'<Notificacao {self.titulo} para Usuario {self.usuario_id}>'
+
+class EventoNotificacao(db.Model):
+    """
+    Notificação única para um público (modo broadcast): em vez de uma linha por destinatário,
+    uma linha por evento, lida por todos os usuários do perfil (e da empresa, se informada)
+    """
+    __tablename__ = 'helpdesk_notificacao_eventos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    titulo = db.Column(db.String(200), nullable=False)
+    mensagem = db.Column(db.Text, nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    publico = db.Column(db.String(20), nullable=False)  # equipe, todos ou um tipo_usuario
+    data_criacao = db.Column(db.DateTime, default=get_brazil_time)
+    
+    # Chaves estrangeiras
+    empresa_id = db.Column(db.Integer, db.ForeignKey('helpdesk_empresas.id'), nullable=True)
+    chamado_id = db.Column(db.Integer, db.ForeignKey('helpdesk_chamados.id'), nullable=True)
+    
+    def __repr__(self):
+        return f'<EventoNotificacao {self.titulo} para {self.publico}>'
+
+class CursorNotificacao(db.Model):
+    """Último evento até o qual o usuário leu tudo (eventos com id menor ou igual estão lidos)"""
+    __tablename__ = 'helpdesk_notificacao_cursores'
+    
+    usuario_id = db.Column(db.Integer, db.ForeignKey('helpdesk_usuarios.id'), primary_key=True)
+    ultimo_evento_id = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<CursorNotificacao Usuario {self.usuario_id} até {self.ultimo_evento_id}>'
+
+class LeituraNotificacao(db.Model):
+    """Evento lido fora de ordem (acima do cursor); removido quando o cursor o alcança"""
+    __tablename__ = 'helpdesk_notificacao_leituras'
+    
+    usuario_id = db.Column(db.Integer, db.ForeignKey('helpdesk_usuarios.id'), primary_key=True)
+    evento_id = db.Column(db.Integer, db.ForeignKey('helpdesk_notificacao_eventos.id'), primary_key=True)
+    
+    def __repr__(self):
+        return f'<LeituraNotificacao Usuario {self.usuario_id} evento {self.evento_id}>'
+
+class ContadorNotificacao(db.Model):
+    """
+    Contagem de notificações do usuário mantida junto com as escritas (não lidas e total).
+    `versao` cresce a cada mudança da contagem; `sincronizado_em` nulo força recontar.
+    """
+    __tablename__ = 'helpdesk_notificacao_contadores'
+    
+    usuario_id = db.Column(db.Integer, db.ForeignKey('helpdesk_usuarios.id'), primary_key=True)
+    nao_lidas = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    versao = db.Column(db.Integer, nullable=False, default=1)
+    sincronizado_em = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<ContadorNotificacao Usuario {self.usuario_id}: {self.nao_lidas}/{self.total}>'
+
+# Índices compostos para os relatórios e a fila (filtro por escopo + período, desempate por id).
+# Alterações em índices existentes entram como nova migração em src/utils/schema_migrations.py
+db.Index('idx_chamado_usuario_data', Chamado.usuario_id, Chamado.data_criacao, Chamado.id)
+db.Index('idx_chamado_empresa_data', Chamado.empresa_id, Chamado.data_criacao, Chamado.id)
+db.Index('idx_chamado_tecnico_data', Chamado.tecnico_id, Chamado.data_criacao)
+
+# Fila de chamados (paginação por data com filtro opcional de status)
+db.Index('idx_chamado_data', Chamado.data_criacao, Chamado.id)
+db.Index('idx_chamado_status_data', Chamado.status, Chamado.data_criacao)
+
+# Primeira resposta de cada chamado (relatório de SLA)
+db.Index('idx_resposta_chamado_data', RespostaChamado.chamado_id, RespostaChamado.data_resposta)
+
+# Notificações do usuário (contagem de não lidas e listagem recente)
+db.Index('idx_notificacao_usuario_lida_data', Notificacao.usuario_id, Notificacao.lida, Notificacao.data_criacao)
+db.Index('idx_notificacao_usuario_data', Notificacao.usuario_id, Notificacao.data_criacao)
+# Retenção: lidas/não lidas mais antigas que o limite
+db.Index('idx_notificacao_lida_data', Notificacao.lida, Notificacao.data_criacao)
+db.Index('idx_evento_notificacao_publico', EventoNotificacao.publico, EventoNotificacao.empresa_id, EventoNotificacao.id)
+
+# Índices parciais dos cadastros ativos (listas de filtros e relatórios)
+db.Index('idx_usuario_empresa_ativo', Usuario.empresa_id, sqlite_where=Usuario.ativo == True)
+db.Index('idx_usuario_nome_ativo', Usuario.nome, sqlite_where=Usuario.ativo == True)
+db.Index('idx_empresa_nome_ativa', Empresa.nome_empresa, sqlite_where=Empresa.ativa == True)
+db.Index('idx_servico_nome_ativo', Servico.nome, sqlite_where=Servico.ativo == True)
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, User
 from src.models.client import Client
+from src.utils.change_tracking import etag_condicional
 
 clients_bp = Blueprint('clients', __name__)
 
@@ -13,6 +14,7 @@ def check_admin_or_tech_permission():
     return user and user.profile in ['administrador', 'tecnico']
 
 @clients_bp.route('/clients', methods=['GET'])
+@etag_condicional('clients')
 def get_clients():
     """Lista todos os clientes"""
     try:
@@ -2,96 +2,179 @@ from flask import render_template, request, redirect, url_for, session, flash, B
 from src.models.helpdesk_models import Usuario, Empresa, Servico, Chamado, RespostaChamado, Notificacao
 from src.models.user import db
 from src.utils import login_required, admin_required, admin_or_tecnico_required
-from datetime import datetime
+from src.utils.current_user import usuario_atual, gravar_sessao
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
 from src.utils.timezone_utils import get_brazil_time
 from src.utils.export_utils import ReportExporter
-from flask import send_file
+from src.utils import report_rows
+from src.utils.sla_analytics import sla_analytics
+from src.utils.olap_snapshot import olap_snapshot
+from src.utils.status_counters import status_counters
+from src.utils.pagination import paginar_por_chave
+from src.utils.loader_profiles import com_perfil
+from src.utils.reference_cache import reference_cache
+from src.utils.change_tracking import change_tracking
+from src.utils.notification_store import notification_store
+from src.utils.realtime import realtime_notifier
+from flask import send_file, current_app
 import logging
+import os
 from src.utils.activity_logger import activity_logger, log_endpoint_access
 from src.utils.email_notifications import email_notifier
 from src.utils.debug_logging import debug_session_info, debug_print
 
 helpdesk_bp = Blueprint('helpdesk', __name__)
 
+# Valores aceitos nos filtros de chamados (fila, relatórios e exportações)
+STATUS_CHAMADO = ['aberto', 'em_andamento', 'finalizado']
+PRIORIDADES_CHAMADO = ['baixa', 'media', 'alta']
+
 def criar_notificacao_novo_chamado(chamado):
-    """Cria notificações para técnicos e administradores quando um novo chamado é aberto"""
-    print(f"[DEBUG]: Criando notificações para chamado ID: {chamado.id}")
-    print(f"[DEBUG]: Título do chamado: {chamado.titulo}")
-    
-    # Buscar todos os técnicos e administradores ativos
-    usuarios_para_notificar = Usuario.query.filter(
-        Usuario.ativo == True,
-        Usuario.tipo_usuario.in_(['tecnico', 'administrador'])
-    ).all()
-    
-    print(f"[DEBUG]: DEBUG: Encontrados {len(usuarios_para_notificar)} usuários para notificar")
-    
-    for usuario in usuarios_para_notificar:
-        print(f"[DEBUG]: DEBUG: Criando notificação para usuário: {usuario.nome} ({usuario.tipo_usuario})")
-        try:
-            notificacao = Notificacao(
-                titulo=f"Novo chamado: {chamado.titulo}",
-                mensagem=f"Um novo chamado foi aberto por {chamado.usuario.nome} - Prioridade: {chamado.prioridade}",
-                tipo="novo_chamado",
-                usuario_id=usuario.id,
-                chamado_id=chamado.id
-            )
-            db.session.add(notificacao)
-            print(f"[DEBUG]: DEBUG: Notificação criada para {usuario.nome}")
-        except Exception as e:
-            print(f"[DEBUG]: ERROR: Erro ao criar notificação para {usuario.nome}: {e}")
+    """
+    Notifica técnicos e administradores quando um novo chamado é aberto.
+    A forma de gravar (um evento para a equipe ou uma linha por pessoa) fica a cargo
+    do notification_store, conforme NOTIFICATION_STORAGE_MODE.
+    """
+    solicitante = reference_cache.usuario(chamado.usuario_id)
     
     try:
+        linhas = notification_store.publicar(
+            titulo=f"Novo chamado: {chamado.titulo}",
+            mensagem=f"Um novo chamado foi aberto por {solicitante.nome} - Prioridade: {chamado.prioridade}",
+            tipo="novo_chamado",
+            publico="equipe",
+            chamado_id=chamado.id
+        )
         db.session.commit()
-        print(f"[DEBUG]: DEBUG: Notificações salvas no banco com sucesso!")
-        
-        # Verificar se foram salvas
-        total_notificacoes = Notificacao.query.count()
-        print(f"[DEBUG]: DEBUG: Total de notificações no banco: {total_notificacoes}")
-        
+        debug_print(f"Notificação do chamado {chamado.id} gravada ({linhas} linha(s), modo {notification_store.config['mode']})")
     except Exception as e:
-        print(f"[DEBUG]: ERROR: Erro ao salvar notificações no banco: {e}")
+        print(f"Erro ao salvar notificações do chamado {chamado.id}: {e}")
         db.session.rollback()
 
+# Filtros da caixa de notificações
+TIPOS_NOTIFICACAO = {'novo_chamado': 'Novo chamado', 'chamado_atribuido': 'Chamado atribuído', 'resumo': 'Resumo de antigas'}
+ESTADOS_NOTIFICACAO = {'nao_lidas': False, 'lidas': True}
+NOTIFICACOES_POR_PAGINA = 20
+MAX_NOTIFICACOES_POR_PAGINA = 100
+
+def _pagina_notificacoes():
+    """Página atual das notificações (?cursor=, ?por_pagina=, ?tipo=, ?estado=nao_lidas|lidas)"""
+    por_pagina = min(request.args.get('por_pagina', NOTIFICACOES_POR_PAGINA, type=int) or NOTIFICACOES_POR_PAGINA,
+                     MAX_NOTIFICACOES_POR_PAGINA)
+    return notification_store.pagina(
+        usuario_atual(),
+        cursor=request.args.get('cursor'),
+        por_pagina=max(por_pagina, 1),
+        tipo=request.args.get('tipo') or None,
+        lida=ESTADOS_NOTIFICACAO.get(request.args.get('estado'))
+    )
+
+def _selecionadas(valores):
+    """Converte 'origem:id' (ex.: evento:12, notificacao:5) em [(origem, id)], ignorando inválidos"""
+    selecionadas = []
+    for valor in valores:
+        origem, _, id = str(valor).partition(':')
+        if origem in ('notificacao', 'evento') and id.isdigit():
+            selecionadas.append((origem, int(id)))
+    return selecionadas
+
 @helpdesk_bp.route('/notificacoes')
 @login_required
 def listar_notificacoes():
-    """Lista notificações do usuário atual"""
-    user_id = session['user_id']
-    notificacoes = Notificacao.query.filter_by(usuario_id=user_id).order_by(Notificacao.data_criacao.desc()).limit(20).all()
-    return render_template('notificacoes.html', notificacoes=notificacoes)
+    """Lista notificações do usuário atual, paginadas e filtradas por tipo e estado"""
+    pagina = _pagina_notificacoes()
+    return render_template('notificacoes.html',
+                         notificacoes=pagina.itens,
+                         proximo_cursor=pagina.proximo_cursor,
+                         tipos_notificacao=TIPOS_NOTIFICACAO)
+
+@helpdesk_bp.route('/api/notificacoes')
+@login_required
+def api_notificacoes():
+    """Página de notificações em JSON (mesmos parâmetros de /notificacoes)"""
+    from flask import jsonify
+    
+    pagina = _pagina_notificacoes()
+    return jsonify({
+        'notificacoes': [dict(item._asdict(), data_criacao=item.data_criacao.isoformat() if item.data_criacao else None)
+                         for item in pagina.itens],
+        'proximo_cursor': pagina.proximo_cursor,
+        'tem_mais': pagina.tem_mais
+    })
+
+@helpdesk_bp.route('/notificacoes/marcar_lidas', methods=['POST'])
+@login_required
+def marcar_notificacoes_lidas():
+    """
+    Marca em lote: as selecionadas (campo `selecionadas`, valores origem:id) ou, com todas=1,
+    todas as não lidas (do `tipo` informado, se houver). Aceita formulário ou JSON.
+    """
+    from flask import jsonify
+    
+    dados = request.get_json(silent=True) if request.is_json else request.form
+    dados = dados or {}
+    tipo = dados.get('tipo') or None
+    if str(dados.get('todas', '')).lower() in ('1', 'true', 'on'):
+        selecionadas = None
+    else:
+        valores = dados.get('selecionadas', []) if request.is_json else request.form.getlist('selecionadas')
+        selecionadas = _selecionadas(valores if isinstance(valores, list) else [valores])
+        if not selecionadas:
+            if request.is_json:
+                return jsonify({'error': 'Nenhuma notificação selecionada'}), 400
+            flash('Selecione ao menos uma notificação.', 'warning')
+            return redirect(url_for('helpdesk.listar_notificacoes', tipo=tipo))
+    
+    usuario = usuario_atual()
+    marcadas = notification_store.marcar_lidas(usuario, selecionadas, tipo=tipo)
+    db.session.commit()
+    
+    if request.is_json:
+        count, total, versao = notification_store.contador(usuario)
+        return jsonify({'marcadas': marcadas, 'count': count, 'total': total, 'versao': versao})
+    
+    flash(f'{marcadas} notificação(ões) marcada(s) como lida(s).', 'success')
+    return redirect(url_for('helpdesk.listar_notificacoes', tipo=tipo, estado=dados.get('estado') or None))
 
 @helpdesk_bp.route('/notificacoes/marcar_lida/<int:notificacao_id>')
 @login_required
 def marcar_notificacao_lida(notificacao_id):
-    """Marca uma notificação como lida"""
-    notificacao = Notificacao.query.filter_by(id=notificacao_id, usuario_id=session['user_id']).first()
-    if notificacao:
-        notificacao.lida = True
+    """Marca uma notificação como lida (?origem=evento para notificações da equipe)"""
+    origem = request.args.get('origem', 'notificacao')
+    if notification_store.marcar_lida(usuario_atual(), notificacao_id, origem):
         db.session.commit()
     return redirect(url_for('helpdesk.listar_notificacoes'))
 
 @helpdesk_bp.route('/api/notificacoes/nao_lidas')
 @login_required
 def contar_notificacoes_nao_lidas():
-    """API para contar notificações não lidas"""
-    from flask import jsonify
-    user_id = session['user_id']
-    user_type = session.get('user_type', 'unknown')
-    
-    print(f"[DEBUG]: API DEBUG: Usuário {user_id} ({user_type}) consultando notificações")
-    
-    count = Notificacao.query.filter_by(usuario_id=user_id, lida=False).count()
-    total = Notificacao.query.filter_by(usuario_id=user_id).count()
-    
-    print(f"[DEBUG]: API DEBUG: {count} não lidas de {total} total para usuário {user_id}")
-    
-    return jsonify({
-        'count': count,
-        'total': total,
-        'user_id': user_id,
-        'user_type': user_type
-    })
+    """
+    API para contar notificações não lidas.
+    Lê só o contador do usuário; com a versão atual (?versao=N ou If-None-Match) responde 304.
+    """
+    from flask import jsonify, make_response
+    usuario = usuario_atual()
+    
+    count, total, versao = notification_store.contador(usuario)
+    etag = f'notificacoes-{usuario.id}-{versao}'
+    
+    if request.args.get('versao') == str(versao) or request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(jsonify({
+            'count': count,
+            'total': total,
+            'versao': versao,
+            'user_id': usuario.id,
+            'user_type': usuario.tipo
+        }))
+    
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
 
 @helpdesk_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -105,10 +188,7 @@ def login():
             # Debug antes de setar a sessão
             debug_print(f"[LOGIN]: Login bem-sucedido para: {user.nome} ({user.email})")
             
-            session['user_id'] = user.id
-            session['user_name'] = user.nome
-            session['user_type'] = user.tipo_usuario
-            session['user_email'] = user.email
+            gravar_sessao(user)
             
             # Debug após setar a sessão
             debug_print(f"[SESSION]: Sessão configurada - user_id: {session.get('user_id')}")
@@ -170,13 +250,14 @@ def dashboard_admin():
     )
     
     # Estatísticas para gráficos
-    total_chamados = Chamado.query.count()
-    chamados_abertos = Chamado.query.filter_by(status='aberto').count()
-    chamados_andamento = Chamado.query.filter_by(status='em_andamento').count()
-    chamados_finalizados = Chamado.query.filter_by(status='finalizado').count()
+    contagens = status_counters.contagens('helpdesk_chamados')
+    total_chamados = contagens['total']
+    chamados_abertos = contagens['aberto']
+    chamados_andamento = contagens['em_andamento']
+    chamados_finalizados = contagens['finalizado']
     
     # Chamados recentes para visualização em quadrados
-    chamados_recentes = Chamado.query.order_by(Chamado.data_criacao.desc()).limit(10).all()
+    chamados_recentes = com_perfil(Chamado.query, 'lista').order_by(Chamado.data_criacao.desc()).limit(10).all()
     
     return render_template('dashboard_admin.html',
                          total_chamados=total_chamados,
@@ -189,27 +270,20 @@ def dashboard_admin():
 @login_required
 @admin_or_tecnico_required
 def dashboard_tecnico():
-    # Técnicos podem ver todos os chamados
-    chamados = Chamado.query.order_by(Chamado.data_criacao.desc()).all()
-    
-    return render_template('dashboard_tecnico.html', chamados=chamados)
+    # Técnicos podem ver todos os chamados, paginados e filtrados no servidor
+    pagina = _fila_chamados()
+    
+    return render_template('dashboard_tecnico.html',
+                         chamados=pagina.itens,
+                         proximo_cursor=pagina.proximo_cursor,
+                         contagens=_contagens_fila(),
+                         opcoes_fila=_opcoes_fila())
 
 @helpdesk_bp.route('/dashboard/cliente')
 @login_required
 def dashboard_cliente():
-    user_id = session['user_id']
-    
-    # Buscar o usuário atual para pegar a empresa vinculada
-    usuario_atual = Usuario.query.get(user_id)
-    
-    if usuario_atual and usuario_atual.empresa_id:
-        # Clientes veem chamados de usuários da mesma empresa
-        usuarios_da_empresa = Usuario.query.filter_by(empresa_id=usuario_atual.empresa_id).all()
-        usuario_ids = [u.id for u in usuarios_da_empresa]
-        chamados = Chamado.query.filter(Chamado.usuario_id.in_(usuario_ids)).order_by(Chamado.data_criacao.desc()).all()
-    else:
-        # Se não tem empresa vinculada, vê apenas os próprios chamados
-        chamados = Chamado.query.filter_by(usuario_id=user_id).order_by(Chamado.data_criacao.desc()).all()
+    # Chamados da empresa do cliente (ou apenas os próprios, se não tiver empresa)
+    chamados = com_perfil(_escopo_cliente(usuario_atual()), 'lista').order_by(Chamado.data_criacao.desc()).all()
     
     return render_template('dashboard_cliente.html', chamados=chamados)
 
@@ -240,31 +314,140 @@ def listar_servicos():
     servicos = Servico.query.filter_by(ativo=True).order_by(Servico.data_criacao.desc()).all()
     return render_template('listar_servicos.html', servicos=servicos)
 
+# Fila de chamados: paginação por chave e filtros no servidor
+CHAMADOS_POR_PAGINA = 30
+MAX_CHAMADOS_POR_PAGINA = 100
+LAYOUTS_FILA = {
+    'lista': 'partials/chamado_card_lista.html',
+    'tecnico': 'partials/chamado_card_tecnico.html'
+}
+
+def _escopo_chamados():
+    """Chamados visíveis para o usuário logado"""
+    usuario = usuario_atual()
+    
+    if usuario.tipo in ['administrador', 'tecnico']:
+        # Administradores e técnicos podem ver todos os chamados
+        return Chamado.query
+    
+    return _escopo_cliente(usuario)
+
+def _escopo_cliente(usuario):
+    """Chamados da empresa do cliente, filtrando direto por Chamado.empresa_id"""
+    if usuario.empresa_id:
+        # Inclui os próprios chamados mesmo que tenham sido movidos para outra empresa
+        return Chamado.query.filter(or_(Chamado.empresa_id == usuario.empresa_id, Chamado.usuario_id == usuario.id))
+    
+    # Se não tem empresa vinculada, vê apenas os próprios chamados
+    return Chamado.query.filter_by(usuario_id=usuario.id)
+
+def _cliente_pode_acessar(chamado, usuario):
+    """Mesmo critério de _escopo_cliente: chamado próprio ou da empresa do cliente"""
+    if chamado.usuario_id == usuario.id:
+        return True
+    return bool(usuario.empresa_id) and chamado.empresa_id == usuario.empresa_id
+
+def _filtrar_fila(query):
+    """Aplica os filtros da fila vindos da query string"""
+    status = request.args.get('status', '')
+    if status in STATUS_CHAMADO:
+        query = query.filter(Chamado.status == status)
+    
+    prioridade = request.args.get('prioridade', '')
+    if prioridade in PRIORIDADES_CHAMADO:
+        query = query.filter(Chamado.prioridade == prioridade)
+    
+    servico_id = request.args.get('servico_id', type=int)
+    if servico_id:
+        query = query.filter(Chamado.servico_id == servico_id)
+    
+    busca = request.args.get('busca', '').strip()
+    if busca:
+        termo = f'%{busca}%'
+        query = query.filter(Chamado.titulo.ilike(termo) | Chamado.descricao.ilike(termo))
+    
+    # Filtros de atribuição só fazem sentido para a equipe
+    if session['user_type'] in ['administrador', 'tecnico']:
+        empresa_id = request.args.get('empresa_id', type=int)
+        if empresa_id:
+            query = query.filter(Chamado.empresa_id == empresa_id)
+        
+        tecnico_id = request.args.get('tecnico_id', type=int)
+        if tecnico_id:
+            query = query.filter(Chamado.tecnico_id == tecnico_id)
+        
+        visao = request.args.get('visao', '')
+        if visao == 'meus':
+            query = query.filter(Chamado.tecnico_id == session['user_id'])
+        elif visao == 'sem_tecnico':
+            query = query.filter(Chamado.tecnico_id.is_(None))
+    
+    return query
+
+def _fila_chamados():
+    """Página atual da fila (?cursor=, ?por_pagina=) com os filtros aplicados"""
+    por_pagina = min(request.args.get('por_pagina', CHAMADOS_POR_PAGINA, type=int) or CHAMADOS_POR_PAGINA,
+                     MAX_CHAMADOS_POR_PAGINA)
+    return paginar_por_chave(
+        com_perfil(_filtrar_fila(_escopo_chamados()), 'lista'),
+        Chamado.data_criacao,
+        Chamado.id,
+        cursor=request.args.get('cursor'),
+        por_pagina=por_pagina
+    )
+
+def _contagens_fila():
+    """Totais por status dos chamados visíveis (sem os filtros da fila)"""
+    if session['user_type'] in ['administrador', 'tecnico']:
+        return status_counters.contagens('helpdesk_chamados')
+    return _contagens_por(_escopo_chamados()).get(None, _contagem_vazia())
+
+def _opcoes_fila():
+    """Opções dos filtros da fila"""
+    opcoes = {'servicos': reference_cache.servicos_ativos()}
+    if session['user_type'] in ['administrador', 'tecnico']:
+        opcoes['empresas'] = reference_cache.empresas_ativas()
+        opcoes['tecnicos'] = reference_cache.tecnicos_ativos()
+    return opcoes
+
 @helpdesk_bp.route('/chamados')
 @login_required
 def listar_chamados():
-    user_type = session['user_type']
-    user_id = session['user_id']
+    pagina = _fila_chamados()
     
-    if user_type == 'administrador':
-        chamados = Chamado.query.order_by(Chamado.data_criacao.desc()).all()
-    elif user_type == 'tecnico':
-        # Técnicos podem ver todos os chamados
-        chamados = Chamado.query.order_by(Chamado.data_criacao.desc()).all()
-    else:
-        # Clientes veem chamados de usuários da mesma empresa
-        usuario_atual = Usuario.query.get(user_id)
-        
-        if usuario_atual and usuario_atual.empresa_id:
-            # Buscar todos os usuários da mesma empresa
-            usuarios_da_empresa = Usuario.query.filter_by(empresa_id=usuario_atual.empresa_id).all()
-            usuario_ids = [u.id for u in usuarios_da_empresa]
-            chamados = Chamado.query.filter(Chamado.usuario_id.in_(usuario_ids)).order_by(Chamado.data_criacao.desc()).all()
-        else:
-            # Se não tem empresa vinculada, vê apenas os próprios chamados
-            chamados = Chamado.query.filter_by(usuario_id=user_id).order_by(Chamado.data_criacao.desc()).all()
+    return render_template('listar_chamados.html',
+                         chamados=pagina.itens,
+                         proximo_cursor=pagina.proximo_cursor,
+                         contagens=_contagens_fila(),
+                         opcoes_fila=_opcoes_fila())
+
+@helpdesk_bp.route('/api/chamados/fila')
+@login_required
+def api_fila_chamados():
+    """Próxima página da fila em JSON, com os cards já renderizados (?layout=lista|tecnico)"""
+    from flask import jsonify
+    
+    pagina = _fila_chamados()
+    modelo_card = LAYOUTS_FILA.get(request.args.get('layout'), LAYOUTS_FILA['lista'])
     
-    return render_template('listar_chamados.html', chamados=chamados)
+    return jsonify({
+        'chamados': [{
+            'id': chamado.id,
+            'titulo': chamado.titulo,
+            'status': chamado.status,
+            'prioridade': chamado.prioridade,
+            'data_criacao': chamado.data_criacao.isoformat() if chamado.data_criacao else None,
+            'data_finalizacao': chamado.data_finalizacao.isoformat() if chamado.data_finalizacao else None,
+            'usuario_id': chamado.usuario_id,
+            'tecnico_id': chamado.tecnico_id,
+            'empresa_id': chamado.empresa_id,
+            'servico_id': chamado.servico_id,
+            'url': url_for('helpdesk.ver_chamado', chamado_id=chamado.id)
+        } for chamado in pagina.itens],
+        'html': ''.join(render_template(modelo_card, chamado=chamado) for chamado in pagina.itens),
+        'proximo_cursor': pagina.proximo_cursor,
+        'tem_mais': pagina.tem_mais
+    })
 
 @helpdesk_bp.route('/criar_usuario', methods=['GET', 'POST'])
 @login_required
@@ -306,7 +489,7 @@ def criar_usuario():
         return redirect(url_for('helpdesk.criar_usuario'))
     
     # Buscar empresas para o formulário
-    empresas = Empresa.query.filter_by(ativa=True).all()
+    empresas = reference_cache.empresas_ativas()
     return render_template('criar_usuario.html', empresas=empresas)
 
 @helpdesk_bp.route('/criar_empresa', methods=['GET', 'POST'])
@@ -374,14 +557,13 @@ def criar_chamado():
         user_type = session['user_type']
         if user_type == 'cliente':
             # Clientes automaticamente usam sua empresa vinculada
-            usuario_atual = Usuario.query.get(session['user_id'])
-            empresa_id = usuario_atual.empresa_id if usuario_atual else None
+            empresa_id = usuario_atual().empresa_id
             
             # Validação: Clientes devem obrigatoriamente selecionar um serviço
             if not servico_id:
                 flash('Clientes devem selecionar um serviço para criar o chamado!', 'error')
-                empresas = Empresa.query.filter_by(ativa=True).all()
-                servicos = Servico.query.filter_by(ativo=True).all()
+                empresas = reference_cache.empresas_ativas()
+                servicos = reference_cache.servicos_ativos()
                 return render_template('criar_chamado.html', empresas=empresas, servicos=servicos)
         else:
             # Admins e técnicos podem escolher a empresa
@@ -403,15 +585,19 @@ def criar_chamado():
         # Enviar notificações por email
         try:
             # Buscar dados necessários para as notificações
-            cliente = Usuario.query.get(novo_chamado.usuario_id)
-            empresa = Empresa.query.get(novo_chamado.empresa_id) if novo_chamado.empresa_id else None
+            cliente = reference_cache.usuario(novo_chamado.usuario_id)
+            empresa = reference_cache.empresa(novo_chamado.empresa_id)
             
             # 1. Notificar o cliente que criou o chamado
             if cliente and cliente.email:
                 email_notifier.notify_new_ticket_to_client(novo_chamado, cliente)
             
-            # 2. Notificar todos os administradores e técnicos
-            email_notifier.notify_new_ticket_to_admins_and_technicians(novo_chamado, cliente, empresa)
+            # 2. Notificar administradores e técnicos offline (quem está online recebe o push)
+            equipe_offline = realtime_notifier.destinatarios_email(reference_cache.tecnicos_ativos())
+            if equipe_offline:
+                email_notifier.notify_new_ticket_to_admins_and_technicians(
+                    novo_chamado, cliente, empresa, destinatarios=equipe_offline
+                )
             
         except Exception as e:
             logging.error(f"Erro ao enviar notificações por email: {str(e)}")
@@ -466,15 +652,15 @@ def criar_chamado():
             return redirect(url_for('helpdesk.dashboard_cliente'))
     
     # Buscar empresas e serviços para o formulário
-    empresas = Empresa.query.filter_by(ativa=True).all()
-    servicos = Servico.query.filter_by(ativo=True).all()
+    empresas = reference_cache.empresas_ativas()
+    servicos = reference_cache.servicos_ativos()
     
     return render_template('criar_chamado.html', empresas=empresas, servicos=servicos)
 
 @helpdesk_bp.route('/chamado/<int:chamado_id>')
 @login_required
 def ver_chamado(chamado_id):
-    chamado = Chamado.query.get_or_404(chamado_id)
+    chamado = com_perfil(Chamado.query, 'detalhe').filter(Chamado.id == chamado_id).first_or_404()
     
     # Log da visualização do chamado
     activity_logger.log_view(
@@ -485,46 +671,30 @@ def ver_chamado(chamado_id):
     )
     
     # Verificar permissões
-    user_type = session['user_type']
-    user_id = session['user_id']
+    usuario = usuario_atual()
     
-    if user_type == 'cliente':
-        # Clientes podem ver chamados da mesma empresa
-        usuario_atual = Usuario.query.get(user_id)
-        usuario_do_chamado = Usuario.query.get(chamado.usuario_id)
-        
-        # Verificar se é o próprio usuário OU se pertencem à mesma empresa
-        if chamado.usuario_id != user_id:
-            if not (usuario_atual and usuario_atual.empresa_id and 
-                   usuario_do_chamado and usuario_do_chamado.empresa_id and
-                   usuario_atual.empresa_id == usuario_do_chamado.empresa_id):
-                flash('Acesso negado!', 'error')
-                return redirect(url_for('helpdesk.dashboard_cliente'))
+    if usuario.tipo == 'cliente':
+        # Clientes podem ver os próprios chamados e os da sua empresa
+        if not _cliente_pode_acessar(chamado, usuario):
+            flash('Acesso negado!', 'error')
+            return redirect(url_for('helpdesk.dashboard_cliente'))
     
     return render_template('ver_chamado.html', chamado=chamado)
 
 @helpdesk_bp.route('/chamado/<int:chamado_id>/responder', methods=['GET', 'POST'])
 @login_required
 def responder_chamado(chamado_id):
-    chamado = Chamado.query.get_or_404(chamado_id)
+    chamado = com_perfil(Chamado.query, 'detalhe').filter(Chamado.id == chamado_id).first_or_404()
     
     # Verificar se o usuário tem permissão para responder este chamado
-    user_type = session['user_type']
-    user_id = session['user_id']
+    usuario = usuario_atual()
+    user_type = usuario.tipo
     
     # Admins e técnicos podem responder qualquer chamado
     # Clientes podem responder a chamados da mesma empresa
-    if user_type == 'cliente':
-        usuario_atual = Usuario.query.get(user_id)
-        usuario_do_chamado = Usuario.query.get(chamado.usuario_id)
-        
-        # Verificar se é o próprio usuário OU se pertencem à mesma empresa
-        if chamado.usuario_id != user_id:
-            if not (usuario_atual and usuario_atual.empresa_id and 
-                   usuario_do_chamado and usuario_do_chamado.empresa_id and
-                   usuario_atual.empresa_id == usuario_do_chamado.empresa_id):
-                flash('Você só pode responder a chamados da sua empresa!', 'error')
-                return redirect(url_for('helpdesk.dashboard_cliente'))
+    if user_type == 'cliente' and not _cliente_pode_acessar(chamado, usuario):
+        flash('Você só pode responder a chamados da sua empresa!', 'error')
+        return redirect(url_for('helpdesk.dashboard_cliente'))
     
     if request.method == 'POST':
         resposta = request.form['resposta']
@@ -561,14 +731,14 @@ def assumir_chamado(chamado_id):
     chamado = Chamado.query.get_or_404(chamado_id)
     
     if chamado.tecnico_id is None:
-        tecnico = Usuario.query.get(session['user_id'])
+        tecnico = reference_cache.usuario(session['user_id'])
         chamado.tecnico_id = session['user_id']
         chamado.status = 'em_andamento'
         db.session.commit()
         
         # Enviar notificação por email para o técnico
-        cliente = Usuario.query.get(chamado.usuario_id)
-        empresa = Empresa.query.get(cliente.empresa_id) if cliente.empresa_id else None
+        cliente = reference_cache.usuario(chamado.usuario_id)
+        empresa = reference_cache.empresa(cliente.empresa_id)
         
         try:
             email_notifier.notify_ticket_assigned_to_technician(
@@ -594,7 +764,7 @@ def assumir_chamado(chamado_id):
 @login_required
 @admin_or_tecnico_required
 def editar_chamado(chamado_id):
-    chamado = Chamado.query.get_or_404(chamado_id)
+    chamado = com_perfil(Chamado.query, 'detalhe').filter(Chamado.id == chamado_id).first_or_404()
     
     # Técnicos só podem editar chamados abertos
     if session['user_type'] == 'tecnico' and chamado.status != 'aberto':
@@ -625,9 +795,9 @@ def editar_chamado(chamado_id):
         return redirect(url_for('helpdesk.ver_chamado', chamado_id=chamado_id))
     
     # Buscar dados para o formulário
-    empresas = Empresa.query.filter_by(ativa=True).all()
-    servicos = Servico.query.filter_by(ativo=True).all()
-    tecnicos = Usuario.query.filter(Usuario.ativo == True, Usuario.tipo_usuario.in_(['tecnico', 'administrador'])).all()
+    empresas = reference_cache.empresas_ativas()
+    servicos = reference_cache.servicos_ativos()
+    tecnicos = reference_cache.tecnicos_ativos()
     
     return render_template('editar_chamado.html', 
                          chamado=chamado, 
@@ -639,7 +809,7 @@ def editar_chamado(chamado_id):
 @login_required
 @admin_or_tecnico_required
 def finalizar_chamado(chamado_id):
-    chamado = Chamado.query.get_or_404(chamado_id)
+    chamado = com_perfil(Chamado.query, 'detalhe').filter(Chamado.id == chamado_id).first_or_404()
     
     if chamado.status == 'finalizado':
         flash('Chamado já está finalizado!', 'warning')
@@ -711,7 +881,10 @@ def editar_usuario(usuario_id):
         
         if session['user_type'] == 'administrador':
             usuario.tipo_usuario = request.form['tipo_usuario']
-            usuario.empresa_id = request.form.get('empresa_id') or None
+            usuario.empresa_id = request.form.get('empresa_id', type=int) or None
+            if (usuario.tipo_usuario, usuario.empresa_id) != (old_values['tipo_usuario'], old_values['empresa_id']):
+                # Mudou o público das notificações do usuário: recontar
+                notification_store.marcar_contadores_desatualizados([usuario.id])
         
         senha_alterada = bool(request.form.get('senha'))
         if senha_alterada:
@@ -729,6 +902,10 @@ def editar_usuario(usuario_id):
         
         db.session.commit()
         
+        # Editou o próprio cadastro: atualizar os dados da sessão (g.current_user)
+        if usuario.id == session['user_id']:
+            gravar_sessao(usuario)
+        
         # Log da edição do usuário
         activity_logger.log_update(
             module="usuarios",
@@ -742,7 +919,7 @@ def editar_usuario(usuario_id):
         flash('Usuário atualizado com sucesso!', 'success')
         return redirect(url_for('helpdesk.ver_usuario', usuario_id=usuario_id))
     
-    empresas = Empresa.query.filter_by(ativa=True).all()
+    empresas = reference_cache.empresas_ativas()
     return render_template('editar_usuario.html', usuario=usuario, empresas=empresas)
 
 @helpdesk_bp.route('/usuario/<int:usuario_id>/desativar', methods=['POST'])
@@ -766,6 +943,7 @@ def desativar_usuario(usuario_id):
     email_usuario = usuario.email
     
     # Exclusão permanente do banco de dados
+    notification_store.remover_usuario(usuario.id)
     db.session.delete(usuario)
     db.session.commit()
     
@@ -898,259 +1076,292 @@ def desativar_servico(servico_id):
 def relatorios():
     return render_template('relatorios.html')
 
-@helpdesk_bp.route('/relatorio/empresas')
-@login_required
-def relatorio_empresas():
-    # Obter filtro da query string
+# Filtros aceitos pelos relatórios e suas exportações
+def _filtros_relatorio():
+    """Lê data_inicio/data_fim (AAAA-MM-DD), status, prioridade e servico_id da query string"""
+    filtros = {}
+    
+    data_inicio = request.args.get('data_inicio', '')
+    if data_inicio:
+        try:
+            filtros['data_inicio'] = datetime.strptime(data_inicio, '%Y-%m-%d')
+        except ValueError:
+            pass
+    
+    data_fim = request.args.get('data_fim', '')
+    if data_fim:
+        try:
+            # Data final inclusiva
+            filtros['data_fim'] = datetime.strptime(data_fim, '%Y-%m-%d') + timedelta(days=1)
+        except ValueError:
+            pass
+    
+    status = request.args.get('status', '')
+    if status in STATUS_CHAMADO:
+        filtros['status'] = status
+    
+    prioridade = request.args.get('prioridade', '')
+    if prioridade in PRIORIDADES_CHAMADO:
+        filtros['prioridade'] = prioridade
+    
+    servico_id = request.args.get('servico_id', type=int)
+    if servico_id:
+        filtros['servico_id'] = servico_id
+    
+    return filtros
+
+def _filtrar_chamados(query, filtros):
+    """Aplica os filtros do relatório no WHERE da consulta de chamados"""
+    if 'data_inicio' in filtros:
+        query = query.filter(Chamado.data_criacao >= filtros['data_inicio'])
+    if 'data_fim' in filtros:
+        query = query.filter(Chamado.data_criacao < filtros['data_fim'])
+    if 'status' in filtros:
+        query = query.filter(Chamado.status == filtros['status'])
+    if 'prioridade' in filtros:
+        query = query.filter(Chamado.prioridade == filtros['prioridade'])
+    if 'servico_id' in filtros:
+        query = query.filter(Chamado.servico_id == filtros['servico_id'])
+    return query
+
+def _contagens_por(query, coluna=None):
+    """
+    Conta chamados por status no banco (GROUP BY), opcionalmente agrupando
+    também por `coluna`. Retorna {chave: {'total', 'aberto', 'em_andamento', 'finalizado'}};
+    sem coluna, a chave é None.
+    """
+    colunas = [coluna] if coluna is not None else []
+    linhas = query.order_by(None).with_entities(
+        *colunas, Chamado.status, func.count(Chamado.id)
+    ).group_by(*colunas, Chamado.status).all()
+    
+    resultado = {}
+    for linha in linhas:
+        chave = linha[0] if colunas else None
+        status, quantidade = linha[-2], linha[-1]
+        contagem = resultado.setdefault(chave, {'total': 0, 'aberto': 0, 'em_andamento': 0, 'finalizado': 0})
+        contagem['total'] += quantidade
+        if status in contagem:
+            contagem[status] += quantidade
+    return resultado
+
+def _contagem_vazia():
+    return {'total': 0, 'aberto': 0, 'em_andamento': 0, 'finalizado': 0}
+
+def _empresas_do_relatorio():
+    """Empresas visíveis no relatório conforme filtro e tipo de usuário"""
     empresa_id = request.args.get('empresa_id', '')
+    usuario = usuario_atual()
+    
+    if usuario.tipo == 'cliente':
+        # Clientes só podem ver a empresa deles
+        if usuario.empresa_id:
+            return report_rows.empresas(Empresa.id == usuario.empresa_id)
+        return []
+    
+    # Administradores e técnicos podem ver todas as empresas
+    if empresa_id:
+        return report_rows.empresas(Empresa.id == int(empresa_id), Empresa.ativa == True)
+    return report_rows.empresas(Empresa.ativa == True)
+
+def _usuarios_do_relatorio():
+    """Usuários visíveis no relatório de técnicos conforme filtro e tipo de usuário"""
+    tecnico_id = request.args.get('tecnico_id', '')
     user_type = session['user_type']
     user_id = session['user_id']
     
-    # Buscar empresas baseado no filtro e tipo de usuário
-    if user_type == 'cliente':
-        # Clientes só podem ver a empresa deles
-        usuario_atual = Usuario.query.get(user_id)
-        if usuario_atual and usuario_atual.empresa_id:
-            empresas = [usuario_atual.empresa]
-        else:
-            empresas = []
-    else:
-        # Administradores e técnicos podem ver todas as empresas
-        if empresa_id:
-            empresas = Empresa.query.filter_by(id=int(empresa_id), ativa=True).all()
+    if tecnico_id:
+        if user_type == 'administrador':
+            # Administradores podem ver todos os usuários
+            return report_rows.usuarios(Usuario.id == int(tecnico_id), Usuario.ativo == True)
+        elif user_type == 'tecnico':
+            # Técnicos só podem ver a si mesmos ou clientes no filtro
+            usuario_solicitado = report_rows.usuarios(Usuario.id == int(tecnico_id), Usuario.ativo == True)
+            if usuario_solicitado and (usuario_solicitado[0].id == user_id or usuario_solicitado[0].tipo_usuario == 'cliente'):
+                return usuario_solicitado
+            return []
         else:
-            empresas = Empresa.query.filter_by(ativa=True).all()
+            # Clientes só podem ver a si mesmos no filtro
+            if int(tecnico_id) == user_id:
+                return report_rows.usuarios(Usuario.id == user_id, Usuario.ativo == True)
+            return []
     
+    if user_type == 'administrador':
+        # Administradores podem ver todos os usuários
+        return report_rows.usuarios(Usuario.ativo == True)
+    elif user_type == 'tecnico':
+        # Técnicos veem a si mesmos e todos os clientes
+        return report_rows.usuarios(
+            Usuario.ativo == True,
+            (Usuario.id == user_id) | (Usuario.tipo_usuario == 'cliente')
+        )
+    # Clientes veem apenas a si mesmos
+    return report_rows.usuarios(Usuario.id == user_id, Usuario.ativo == True)
+
+def _montar_relatorio_empresas(empresas, filtros, detalhado=False):
+    """Monta o relatório de empresas; contagens feitas no banco com os filtros aplicados"""
     relatorio_empresas = []
     for empresa in empresas:
         # Buscar usuários da empresa
-        usuarios_empresa = Usuario.query.filter_by(empresa_id=empresa.id, ativo=True).all()
+        usuarios_empresa = report_rows.usuarios(Usuario.empresa_id == empresa.id, Usuario.ativo == True)
         
-        # Buscar chamados da empresa
-        usuario_ids = [u.id for u in usuarios_empresa]
-        chamados = Chamado.query.filter(Chamado.usuario_id.in_(usuario_ids)).all() if usuario_ids else []
+        # Chamados da empresa pelo próprio Chamado.empresa_id (usa idx_chamado_empresa_data)
+        escopo = _filtrar_chamados(Chamado.query.filter(Chamado.empresa_id == empresa.id), filtros)
+        
+        contagem = _contagens_por(escopo).get(None, _contagem_vazia())
+        por_usuario = _contagens_por(escopo, Chamado.usuario_id)
+        por_tecnico = _contagens_por(escopo.filter(Chamado.tecnico_id.isnot(None)), Chamado.tecnico_id)
         
         # Estatísticas por usuário
         usuarios_stats = []
         for usuario in usuarios_empresa:
-            chamados_usuario = Chamado.query.filter_by(usuario_id=usuario.id).all()
+            stats = por_usuario.get(usuario.id, _contagem_vazia())
             usuarios_stats.append({
                 'usuario': usuario,
-                'total_chamados': len(chamados_usuario),
-                'abertos': len([c for c in chamados_usuario if c.status == 'aberto']),
-                'em_andamento': len([c for c in chamados_usuario if c.status == 'em_andamento']),
-                'finalizados': len([c for c in chamados_usuario if c.status == 'finalizado'])
+                'total_chamados': stats['total'],
+                'abertos': stats['aberto'],
+                'em_andamento': stats['em_andamento'],
+                'finalizados': stats['finalizado']
             })
         
         # Técnicos que atenderam chamados desta empresa
         tecnicos_atenderam = []
-        for chamado in chamados:
-            if chamado.tecnico_id:
-                tecnico = Usuario.query.get(chamado.tecnico_id)
-                if tecnico and tecnico not in [t['tecnico'] for t in tecnicos_atenderam]:
-                    chamados_tecnico_empresa = [c for c in chamados if c.tecnico_id == tecnico.id]
-                    tecnicos_atenderam.append({
-                        'tecnico': tecnico,
-                        'chamados_atendidos': len(chamados_tecnico_empresa),
-                        'finalizados': len([c for c in chamados_tecnico_empresa if c.status == 'finalizado'])
-                    })
-        
-        # Detalhes dos chamados com datas
-        chamados_detalhados = []
-        for chamado in chamados:
-            chamados_detalhados.append({
-                'chamado': chamado,
-                'titulo': chamado.titulo,
-                'status': chamado.status,
-                'prioridade': chamado.prioridade,
-                'data_abertura': chamado.data_criacao,
-                'data_finalizacao': chamado.data_finalizacao,
-                'usuario': chamado.usuario.nome if chamado.usuario else 'N/A',
-                'tecnico': chamado.tecnico.nome if chamado.tecnico else 'N/A',
-                'tempo_resolucao': (chamado.data_finalizacao - chamado.data_criacao).days if chamado.data_finalizacao else None
-            })
-        
-        relatorio_empresas.append({
+        if por_tecnico:
+            for tecnico in reference_cache.usuarios(por_tecnico.keys()):
+                tecnicos_atenderam.append({
+                    'tecnico': tecnico,
+                    'chamados_atendidos': por_tecnico[tecnico.id]['total'],
+                    'finalizados': por_tecnico[tecnico.id]['finalizado']
+                })
+        
+        dados_empresa = {
             'empresa': empresa,
             'total_usuarios': len(usuarios_empresa),
-            'total_chamados': len(chamados),
-            'chamados_abertos': len([c for c in chamados if c.status == 'aberto']),
-            'chamados_andamento': len([c for c in chamados if c.status == 'em_andamento']),
-            'chamados_finalizados': len([c for c in chamados if c.status == 'finalizado']),
+            'total_chamados': contagem['total'],
+            'chamados_abertos': contagem['aberto'],
+            'chamados_andamento': contagem['em_andamento'],
+            'chamados_finalizados': contagem['finalizado'],
             'usuarios_stats': usuarios_stats,
-            'tecnicos_atenderam': tecnicos_atenderam,
-            'chamados_detalhados': chamados_detalhados
-        })
+            'tecnicos_atenderam': tecnicos_atenderam
+        }
+        
+        # Detalhes dos chamados com datas (apenas exportações)
+        if detalhado:
+            dados_empresa['chamados_detalhados'] = report_rows.chamados_detalhados(escopo, contagem['total'])
+        
+        relatorio_empresas.append(dados_empresa)
     
-    return render_template('relatorio_empresas.html', relatorio=relatorio_empresas)
+    return relatorio_empresas
 
-@helpdesk_bp.route('/relatorio/tecnicos')
-@login_required
-def relatorio_tecnicos():
-    # Obter filtro da query string
-    tecnico_id = request.args.get('tecnico_id', '')
-    
-    # Buscar usuários baseado no filtro e tipo de usuário logado
-    user_type = session['user_type']
-    user_id = session['user_id']
-    
-    if tecnico_id:
-        if user_type == 'administrador':
-            # Administradores podem ver todos os usuários
-            tecnicos = Usuario.query.filter_by(id=int(tecnico_id), ativo=True).all()
-        elif user_type == 'tecnico':
-            # Técnicos só podem ver a si mesmos ou clientes no filtro
-            usuario_solicitado = Usuario.query.filter_by(id=int(tecnico_id), ativo=True).first()
-            if usuario_solicitado and (usuario_solicitado.id == user_id or usuario_solicitado.tipo_usuario == 'cliente'):
-                tecnicos = [usuario_solicitado]
-            else:
-                tecnicos = []
-        else:
-            # Clientes só podem ver a si mesmos no filtro
-            if int(tecnico_id) == user_id:
-                tecnicos = Usuario.query.filter_by(id=user_id, ativo=True).all()
-            else:
-                tecnicos = []
-    else:
-        if user_type == 'administrador':
-            # Administradores podem ver todos os usuários
-            tecnicos = Usuario.query.filter_by(ativo=True).all()
-        elif user_type == 'tecnico':
-            # Técnicos veem a si mesmos e todos os clientes
-            tecnicos = Usuario.query.filter(
-                Usuario.ativo == True,
-                (Usuario.id == user_id) | (Usuario.tipo_usuario == 'cliente')
-            ).all()
-        else:
-            # Clientes veem apenas a si mesmos
-            tecnicos = Usuario.query.filter_by(id=user_id, ativo=True).all()
-    
+def _montar_relatorio_tecnicos(tecnicos, filtros, detalhado=False):
+    """Monta o relatório de usuários/técnicos; contagens feitas no banco com os filtros aplicados"""
     relatorio_tecnicos = []
     for tecnico in tecnicos:
         # Chamados criados pelo usuário
-        chamados_tecnico = Chamado.query.filter_by(usuario_id=tecnico.id).all()
+        escopo = _filtrar_chamados(Chamado.query.filter(Chamado.usuario_id == tecnico.id), filtros)
+        contagem = _contagens_por(escopo).get(None, _contagem_vazia())
         
         # Estatísticas por técnico que atendeu os chamados deste usuário
         tecnicos_que_atenderam = {}
-        for chamado in chamados_tecnico:
-            if chamado.tecnico:
-                tecnico_nome = chamado.tecnico.nome
-                if tecnico_nome not in tecnicos_que_atenderam:
-                    tecnicos_que_atenderam[tecnico_nome] = {
-                        'total': 0,
-                        'abertos': 0,
-                        'em_andamento': 0,
-                        'finalizados': 0
-                    }
-                tecnicos_que_atenderam[tecnico_nome]['total'] += 1
-                if chamado.status == 'em_andamento':
-                    tecnicos_que_atenderam[tecnico_nome]['em_andamento'] += 1
-                elif chamado.status == 'aberto':
-                    tecnicos_que_atenderam[tecnico_nome]['abertos'] += 1
-                elif chamado.status == 'finalizado':
-                    tecnicos_que_atenderam[tecnico_nome]['finalizados'] += 1
+        por_tecnico = _contagens_por(escopo.filter(Chamado.tecnico_id.isnot(None)), Chamado.tecnico_id)
+        if por_tecnico:
+            nomes = {u.id: u.nome for u in reference_cache.usuarios(por_tecnico.keys())}
+            for id_tecnico, stats in por_tecnico.items():
+                if id_tecnico not in nomes:
+                    continue
+                tecnicos_que_atenderam[nomes[id_tecnico]] = {
+                    'total': stats['total'],
+                    'abertos': stats['aberto'],
+                    'em_andamento': stats['em_andamento'],
+                    'finalizados': stats['finalizado']
+                }
         
-        relatorio_tecnicos.append({
+        dados_tecnico = {
             'tecnico': tecnico,
-            'total_chamados': len(chamados_tecnico),
-            'chamados_abertos': len([c for c in chamados_tecnico if c.status == 'aberto']),
-            'chamados_andamento': len([c for c in chamados_tecnico if c.status == 'em_andamento']),
-            'chamados_finalizados': len([c for c in chamados_tecnico if c.status == 'finalizado']),
+            'total_chamados': contagem['total'],
+            'chamados_abertos': contagem['aberto'],
+            'chamados_andamento': contagem['em_andamento'],
+            'chamados_finalizados': contagem['finalizado'],
             'tecnicos_que_atenderam': tecnicos_que_atenderam,
-            'chamados_recentes': sorted(chamados_tecnico, key=lambda x: x.data_criacao, reverse=True)[:5]
-        })
+            'chamados_recentes': report_rows.chamados_recentes(escopo)
+        }
+        
+        # Detalhes dos chamados com datas (apenas exportações)
+        if detalhado:
+            dados_tecnico['chamados_detalhados'] = report_rows.chamados_detalhados(escopo, contagem['total'])
+        
+        relatorio_tecnicos.append(dados_tecnico)
     
-    return render_template('relatorio_tecnicos.html', relatorio=relatorio_tecnicos)
+    return relatorio_tecnicos
+
+@helpdesk_bp.route('/relatorio/empresas')
+@login_required
+def relatorio_empresas():
+    relatorio_empresas = _montar_relatorio_empresas(_empresas_do_relatorio(), _filtros_relatorio())
+    servicos = reference_cache.servicos_ativos()
+    return render_template('relatorio_empresas.html', relatorio=relatorio_empresas, servicos=servicos)
+
+@helpdesk_bp.route('/relatorio/tecnicos')
+@login_required
+def relatorio_tecnicos():
+    relatorio_tecnicos = _montar_relatorio_tecnicos(_usuarios_do_relatorio(), _filtros_relatorio())
+    servicos = reference_cache.servicos_ativos()
+    return render_template('relatorio_tecnicos.html', relatorio=relatorio_tecnicos, servicos=servicos)
+
+def _opcoes_exportacao_pdf():
+    """
+    Opções do PDF vindas da query string: ?limite=N e ?resumo=1.
+    Sem limite vale PDF_EXPORT_MAX_CHAMADOS; limite=0 lista todos. None se o limite for negativo.
+    """
+    limite = request.args.get('limite', type=int)
+    if limite is None:
+        limite = current_app.config.get('PDF_EXPORT_MAX_CHAMADOS')
+    elif limite < 0:
+        return None
+    elif limite == 0:
+        limite = None  # Sem limite
+    return {
+        'max_chamados': limite,
+        'apenas_resumo': request.args.get('resumo') == '1'
+    }
+
+def _enviar_pdf_temporario(caminho, download_name):
+    """Envia o PDF gerado em disco e remove o arquivo temporário"""
+    arquivo = open(caminho, 'rb')
+    try:
+        os.remove(caminho)
+    except OSError:
+        # Em sistemas que não permitem remover arquivo aberto, o CacheCleaner remove depois
+        pass
+    return send_file(
+        arquivo,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype='application/pdf'
+    )
 
 @helpdesk_bp.route('/relatorio/empresas/export/<formato>')
 @login_required
 def export_relatorio_empresas(formato):
-    # Obter filtro da query string
-    empresa_id = request.args.get('empresa_id', '')
-    user_type = session['user_type']
-    user_id = session['user_id']
-    
-    # Buscar empresas baseado no filtro e tipo de usuário
-    if user_type == 'cliente':
-        # Clientes só podem ver a empresa deles
-        usuario_atual = Usuario.query.get(user_id)
-        if usuario_atual and usuario_atual.empresa_id:
-            empresas = [usuario_atual.empresa]
-        else:
-            empresas = []
-    else:
-        # Administradores e técnicos podem ver todas as empresas
-        if empresa_id:
-            empresas = Empresa.query.filter_by(id=int(empresa_id), ativa=True).all()
-        else:
-            empresas = Empresa.query.filter_by(ativa=True).all()
+    opcoes_pdf = _opcoes_exportacao_pdf()
+    if opcoes_pdf is None:
+        flash('Limite de chamados inválido!', 'error')
+        return redirect(url_for('helpdesk.relatorio_empresas'))
     
-    relatorio_empresas = []
-    for empresa in empresas:
-        usuarios_empresa = Usuario.query.filter_by(empresa_id=empresa.id, ativo=True).all()
-        usuario_ids = [u.id for u in usuarios_empresa]
-        chamados = Chamado.query.filter(Chamado.usuario_id.in_(usuario_ids)).all() if usuario_ids else []
-        
-        usuarios_stats = []
-        for usuario in usuarios_empresa:
-            chamados_usuario = Chamado.query.filter_by(usuario_id=usuario.id).all()
-            usuarios_stats.append({
-                'usuario': usuario,
-                'total_chamados': len(chamados_usuario),
-                'abertos': len([c for c in chamados_usuario if c.status == 'aberto']),
-                'em_andamento': len([c for c in chamados_usuario if c.status == 'em_andamento']),
-                'finalizados': len([c for c in chamados_usuario if c.status == 'finalizado'])
-            })
-        
-        tecnicos_atenderam = []
-        for chamado in chamados:
-            if chamado.tecnico_id:
-                tecnico = Usuario.query.get(chamado.tecnico_id)
-                if tecnico and tecnico not in [t['tecnico'] for t in tecnicos_atenderam]:
-                    chamados_tecnico_empresa = [c for c in chamados if c.tecnico_id == tecnico.id]
-                    tecnicos_atenderam.append({
-                        'tecnico': tecnico,
-                        'chamados_atendidos': len(chamados_tecnico_empresa),
-                        'finalizados': len([c for c in chamados_tecnico_empresa if c.status == 'finalizado'])
-                    })
-        
-        # Detalhes dos chamados com datas
-        chamados_detalhados = []
-        for chamado in chamados:
-            chamados_detalhados.append({
-                'chamado': chamado,
-                'titulo': chamado.titulo,
-                'status': chamado.status,
-                'prioridade': chamado.prioridade,
-                'data_abertura': chamado.data_criacao,
-                'data_finalizacao': chamado.data_finalizacao,
-                'usuario': chamado.usuario.nome if chamado.usuario else 'N/A',
-                'tecnico': chamado.tecnico.nome if chamado.tecnico else 'N/A',
-                'tempo_resolucao': (chamado.data_finalizacao - chamado.data_criacao).days if chamado.data_finalizacao else None
-            })
-        
-        relatorio_empresas.append({
-            'empresa': empresa,
-            'total_usuarios': len(usuarios_empresa),
-            'total_chamados': len(chamados),
-            'chamados_abertos': len([c for c in chamados if c.status == 'aberto']),
-            'chamados_andamento': len([c for c in chamados if c.status == 'em_andamento']),
-            'chamados_finalizados': len([c for c in chamados if c.status == 'finalizado']),
-            'usuarios_stats': usuarios_stats,
-            'tecnicos_atenderam': tecnicos_atenderam,
-            'chamados_detalhados': chamados_detalhados
-        })
+    relatorio_empresas = _montar_relatorio_empresas(
+        _empresas_do_relatorio(),
+        _filtros_relatorio(),
+        detalhado=not (formato.lower() == 'pdf' and opcoes_pdf['apenas_resumo'])
+    )
     
     # Exportar
     exporter = ReportExporter()
     
     if formato.lower() == 'pdf':
-        buffer = exporter.export_empresas_pdf(relatorio_empresas)
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f'relatorio_empresas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
-            mimetype='application/pdf'
+        caminho = exporter.export_empresas_pdf(relatorio_empresas, **opcoes_pdf)
+        return _enviar_pdf_temporario(
+            caminho,
+            download_name=f'relatorio_empresas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
         )
     elif formato.lower() == 'excel':
         buffer = exporter.export_empresas_excel(relatorio_empresas)
@@ -1167,103 +1378,25 @@ def export_relatorio_empresas(formato):
 @helpdesk_bp.route('/relatorio/tecnicos/export/<formato>')
 @login_required
 def export_relatorio_tecnicos(formato):
-    # Obter filtro da query string
-    tecnico_id = request.args.get('tecnico_id', '')
-    
-    # Buscar usuários baseado no filtro e tipo de usuário logado
-    user_type = session['user_type']
-    user_id = session['user_id']
-    
-    if tecnico_id:
-        if user_type == 'administrador':
-            # Administradores podem ver todos os usuários
-            tecnicos = Usuario.query.filter_by(id=int(tecnico_id), ativo=True).all()
-        elif user_type == 'tecnico':
-            # Técnicos só podem ver a si mesmos ou clientes no filtro
-            usuario_solicitado = Usuario.query.filter_by(id=int(tecnico_id), ativo=True).first()
-            if usuario_solicitado and (usuario_solicitado.id == user_id or usuario_solicitado.tipo_usuario == 'cliente'):
-                tecnicos = [usuario_solicitado]
-            else:
-                tecnicos = []
-        else:
-            # Clientes só podem ver a si mesmos no filtro
-            if int(tecnico_id) == user_id:
-                tecnicos = Usuario.query.filter_by(id=user_id, ativo=True).all()
-            else:
-                tecnicos = []
-    else:
-        if user_type == 'administrador':
-            # Administradores podem ver todos os usuários
-            tecnicos = Usuario.query.filter_by(ativo=True).all()
-        elif user_type == 'tecnico':
-            # Técnicos veem a si mesmos e todos os clientes
-            tecnicos = Usuario.query.filter(
-                Usuario.ativo == True,
-                (Usuario.id == user_id) | (Usuario.tipo_usuario == 'cliente')
-            ).all()
-        else:
-            # Clientes veem apenas a si mesmos
-            tecnicos = Usuario.query.filter_by(id=user_id, ativo=True).all()
+    opcoes_pdf = _opcoes_exportacao_pdf()
+    if opcoes_pdf is None:
+        flash('Limite de chamados inválido!', 'error')
+        return redirect(url_for('helpdesk.relatorio_tecnicos'))
     
-    relatorio_tecnicos = []
-    for tecnico in tecnicos:
-        chamados_tecnico = Chamado.query.filter_by(usuario_id=tecnico.id).all()
-        
-        tecnicos_que_atenderam = {}
-        for chamado in chamados_tecnico:
-            if chamado.tecnico:
-                tecnico_nome = chamado.tecnico.nome
-                if tecnico_nome not in tecnicos_que_atenderam:
-                    tecnicos_que_atenderam[tecnico_nome] = {
-                        'total': 0,
-                        'abertos': 0,
-                        'em_andamento': 0,
-                        'finalizados': 0
-                    }
-                tecnicos_que_atenderam[tecnico_nome]['total'] += 1
-                if chamado.status == 'em_andamento':
-                    tecnicos_que_atenderam[tecnico_nome]['em_andamento'] += 1
-                elif chamado.status == 'aberto':
-                    tecnicos_que_atenderam[tecnico_nome]['abertos'] += 1
-                elif chamado.status == 'finalizado':
-                    tecnicos_que_atenderam[tecnico_nome]['finalizados'] += 1
-        
-        # Detalhes dos chamados com datas
-        chamados_detalhados = []
-        for chamado in chamados_tecnico:
-            chamados_detalhados.append({
-                'chamado': chamado,
-                'titulo': chamado.titulo,
-                'status': chamado.status,
-                'prioridade': chamado.prioridade,
-                'data_abertura': chamado.data_criacao,
-                'data_finalizacao': chamado.data_finalizacao,
-                'usuario': chamado.usuario.nome if chamado.usuario else 'N/A',
-                'tecnico_responsavel': chamado.tecnico.nome if chamado.tecnico else 'N/A',
-                'tempo_resolucao': (chamado.data_finalizacao - chamado.data_criacao).days if chamado.data_finalizacao else None
-            })
-        
-        relatorio_tecnicos.append({
-            'tecnico': tecnico,
-            'total_chamados': len(chamados_tecnico),
-            'chamados_abertos': len([c for c in chamados_tecnico if c.status == 'aberto']),
-            'chamados_andamento': len([c for c in chamados_tecnico if c.status == 'em_andamento']),
-            'chamados_finalizados': len([c for c in chamados_tecnico if c.status == 'finalizado']),
-            'tecnicos_que_atenderam': tecnicos_que_atenderam,
-            'chamados_recentes': sorted(chamados_tecnico, key=lambda x: x.data_criacao, reverse=True)[:5],
-            'chamados_detalhados': chamados_detalhados
-        })
+    relatorio_tecnicos = _montar_relatorio_tecnicos(
+        _usuarios_do_relatorio(),
+        _filtros_relatorio(),
+        detalhado=not (formato.lower() == 'pdf' and opcoes_pdf['apenas_resumo'])
+    )
     
     # Exportar
     exporter = ReportExporter()
     
     if formato.lower() == 'pdf':
-        buffer = exporter.export_tecnicos_pdf(relatorio_tecnicos)
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f'relatorio_tecnicos_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
-            mimetype='application/pdf'
+        caminho = exporter.export_tecnicos_pdf(relatorio_tecnicos, **opcoes_pdf)
+        return _enviar_pdf_temporario(
+            caminho,
+            download_name=f'relatorio_tecnicos_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
         )
     elif formato.lower() == 'excel':
         buffer = exporter.export_tecnicos_excel(relatorio_tecnicos)
@@ -1277,6 +1410,105 @@ def export_relatorio_tecnicos(formato):
         flash('Formato de exportação inválido!', 'error')
         return redirect(url_for('helpdesk.relatorio_tecnicos'))
 
+def _sla_do_relatorio():
+    """Métricas de SLA dos chamados filtrados; o cache é separado por combinação de filtros"""
+    filtros = _filtros_relatorio()
+    chave_cache = tuple(sorted((nome, str(valor)) for nome, valor in filtros.items()))
+    return sla_analytics.calcular(_filtrar_chamados(Chamado.query, filtros), chave_cache=chave_cache)
+
+@helpdesk_bp.route('/relatorio/sla')
+@admin_or_tecnico_required
+def relatorio_sla():
+    servicos = reference_cache.servicos_ativos()
+    return render_template('relatorio_sla.html', sla=_sla_do_relatorio(), servicos=servicos)
+
+@helpdesk_bp.route('/api/relatorios/sla')
+@admin_or_tecnico_required
+def api_relatorio_sla():
+    from flask import jsonify
+    return jsonify(_sla_do_relatorio())
+
+@helpdesk_bp.route('/relatorio/cubo')
+@admin_required
+def relatorio_cubo():
+    """
+    Consulta ad-hoc sobre a fotografia colunar dos chamados.
+    Ex.: /relatorio/cubo?dims=empresa,mes&measures=chamados,resolucao_p90_horas&status=finalizado
+    """
+    from flask import jsonify
+    
+    dims = [d for d in request.args.get('dims', '').split(',') if d]
+    medidas = [m for m in request.args.get('measures', 'chamados').split(',') if m]
+    
+    filtros = _filtros_relatorio()
+    filtros['empresa_id'] = request.args.get('empresa_id', type=int)
+    filtros['tecnico_id'] = request.args.get('tecnico_id', type=int)
+    
+    try:
+        resultado = olap_snapshot.consultar(
+            dims,
+            medidas,
+            filtros=filtros,
+            ordenar=request.args.get('ordenar'),
+            limite=request.args.get('limite', type=int)
+        )
+    except ValueError as e:
+        return jsonify({
+            'error': str(e),
+            'dims_disponiveis': list(olap_snapshot.DIMENSOES),
+            'measures_disponiveis': olap_snapshot.MEDIDAS
+        }), 400
+    
+    return jsonify(resultado)
+
+@helpdesk_bp.route('/api/cache/referencias')
+@admin_required
+def api_cache_referencias():
+    """Acertos, erros e ocupação do cache de usuários/empresas/serviços"""
+    from flask import jsonify
+    return jsonify(reference_cache.estatisticas())
+
+# Tabelas do diário de alterações visíveis para clientes (cadastros de referência)
+TABELAS_DIARIO_CLIENTE = ('helpdesk_empresas', 'helpdesk_servicos')
+MAX_ALTERACOES_POR_PAGINA = 1000
+
+@helpdesk_bp.route('/api/changes')
+@login_required
+def api_alteracoes():
+    """
+    Alterações confirmadas desde uma versão, para sincronização incremental.
+    Ex.: /api/changes?since=120&tables=helpdesk_chamados,helpdesk_notificacoes
+    Com completo=false (outra época ou diário já descartado) o cliente deve reler tudo
+    e continuar a partir de `versao`.
+    """
+    from flask import jsonify
+    
+    since = request.args.get('since', '0')
+    if not since.isdigit():
+        return jsonify({'error': 'Parâmetro since deve ser um número inteiro não negativo'}), 400
+    since = int(since)
+    
+    tabelas = {t for t in request.args.get('tables', '').split(',') if t} or None
+    if session['user_type'] not in ['administrador', 'tecnico']:
+        tabelas = set(TABELAS_DIARIO_CLIENTE) & tabelas if tabelas else set(TABELAS_DIARIO_CLIENTE)
+    
+    limite = min(max(request.args.get('limit', 500, type=int), 1), MAX_ALTERACOES_POR_PAGINA)
+    
+    epoca = request.args.get('epoca')
+    if epoca and epoca != change_tracking.epoca:
+        # Versão de outra execução: recomeçar do zero
+        resultado = change_tracking.alteracoes_desde(change_tracking.versao_atual(), tabelas, limite)._replace(completo=False)
+    else:
+        resultado = change_tracking.alteracoes_desde(since, tabelas, limite)
+    
+    return jsonify({
+        'epoca': change_tracking.epoca,
+        'versao': resultado.versao,
+        'completo': resultado.completo,
+        'tem_mais': resultado.tem_mais,
+        'alteracoes': resultado.registros
+    })
+
 @helpdesk_bp.route('/test-notifications')
 @login_required
 def test_notifications():
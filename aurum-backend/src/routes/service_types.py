@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, User
 from src.models.service_type import ServiceType
+from src.utils.change_tracking import etag_condicional
 
 service_types_bp = Blueprint('service_types', __name__)
 
@@ -13,6 +14,7 @@ def check_admin_permission():
     return user and user.profile == 'administrador'
 
 @service_types_bp.route('/service-types', methods=['GET'])
+@etag_condicional('service_types')
 def get_service_types():
     """Lista todos os tipos de serviço ativos"""
     try:
@@ -5,6 +5,9 @@ from src.models.client import Client
 from src.models.service_type import ServiceType
 from flask_cors import cross_origin
 from datetime import datetime
+from sqlalchemy import func
+from src.utils.status_counters import status_counters
+from src.utils.change_tracking import etag_condicional
 from src.models.ticket_response import TicketResponse # Movido para o topo
 
 # Importar função de notificação do helpdesk
@@ -53,6 +56,7 @@ def require_auth():
 
 @tickets_bp.route('/tickets', methods=['GET'])
 @cross_origin()
+@etag_condicional('tickets', 'user')
 def get_tickets():
     auth_error = require_auth()
     if auth_error:
@@ -293,23 +297,24 @@ def get_ticket_stats():
         user_profile = session['profile']
         
         if user_profile in ['administrador', 'tecnico']:
-            total_tickets = Ticket.query.count()
-            open_tickets = Ticket.query.filter_by(status='aberto').count()
-            in_progress_tickets = Ticket.query.filter_by(status='em_andamento').count()
-            closed_tickets = Ticket.query.filter_by(status='fechado').count()
+            counts = status_counters.contagens('tickets')
         else:
+            # Contagem do próprio usuário em uma única consulta agrupada
             user_id = session['user_id']
-            total_tickets = Ticket.query.filter_by(user_id=user_id).count()
-            open_tickets = Ticket.query.filter_by(user_id=user_id, status='aberto').count()
-            in_progress_tickets = Ticket.query.filter_by(user_id=user_id, status='em_andamento').count()
-            closed_tickets = Ticket.query.filter_by(user_id=user_id, status='fechado').count()
+            counts = dict(
+                db.session.query(Ticket.status, func.count(Ticket.id))
+                .filter(Ticket.user_id == user_id)
+                .group_by(Ticket.status)
+                .all()
+            )
+            counts['total'] = sum(counts.values())
         
         return jsonify({
             'stats': {
-                'total': total_tickets,
-                'aberto': open_tickets,
-                'em_andamento': in_progress_tickets,
-                'fechado': closed_tickets
+                'total': counts.get('total', 0),
+                'aberto': counts.get('aberto', 0),
+                'em_andamento': counts.get('em_andamento', 0),
+                'fechado': counts.get('fechado', 0)
             }
         }), 200
         
@@ -1,12 +1,17 @@
 // Sistema de Notificações em Tempo Real com WebSocket
+// Cliente único: o servidor envia `unread_count` e `notification` pelo socket;
+// o polling de /api/notificacoes/nao_lidas só roda (lento) enquanto o socket está desconectado.
 class RealTimeNotificationManager {
     constructor() {
         this.socket = null;
         this.isConnected = false;
         this.userType = null;
         this.permissionGranted = false;
-        this.notificationSound = null;
-        this.lastNotificationId = 0;
+        this.notificationSounds = {};
+        this.lastCount = null;
+        this.lastVersion = null;
+        this.fallbackInterval = 60000; // 60 segundos, só com o socket desconectado
+        this.heartbeatInterval = 30000; // Presença: o servidor decide entre push e email
         
         // Inicializar automaticamente
         this.init();
@@ -24,25 +29,23 @@ class RealTimeNotificationManager {
             return;
         }
 
+        // Configurar som
+        this.setupNotificationSound();
+        
+        // Polling lento enquanto o socket não conecta (ou se cair)
+        this.startPollingFallback();
+        
         try {
-            // Solicitar permissões
-            await this.requestPermissions();
-            
-            // Configurar som
-            this.setupNotificationSound();
-            
             // Conectar WebSocket
             this.connectWebSocket();
             
-            // Backup: polling como fallback
-            this.startPollingBackup();
+            // Solicitar permissões
+            await this.requestPermissions();
             
             console.log('✅ Sistema de notificações inicializado com sucesso!');
             
         } catch (error) {
             console.error('❌ Erro ao inicializar notificações:', error);
-            // Fallback para sistema básico
-            this.startPollingBackup();
         }
     }
 
@@ -153,46 +156,51 @@ class RealTimeNotificationManager {
     }
 
     connectWebSocket() {
-        try {
-            // Conectar usando Socket.IO
-            this.socket = io();
-            
-            this.socket.on('connect', () => {
-                console.log('🔗 WebSocket conectado');
-                this.isConnected = true;
-                
-                // Registrar para receber notificações
-                this.socket.emit('join_notifications', {
-                    user_type: this.userType
-                });
-                
-                this.updateConnectionStatus(true);
-            });
-
-            this.socket.on('disconnect', () => {
-                console.log('🔗 WebSocket desconectado');
-                this.isConnected = false;
-                this.updateConnectionStatus(false);
-                
-                // Tentar reconectar após 5 segundos
-                setTimeout(() => {
-                    if (!this.isConnected) {
-                        console.log('🔄 Tentando reconectar...');
-                        this.socket.connect();
-                    }
-                }, 5000);
-            });
+        if (typeof io === 'undefined') {
+            console.warn('⚠️ Socket.IO não carregado - usando polling');
+            return;
+        }
+        
+        // Conectar usando Socket.IO (reconexão automática do próprio cliente), só com os
+        // transportes aceitos pelo servidor (SOCKETIO_TRANSPORTS)
+        const transports = document.body.getAttribute('data-socket-transports');
+        this.socket = transports ? io({ transports: transports.split(',') }) : io();
+        
+        this.socket.on('connect', () => {
+            console.log('🔗 WebSocket conectado');
+            this.isConnected = true;
+            this.updateConnectionStatus(true);
+        });
 
-            // Escutar novos tickets
-            this.socket.on('new_ticket', (data) => {
-                console.log('🎫 Novo ticket recebido via WebSocket:', data);
-                this.handleNewTicketNotification(data);
-            });
+        // Heartbeat de presença enquanto a página está aberta
+        setInterval(() => {
+            if (this.isConnected) {
+                this.socket.emit('heartbeat');
+            }
+        }, this.heartbeatInterval);
 
-        } catch (error) {
-            console.error('❌ Erro ao conectar WebSocket:', error);
+        this.socket.on('disconnect', () => {
+            console.log('🔗 WebSocket desconectado - polling até reconectar');
             this.isConnected = false;
-        }
+            this.updateConnectionStatus(false);
+        });
+
+        // Contagem de não lidas (na conexão e a cada mudança)
+        this.socket.on('unread_count', (data) => {
+            this.applyCount(data);
+        });
+
+        // Nova notificação para este usuário
+        this.socket.on('notification', (data) => {
+            console.log('🎫 Notificação recebida via WebSocket:', data);
+            this.handleNotification(data);
+        });
+
+        // Rajada de eventos juntada pelo servidor num único lote
+        this.socket.on('batch', (data) => {
+            console.log(`📦 Lote de ${data.count} eventos recebido via WebSocket`);
+            this.handleBatch(data);
+        });
     }
 
     updateConnectionStatus(connected) {
@@ -204,7 +212,17 @@ class RealTimeNotificationManager {
         }
     }
 
-    async handleNewTicketNotification(data) {
+    applyCount(data) {
+        // Versão igual: nada mudou desde a última contagem
+        if (data.versao !== undefined && data.versao === this.lastVersion) return;
+        
+        const increased = this.lastCount !== null && data.count > this.lastCount;
+        this.lastCount = data.count;
+        this.lastVersion = data.versao;
+        this.updateNotificationBadge(data.count, increased);
+    }
+
+    async handleNotification(data) {
         try {
             // Tocar som
             this.playNotificationSound('newTicket');
@@ -212,10 +230,7 @@ class RealTimeNotificationManager {
             // Mostrar notificação do navegador
             await this.showBrowserNotification(data);
             
-            // Atualizar badge
-            this.updateNotificationBadge();
-            
-            // Mostrar toast na página (se implementado)
+            // Mostrar toast na página
             this.showToastNotification(data);
             
         } catch (error) {
@@ -223,42 +238,49 @@ class RealTimeNotificationManager {
         }
     }
 
+    handleBatch(data) {
+        const total = (data.events && data.events.notification) || 0;
+        const notifications = data.items
+            .filter(item => item.event === 'notification')
+            .map(item => item.data);
+        
+        if (total === 1) {
+            this.handleNotification(notifications[0]);
+        } else if (total > 1) {
+            // Um único aviso para a rajada inteira
+            const latest = notifications[notifications.length - 1];
+            this.handleNotification({
+                titulo: `${total} novas notificações`,
+                mensagem: latest ? `Mais recente: ${latest.titulo}` : '',
+                chamado_id: null
+            });
+        }
+    }
+
+    notificationUrl(data) {
+        return data.chamado_id ? `/chamado/${data.chamado_id}` : '/notificacoes';
+    }
+
     async showBrowserNotification(data) {
         if (!this.permissionGranted) return;
 
         const options = {
-            body: `Chamado: ${data.ticket?.titulo || 'Novo chamado'}\nPrioridade: ${data.ticket?.prioridade || 'Média'}`,
+            body: data.mensagem || '',
             icon: '/static/assets/notification-icon.png',
             badge: '/static/assets/notification-icon.png',
-            tag: `ticket-${data.ticket?.id}`,
+            tag: data.chamado_id ? `ticket-${data.chamado_id}` : `notificacao-${data.id}`,
             requireInteraction: true,
-            actions: [
-                {
-                    action: 'view',
-                    title: '👁️ Ver Chamado',
-                    icon: '/static/assets/notification-icon.png'
-                },
-                {
-                    action: 'dismiss',
-                    title: '❌ Dispensar'
-                }
-            ],
             data: {
-                ticketId: data.ticket?.id,
-                url: data.ticket?.id ? `/chamado/${data.ticket.id}` : '/chamados'
+                url: this.notificationUrl(data)
             }
         };
 
-        const notification = new Notification('🎫 Novo Chamado Aberto!', options);
+        const notification = new Notification(`🎫 ${data.titulo || 'Nova notificação'}`, options);
 
         // Configurar cliques
         notification.onclick = () => {
             window.focus();
-            if (data.ticket?.id) {
-                window.location.href = `/chamado/${data.ticket.id}`;
-            } else {
-                window.location.href = '/chamados';
-            }
+            window.location.href = this.notificationUrl(data);
             notification.close();
         };
 
@@ -279,7 +301,7 @@ class RealTimeNotificationManager {
         // Auto-remover após 8 segundos
         setTimeout(() => {
             toast.classList.remove('show');
-            setTimeout(() => document.body.removeChild(toast), 300);
+            setTimeout(() => toast.remove(), 300);
         }, 8000);
     }
 
@@ -289,21 +311,18 @@ class RealTimeNotificationManager {
         toast.innerHTML = `
             <div class="toast-icon">🎫</div>
             <div class="toast-content">
-                <div class="toast-title">Novo Chamado</div>
-                <div class="toast-message">${data.ticket?.titulo || 'Chamado sem título'}</div>
-                <div class="toast-meta">Prioridade: ${data.ticket?.prioridade || 'Média'}</div>
+                <div class="toast-title"></div>
+                <div class="toast-message"></div>
             </div>
             <button class="toast-close" onclick="this.parentElement.remove()">×</button>
         `;
+        toast.querySelector('.toast-title').textContent = data.titulo || 'Nova notificação';
+        toast.querySelector('.toast-message').textContent = data.mensagem || '';
         
         // Adicionar evento de clique
         toast.addEventListener('click', (e) => {
             if (!e.target.classList.contains('toast-close')) {
-                if (data.ticket?.id) {
-                    window.location.href = `/chamado/${data.ticket.id}`;
-                } else {
-                    window.location.href = '/chamados';
-                }
+                window.location.href = this.notificationUrl(data);
             }
         });
         
@@ -348,40 +367,52 @@ class RealTimeNotificationManager {
         }
     }
 
-    async updateNotificationBadge() {
-        try {
-            const response = await fetch('/api/notificacoes/nao_lidas');
-            if (!response.ok) return;
-            
-            const data = await response.json();
-            const count = data.count;
+    updateNotificationBadge(count, increased = false) {
+        const badge = document.getElementById('notification-badge');
+        if (!badge) return;
+        
+        if (count > 0) {
+            badge.textContent = count;
+            badge.style.display = 'inline';
             
-            const badge = document.getElementById('notification-badge');
-            if (badge) {
-                if (count > 0) {
-                    badge.textContent = count;
-                    badge.style.display = 'inline';
-                    badge.classList.add('pulse');
-                    
-                    // Remover animação após 2 segundos
-                    setTimeout(() => badge.classList.remove('pulse'), 2000);
-                } else {
-                    badge.style.display = 'none';
-                }
+            if (increased) {
+                badge.classList.add('pulse');
+                // Remover animação após 2 segundos
+                setTimeout(() => badge.classList.remove('pulse'), 2000);
             }
+        } else {
+            badge.style.display = 'none';
+        }
+    }
+
+    async fetchCount() {
+        try {
+            // Com a versão atual o servidor responde 304 sem corpo
+            const url = this.lastVersion !== null
+                ? `/api/notificacoes/nao_lidas?versao=${this.lastVersion}`
+                : '/api/notificacoes/nao_lidas';
+            const response = await fetch(url);
+            if (response.status === 304 || !response.ok) return;
+            
+            this.applyCount(await response.json());
             
         } catch (error) {
             console.error('Erro ao atualizar badge:', error);
         }
     }
 
-    startPollingBackup() {
-        // Polling como backup quando WebSocket não está disponível
+    startPollingFallback() {
+        // Primeira contagem, caso o socket demore a conectar
+        setTimeout(() => {
+            if (!this.isConnected) this.fetchCount();
+        }, 3000);
+        
+        // Polling só quando o WebSocket não está disponível
         setInterval(() => {
             if (!this.isConnected) {
-                this.updateNotificationBadge();
+                this.fetchCount();
             }
-        }, 30000); // A cada 30 segundos quando offline
+        }, this.fallbackInterval);
     }
 
     // Método público para reativar notificações
@@ -405,17 +436,15 @@ class RealTimeNotificationManager {
     
     // Método público para testar
     testNotification() {
-        const testData = {
-            message: 'Teste de notificação',
-            ticket: {
-                id: 999,
-                titulo: 'Chamado de Teste',
-                prioridade: 'alta'
-            },
-            timestamp: new Date().toISOString()
-        };
-        
-        this.handleNewTicketNotification(testData);
+        this.handleNotification({
+            id: 0,
+            origem: 'evento',
+            titulo: 'Novo chamado: Chamado de Teste',
+            mensagem: 'Teste de notificação - Prioridade: alta',
+            tipo: 'novo_chamado',
+            chamado_id: null,
+            data_criacao: new Date().toISOString()
+        });
     }
     
     // Método público para verificar status
@@ -424,8 +453,10 @@ class RealTimeNotificationManager {
             permissionGranted: this.permissionGranted,
             isConnected: this.isConnected,
             userType: this.userType,
+            unreadCount: this.lastCount,
+            version: this.lastVersion,
             browserSupported: 'Notification' in window,
-            permission: Notification.permission
+            permission: 'Notification' in window ? Notification.permission : 'unsupported'
         };
     }
 }
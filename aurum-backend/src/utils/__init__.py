@@ -1,10 +1,11 @@
 from functools import wraps
-from flask import session, redirect, url_for, flash
+from flask import redirect, url_for, flash
+from src.utils.current_user import usuario_atual
 
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if usuario_atual() is None:
             flash('Você precisa fazer login para acessar esta página!', 'error')
             return redirect(url_for('helpdesk.login'))
         return f(*args, **kwargs)
@@ -13,7 +14,8 @@ def login_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_type' not in session or session['user_type'] != 'administrador':
+        usuario = usuario_atual()
+        if usuario is None or usuario.tipo != 'administrador':
             flash('Acesso negado! Apenas administradores podem acessar esta página.', 'error')
             return redirect(url_for('helpdesk.login'))
         return f(*args, **kwargs)
@@ -22,7 +24,8 @@ def admin_required(f):
 def admin_or_tecnico_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_type' not in session or session['user_type'] not in ['administrador', 'tecnico']:
+        usuario = usuario_atual()
+        if usuario is None or usuario.tipo not in ['administrador', 'tecnico']:
             flash('Acesso negado! Apenas administradores e técnicos podem acessar esta página.', 'error')
             return redirect(url_for('helpdesk.login'))
         return f(*args, **kwargs)
@@ -1,7 +1,7 @@
 from flask import request, session, g
 from src.models.activity_log import ActivityLog
 from src.models.user import db
-from src.models.helpdesk_models import Usuario
+from src.utils.current_user import usuario_atual
 import time
 import functools
 import traceback
@@ -27,20 +27,13 @@ class ActivityLogger:
             # Informações da sessão
             user_info['session_id'] = session.get('session_id', str(session.sid) if hasattr(session, 'sid') else None)
             
-            # Sistema helpdesk
-            if 'user_id' in session:
-                user_info['user_id'] = session['user_id']
-                user_info['user_name'] = session.get('user_name')
-                user_info['user_type'] = session.get('user_type')
-                user_info['user_email'] = session.get('user_email')
-                
-                # Se não temos nome na sessão, buscar no banco
-                if not user_info['user_name'] and user_info['user_id']:
-                    user = Usuario.query.get(user_info['user_id'])
-                    if user:
-                        user_info['user_name'] = user.nome
-                        user_info['user_email'] = user.email
-                        user_info['user_type'] = user.tipo_usuario
+            # Sistema helpdesk (g.current_user, carregado uma vez por requisição)
+            usuario = usuario_atual()
+            if usuario:
+                user_info['user_id'] = usuario.id
+                user_info['user_name'] = usuario.nome
+                user_info['user_type'] = usuario.tipo
+                user_info['user_email'] = usuario.email
         
         except Exception as e:
             print(f"Erro ao obter informações do usuário para log: {e}")
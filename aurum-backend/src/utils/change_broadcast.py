@@ -0,0 +1,73 @@
+import pickle
+import uuid
+
+class ChangeBroadcast:
+    """
+    Repassa as alterações confirmadas aos outros processos pela fila de mensagens.
+    Caches e versões em memória (reference_cache, status_counters, change_tracking,
+    sla_analytics) só veem os commits do próprio processo; com vários workers, cada
+    um publica seus commits e aplica os dos outros nos mesmos ouvintes de commit.
+    Sem fila suportada para isso, o 304 de etag_condicional é desligado: versões locais
+    não bastam para afirmar que nada mudou.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._fila = None
+        self._origem = uuid.uuid4().hex  # Identifica as mensagens deste processo
+
+        # Configurações padrão
+        self.config = {
+            'url': None,  # Mesma fila do Socket.IO (SOCKETIO_MESSAGE_QUEUE)
+            'channel': 'aurum-alteracoes'
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        from src.utils.change_tracking import change_tracking
+        from src.utils.database_logging_hooks import database_logging_hooks
+        from src.utils.message_queue import abrir_fila, fila_suportada
+
+        self.app = app
+        self.config.update({
+            'url': app.config.get('CHANGE_BROADCAST_URL', app.config.get('SOCKETIO_MESSAGE_QUEUE')),
+            'channel': app.config.get('CHANGE_BROADCAST_CHANNEL',
+                                      f"{app.config.get('SOCKETIO_CHANNEL', 'aurum-socketio')}-alteracoes")
+        })
+
+        if not self.config['url']:
+            return  # Um processo só: os ouvintes já veem todos os commits
+
+        if not fila_suportada(self.config['url']):
+            print(f"Fila {self.config['url']} não repassa alterações entre processos: "
+                  f"respostas 304 desligadas (etag_condicional)")
+            change_tracking.config['conditional_get'] = False
+            return
+
+        self._fila = abrir_fila(self.config['url'], self.config['channel'])
+        self._fila.assinar(self._receber)
+        database_logging_hooks.register_commit_listener(self.publicar)
+
+    def publicar(self, alteracoes):
+        """Ouvinte de commit: envia as alterações deste processo aos demais"""
+        if self._fila is None:
+            return
+        try:
+            self._fila.publicar(pickle.dumps({'origem': self._origem, 'alteracoes': alteracoes}))
+        except Exception as e:
+            print(f"Erro ao publicar alterações na fila: {e}")
+
+    def _receber(self, mensagem):
+        """Aplica as alterações de outro processo nos ouvintes de commit locais"""
+        from src.utils.database_logging_hooks import database_logging_hooks
+
+        dados = pickle.loads(mensagem)
+        if dados['origem'] == self._origem:
+            return
+        database_logging_hooks.dispatch_changes(dados['alteracoes'], skip=self.publicar)
+
+# Instância global
+change_broadcast = ChangeBroadcast()
@@ -0,0 +1,175 @@
+import functools
+import hashlib
+import threading
+import uuid
+from collections import deque, namedtuple
+
+from flask import request, session, make_response
+
+# Resultado de alteracoes_desde; `versao` é de onde o cliente continua na próxima chamada
+Alteracoes = namedtuple('Alteracoes', 'registros completo tem_mais versao')
+
+class ChangeTracking:
+    """
+    Diário de alterações alimentado pelos hooks de commit do banco.
+    Cada linha alterada recebe uma versão global crescente (tabela, id, operação, versão);
+    a versão de cada tabela é a da sua última alteração. Permite saber o que mudou
+    desde uma versão sem consultar as tabelas: base dos ETags (etag_condicional),
+    do feed /api/changes e dos assinantes em processo (inscrever).
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._versao = 0
+        self._versoes = {}
+        self._diario = deque()
+        self._assinantes = []
+        self._lock = threading.Lock()
+
+        # Muda a cada inicialização: ETags emitidos antes de reiniciar deixam de valer
+        self._epoca = uuid.uuid4().hex[:12]
+
+        # Configurações padrão
+        self.config = {
+            'max_age': 0,  # 0 = o navegador revalida sempre (If-None-Match)
+            'conditional_get': True,  # Responder 304; desligado por ChangeBroadcast sem fila entre processos
+            'journal_size': 10000  # Alterações mantidas em memória para /api/changes
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        from src.utils.database_logging_hooks import database_logging_hooks
+
+        self.app = app
+        self.config.update({
+            'max_age': app.config.get('CONDITIONAL_GET_MAX_AGE', self.config['max_age']),
+            'journal_size': app.config.get('CHANGE_JOURNAL_SIZE', self.config['journal_size'])
+        })
+        self._diario = deque(self._diario, maxlen=self.config['journal_size'])
+
+        database_logging_hooks.register_commit_listener(self.aplicar_alteracoes)
+
+    def aplicar_alteracoes(self, alteracoes):
+        """Ouvinte de commit: registra cada alteração no diário e avisa os assinantes"""
+        registradas = []
+        with self._lock:
+            for alteracao in alteracoes:
+                self._versao += 1
+                registro = {
+                    'versao': self._versao,
+                    'tabela': alteracao['table'],
+                    'id': alteracao['id'],  # None em alterações em massa: reler a tabela
+                    'operacao': alteracao['operation']
+                }
+                self._diario.append(registro)
+                self._versoes[registro['tabela']] = self._versao
+                registradas.append(registro)
+            assinantes = list(self._assinantes)
+
+        for callback, tabelas in assinantes:
+            selecionadas = [r for r in registradas if tabelas is None or r['tabela'] in tabelas]
+            if not selecionadas:
+                continue
+            try:
+                callback(selecionadas)
+            except Exception as e:
+                print(f"Erro em assinante do diário de alterações: {e}")
+
+    def inscrever(self, callback, tabelas=None):
+        """
+        Assina as alterações confirmadas: callback(lista de registros) após cada commit.
+        `tabelas` limita às tabelas informadas. Retorna o próprio callback.
+        """
+        with self._lock:
+            self._assinantes.append((callback, frozenset(tabelas) if tabelas else None))
+        return callback
+
+    def cancelar_inscricao(self, callback):
+        with self._lock:
+            self._assinantes = [(c, t) for c, t in self._assinantes if c is not callback]
+
+    @property
+    def epoca(self):
+        """Identificador desta execução; versões de outra época não são comparáveis"""
+        return self._epoca
+
+    def versao_atual(self):
+        with self._lock:
+            return self._versao
+
+    def versao(self, tabela):
+        """Versão da última alteração da tabela (0 se não mudou desde a inicialização)"""
+        with self._lock:
+            return self._versoes.get(tabela, 0)
+
+    def alteracoes_desde(self, versao, tabelas=None, limite=500):
+        """
+        Registros com versão maior que `versao`, em ordem, até `limite`.
+        completo=False quando o diário já descartou parte do intervalo (ou a versão
+        é de outra execução): o cliente precisa reler tudo e seguir da versão atual.
+        """
+        with self._lock:
+            atual = self._versao
+            mais_antiga = self._diario[0]['versao'] if self._diario else atual + 1
+            if not mais_antiga - 1 <= versao <= atual:
+                return Alteracoes([], False, False, atual)
+            registros = [
+                r for r in self._diario
+                if r['versao'] > versao and (tabelas is None or r['tabela'] in tabelas)
+            ]
+
+        if len(registros) > limite:
+            return Alteracoes(registros[:limite], True, True, registros[limite - 1]['versao'])
+        return Alteracoes(registros, True, False, atual)
+
+    def etag(self, tabelas, *escopo):
+        """ETag forte a partir das versões das tabelas e do escopo informado"""
+        with self._lock:
+            versoes = ','.join(f'{tabela}:{self._versoes.get(tabela, 0)}' for tabela in tabelas)
+        chave = '|'.join([self._epoca, versoes] + [str(parte) for parte in escopo])
+        return hashlib.sha1(chave.encode()).hexdigest()
+
+# Instância global
+change_tracking = ChangeTracking()
+
+def etag_condicional(*tabelas):
+    """
+    Decorator para endpoints JSON de leitura que dependem só de `tabelas`.
+    O ETag combina as versões das tabelas, o perfil/usuário da sessão e a URL;
+    If-None-Match igual responde 304 antes de executar a view.
+    Deve ficar abaixo dos decorators de autenticação; requisições sem login vão direto
+    para a view (que recusa ou responde normalmente), sem ETag nem 304.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated_function(*args, **kwargs):
+            if 'user_id' not in session:
+                return f(*args, **kwargs)
+
+            etag = change_tracking.etag(
+                tabelas,
+                session.get('user_type') or session.get('profile'),
+                session.get('user_id'),
+                request.full_path
+            )
+
+            if change_tracking.config['conditional_get'] and request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.cache_control.private = True
+            if change_tracking.config['max_age']:
+                response.cache_control.max_age = change_tracking.config['max_age']
+            else:
+                response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,52 @@
+"""
+Usuário logado da requisição atual (g.current_user).
+Montado no primeiro acesso da requisição a partir do id da sessão e do cadastro em
+reference_cache; o banco só é consultado quando o cadastro não está em cache.
+"""
+from collections import namedtuple
+
+from flask import g, session, has_request_context
+
+UsuarioAtual = namedtuple('UsuarioAtual', 'id tipo empresa_id nome email')
+
+# Chaves gravadas na sessão pelo login (ver gravar_sessao)
+CHAVES_SESSAO = ('user_id', 'user_type', 'user_empresa_id', 'user_name', 'user_email')
+
+def gravar_sessao(usuario):
+    """Grava na sessão os dados do usuário usados por g.current_user"""
+    session['user_id'] = usuario.id
+    session['user_name'] = usuario.nome
+    session['user_type'] = usuario.tipo_usuario
+    session['user_email'] = usuario.email
+    session['user_empresa_id'] = usuario.empresa_id
+    g.pop('current_user', None)
+
+def _carregar():
+    if 'user_id' not in session:
+        return None
+
+    # Tipo e empresa vêm do cadastro (reference_cache, invalidado a cada commit), não da
+    # sessão: mudanças feitas por um administrador valem já na próxima requisição
+    from src.utils.reference_cache import reference_cache
+
+    cadastro = reference_cache.usuario(session['user_id'])
+    if cadastro is None or not cadastro.ativo:
+        # Usuário excluído ou desativado: a sessão deixa de valer
+        for chave in CHAVES_SESSAO:
+            session.pop(chave, None)
+        return None
+
+    usuario = UsuarioAtual(cadastro.id, cadastro.tipo_usuario, cadastro.empresa_id, cadastro.nome, cadastro.email)
+
+    # Mantém a sessão em dia para quem ainda lê session['user_type'] etc.
+    if any(session.get(chave) != valor for chave, valor in zip(CHAVES_SESSAO, usuario)):
+        session.update(zip(CHAVES_SESSAO, usuario))
+    return usuario
+
+def usuario_atual():
+    """Usuário logado da requisição; None fora de requisição ou sem login"""
+    if not has_request_context():
+        return None
+    if 'current_user' not in g:
+        g.current_user = _carregar()
+    return g.current_user
@@ -11,6 +11,7 @@ class DatabaseLoggingHooks:
     def __init__(self, app=None):
         self.app = app
         self.tracked_models = set()
+        self.commit_listeners = []
         if app is not None:
             self.init_app(app)
     
@@ -18,6 +19,7 @@ class DatabaseLoggingHooks:
         """Inicializa os hooks com a aplicação Flask"""
         # Registrar eventos SQLAlchemy
         event.listen(db.session, 'before_commit', self.before_commit)
+        event.listen(db.session, 'after_flush', self.after_flush)
         event.listen(db.session, 'after_commit', self.after_commit)
         event.listen(db.session, 'after_rollback', self.after_rollback)
         
@@ -242,8 +244,94 @@ class DatabaseLoggingHooks:
         
         self.pending_logs.append(log_entry_data)
     
+    def register_commit_listener(self, listener):
+        """
+        Registra uma função chamada após cada commit com a lista de alterações confirmadas.
+        Cada alteração é um dict com 'table', 'id', 'operation' (insert, update, delete),
+        'old' e 'new' (apenas colunas alteradas no update). Em alterações em massa
+        (ver record_bulk_change) 'id' é None e os valores não são conhecidos.
+        """
+        if listener not in self.commit_listeners:
+            self.commit_listeners.append(listener)
+    
+    def dispatch_changes(self, changes, skip=None):
+        """Entrega alterações confirmadas aos ouvintes (exceto `skip`)"""
+        for listener in list(self.commit_listeners):
+            if listener is skip:
+                continue
+            try:
+                listener(changes)
+            except Exception as e:
+                print(f"Erro em ouvinte de commit: {e}")
+    
+    def record_bulk_change(self, table, operation='update', session=None):
+        """
+        Registra uma alteração feita fora do ORM (query.update/delete, SQL direto),
+        para que os ouvintes invalidem o que depende da tabela após o commit
+        """
+        session = session or db.session
+        session.info.setdefault('committed_changes', []).append({
+            'table': table,
+            'id': None,
+            'operation': operation,
+            'old': {},
+            'new': {}
+        })
+    
+    def describe_change(self, instance, operation):
+        """Descreve a alteração de uma instância (valores crus, sem serialização)"""
+        from sqlalchemy.inspection import inspect
+        state = inspect(instance)
+        old_values, new_values = {}, {}
+        
+        for attr in state.mapper.column_attrs:
+            if operation == 'insert':
+                new_values[attr.key] = state.dict.get(attr.key)
+            elif operation == 'delete':
+                old_values[attr.key] = state.dict.get(attr.key)
+            else:
+                history = state.attrs[attr.key].history
+                if history.added or history.deleted:
+                    old_values[attr.key] = history.deleted[0] if history.deleted else None
+                    new_values[attr.key] = history.added[0] if history.added else None
+        
+        if operation == 'update' and not new_values:
+            return None
+        
+        return {
+            'table': getattr(instance, '__tablename__', type(instance).__name__),
+            'id': self.get_primary_key(instance),
+            'operation': operation,
+            'old': old_values,
+            'new': new_values
+        }
+    
+    def after_flush(self, session, flush_context):
+        """Evento após flush - guarda as alterações até o commit"""
+        if not self.commit_listeners:
+            return
+        
+        changes = session.info.setdefault('committed_changes', [])
+        for operation, instances in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+            for instance in instances:
+                # Não repassar o próprio ActivityLog
+                if getattr(instance, '__tablename__', None) == 'activity_logs':
+                    continue
+                try:
+                    change = self.describe_change(instance, operation)
+                except Exception as e:
+                    print(f"Erro ao registrar alteração para ouvintes de commit: {e}")
+                    continue
+                if change:
+                    changes.append(change)
+    
     def after_commit(self, session):
-        """Evento após commit bem-sucedido - salva logs"""
+        """Evento após commit bem-sucedido - avisa ouvintes e salva logs"""
+        # Retirar antes de salvar logs: o log faz outro commit na mesma sessão
+        changes = session.info.pop('committed_changes', None)
+        if changes:
+            self.dispatch_changes(changes)
+        
         if not hasattr(self, 'pending_logs'):
             return
         
@@ -258,7 +346,8 @@ class DatabaseLoggingHooks:
         self.pending_logs = []
     
     def after_rollback(self, session):
-        """Evento após rollback - limpa logs pendentes"""
+        """Evento após rollback - limpa logs e alterações pendentes"""
+        session.info.pop('committed_changes', None)
         if hasattr(self, 'pending_logs'):
             self.pending_logs = []
 
@@ -1,6 +1,5 @@
 from flask import session, request, has_request_context
-from src.models.helpdesk_models import Usuario
-import traceback
+from src.utils.current_user import usuario_atual
 
 def debug_session_info():
     """Função de debug para verificar informações da sessão"""
@@ -26,22 +25,16 @@ def debug_session_info():
         print(f"Endpoint: {request.endpoint}")
         print(f"IP: {request.remote_addr}")
     
-    # Tentar buscar usuário no banco se temos ID
-    user_id = session.get('user_id')
-    if user_id:
-        try:
-            user = Usuario.query.get(user_id)
-            if user:
-                print(f"[OK] Usuário encontrado no banco:")
-                print(f"   - Nome: {user.nome}")
-                print(f"   - Email: {user.email}")
-                print(f"   - Tipo: {user.tipo_usuario}")
-                print(f"   - Ativo: {user.ativo}")
-            else:
-                print(f"[ERRO] Usuário ID {user_id} NÃO encontrado no banco")
-        except Exception as e:
-            print(f"[ERRO] Erro ao buscar usuário no banco: {e}")
-            print(f"Traceback: {traceback.format_exc()}")
+    # Usuário da requisição (g.current_user), sem nova consulta ao banco
+    user = usuario_atual()
+    if user:
+        print(f"[OK] Usuário da requisição:")
+        print(f"   - Nome: {user.nome}")
+        print(f"   - Email: {user.email}")
+        print(f"   - Tipo: {user.tipo}")
+        print(f"   - Empresa: {user.empresa_id}")
+    elif session.get('user_id'):
+        print(f"[ERRO] Usuário ID {session.get('user_id')} NÃO encontrado no banco")
     else:
         print("[ERRO] Nenhum user_id na sessão")
     
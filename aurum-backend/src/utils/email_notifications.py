@@ -326,17 +326,15 @@ class EmailNotifier:
             html_content=template['html']
         )
     
-    def notify_new_ticket_to_admins_and_technicians(self, chamado, cliente, empresa):
+    def notify_new_ticket_to_admins_and_technicians(self, chamado, cliente, empresa, destinatarios=None):
         """
-        Notifica administradores e técnicos sobre novo chamado
+        Notifica administradores e técnicos sobre novo chamado.
+        `destinatarios` restringe o envio (ex.: só quem está offline); padrão: todos os ativos
         """
-        from src.models.helpdesk_models import Usuario
+        from src.utils.reference_cache import reference_cache
         
         # Buscar todos os administradores e técnicos ativos
-        admin_tecnicos = Usuario.query.filter(
-            Usuario.ativo == True,
-            Usuario.tipo_usuario.in_(['administrador', 'tecnico'])
-        ).all()
+        admin_tecnicos = reference_cache.tecnicos_ativos() if destinatarios is None else destinatarios
         
         if not admin_tecnicos:
             return False
@@ -0,0 +1,90 @@
+from sqlalchemy import func, select, update
+
+from src.models.user import db
+
+class EmpresaBackfill:
+    """
+    Preenche Chamado.empresa_id dos chamados antigos a partir da empresa do solicitante.
+    As consultas por empresa filtram direto por Chamado.empresa_id; chamados legados
+    sem essa coluna ficariam de fora dos painéis e relatórios da empresa.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+
+        # Configurações padrão
+        self.config = {
+            'on_startup': True,  # Preencher na inicialização da aplicação
+            'batch_size': 1000  # Atualizar em lotes de 1000
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        self.config.update({
+            'on_startup': app.config.get('EMPRESA_BACKFILL_ON_STARTUP', self.config['on_startup']),
+            'batch_size': app.config.get('EMPRESA_BACKFILL_BATCH_SIZE', self.config['batch_size'])
+        })
+
+        self.register_cli_commands(app)
+
+    def register_cli_commands(self, app):
+        """Registra comando CLI para o preenchimento manual"""
+        @app.cli.command('backfill-empresa-chamados')
+        def backfill_empresa_chamados_command():
+            """Comando CLI para preencher a empresa dos chamados legados"""
+            with app.app_context():
+                pendentes = self.contar_pendentes()
+                atualizados = self.preencher()
+                print(f"Chamados pendentes: {pendentes}")
+                print(f"Chamados atualizados: {atualizados}")
+
+    def _pendentes(self):
+        from src.models.helpdesk_models import Usuario, Chamado
+        return select(Chamado.id).join(Usuario, Usuario.id == Chamado.usuario_id).where(
+            Chamado.empresa_id.is_(None),
+            Usuario.empresa_id.isnot(None)
+        )
+
+    def contar_pendentes(self):
+        """Chamados sem empresa cujo solicitante tem empresa vinculada"""
+        return db.session.execute(
+            select(func.count()).select_from(self._pendentes().subquery())
+        ).scalar()
+
+    def preencher(self):
+        """Executa o preenchimento em lotes; retorna o total de chamados atualizados"""
+        from src.models.helpdesk_models import Usuario, Chamado
+        from src.utils.database_logging_hooks import database_logging_hooks
+
+        empresa_do_solicitante = select(Usuario.empresa_id).where(
+            Usuario.id == Chamado.usuario_id
+        ).scalar_subquery()
+
+        total = 0
+        while True:
+            # correlate(None): o lote é uma subconsulta independente do UPDATE
+            lote = self._pendentes().limit(self.config['batch_size']).correlate(None)
+            resultado = db.session.execute(
+                update(Chamado)
+                .where(Chamado.id.in_(lote))
+                .values(empresa_id=empresa_do_solicitante)
+                .execution_options(synchronize_session=False)
+            )
+            if not resultado.rowcount:
+                db.session.rollback()
+                break
+
+            database_logging_hooks.record_bulk_change(Chamado.__tablename__)
+            db.session.commit()
+            total += resultado.rowcount
+
+        if total:
+            print(f"Empresa preenchida em {total} chamados legados")
+        return total
+
+# Instância global
+empresa_backfill = EmpresaBackfill()
@@ -10,9 +10,68 @@ import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.chart import BarChart, Reference
 import io
+import os
+import tempfile
 from datetime import datetime
 
+
+class _StoryStream(list):
+    """
+    Story do ReportLab alimentada por um gerador.
+
+    O ReportLab consome a story pela frente (flowables[0] / del flowables[0])
+    e consulta len() a cada passo; aqui só mantemos uma pequena janela de
+    flowables em memória e puxamos o restante do gerador conforme necessário.
+    """
+    
+    def __init__(self, gerador, janela=8):
+        super().__init__()
+        self._gerador = gerador
+        self._janela = janela
+        self._esgotado = False
+    
+    def _abastecer(self):
+        while not self._esgotado and list.__len__(self) < self._janela:
+            try:
+                self.append(next(self._gerador))
+            except StopIteration:
+                self._esgotado = True
+    
+    def __len__(self):
+        self._abastecer()
+        return list.__len__(self)
+
+
+class _LimiteChamados:
+    """Limite global de chamados listados em um PDF (None = sem limite)"""
+    
+    def __init__(self, maximo=None):
+        self.restante = maximo
+        self.atingido = False
+    
+    def disponivel(self):
+        if self.restante is not None and self.restante <= 0:
+            self.atingido = True
+            return False
+        return True
+    
+    def consumir(self, chamados):
+        if self.restante is not None and hasattr(chamados, 'limitar'):
+            # Só o que ainda cabe (+1 para saber se o limite foi atingido) sai do banco
+            chamados = chamados.limitar(self.restante + 1)
+        for chamado in chamados:
+            if self.restante is not None:
+                if self.restante <= 0:
+                    self.atingido = True
+                    return
+                self.restante -= 1
+            yield chamado
+
+
 class ReportExporter:
+    # Linhas por tabela de chamados; cada bloco cabe em uma página A4
+    LINHAS_POR_TABELA = 40
+    
     def __init__(self):
         self.styles = getSampleStyleSheet()
         self.title_style = ParagraphStyle(
@@ -32,20 +91,27 @@ class ReportExporter:
             textColor=colors.darkgreen
         )
         
-    def export_empresas_pdf(self, relatorio_data):
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        story = []
-        
+    def export_empresas_pdf(self, relatorio_data, caminho=None, max_chamados=None, apenas_resumo=False):
+        """
+        Gera o PDF do relatório de empresas direto em arquivo.
+
+        Os flowables são produzidos sob demanda e os chamados saem em tabelas
+        de tamanho fixo, então a memória não cresce com o volume de chamados.
+        Retorna o caminho do arquivo gerado.
+        """
+        caminho = caminho or self._novo_arquivo_pdf('relatorio_empresas_')
+        doc = SimpleDocTemplate(caminho, pagesize=A4)
+        doc.build(_StoryStream(self._story_empresas(relatorio_data, max_chamados, apenas_resumo)))
+        return caminho
+    
+    def _story_empresas(self, relatorio_data, max_chamados, apenas_resumo):
         # Título
-        title = Paragraph("Relatório de Empresas", self.title_style)
-        story.append(title)
+        yield Paragraph("Relatório de Empresas", self.title_style)
         
         # Data de geração
         date_str = datetime.now().strftime('%d/%m/%Y às %H:%M')
-        date_p = Paragraph(f"<i>Gerado em: {date_str}</i>", self.styles['Normal'])
-        story.append(date_p)
-        story.append(Spacer(1, 20))
+        yield Paragraph(f"<i>Gerado em: {date_str}</i>", self.styles['Normal'])
+        yield Spacer(1, 20)
         
         # Resumo geral
         total_empresas = len(relatorio_data)
@@ -74,18 +140,19 @@ class ReportExporter:
             ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
         
-        story.append(Paragraph("Resumo Geral", self.subtitle_style))
-        story.append(resumo_table)
-        story.append(Spacer(1, 30))
+        yield Paragraph("Resumo Geral", self.subtitle_style)
+        yield resumo_table
+        yield Spacer(1, 30)
         
         # Detalhes por empresa
-        story.append(Paragraph("Detalhes por Empresa", self.subtitle_style))
+        yield Paragraph("Detalhes por Empresa", self.subtitle_style)
+        
+        limite = _LimiteChamados(max_chamados)
         
         for empresa_data in relatorio_data:
             # Nome da empresa
-            empresa_title = Paragraph(f"<b>{empresa_data['empresa'].nome_empresa}</b>", 
-                                    ParagraphStyle('EmpresaTitle', fontSize=12, textColor=colors.darkblue))
-            story.append(empresa_title)
+            yield Paragraph(f"<b>{empresa_data['empresa'].nome_empresa}</b>", 
+                            ParagraphStyle('EmpresaTitle', fontSize=12, textColor=colors.darkblue))
             
             # Info básica da empresa
             info_lines = [
@@ -96,8 +163,8 @@ class ReportExporter:
                 f"Endereço: {empresa_data['empresa'].endereco if hasattr(empresa_data['empresa'], 'endereco') and empresa_data['empresa'].endereco else 'N/A'}"
             ]
             for info_line in info_lines:
-                story.append(Paragraph(info_line, self.styles['Normal']))
-            story.append(Spacer(1, 10))
+                yield Paragraph(info_line, self.styles['Normal'])
+            yield Spacer(1, 10)
             
             # Estatísticas da empresa
             stats_data = [
@@ -121,47 +188,48 @@ class ReportExporter:
                 ('GRID', (0, 0), (-1, -1), 1, colors.black)
             ]))
             
-            story.append(stats_table)
+            yield stats_table
             
             # Usuários que abriram chamados
             if empresa_data['usuarios_stats']:
-                story.append(Spacer(1, 15))
-                story.append(Paragraph("<b>Usuários que Abriram Chamados:</b>", self.styles['Normal']))
-                
-                users_data = [['Usuário', 'Email', 'Total', 'Abertos', 'Andamento', 'Finalizados']]
-                for user_stat in empresa_data['usuarios_stats']:
-                    if user_stat['total_chamados'] > 0:
-                        users_data.append([
-                            user_stat['usuario'].nome,
-                            user_stat['usuario'].email,
-                            str(user_stat['total_chamados']),
-                            str(user_stat['abertos']),
-                            str(user_stat['em_andamento']),
-                            str(user_stat['finalizados'])
-                        ])
+                users_rows = [
+                    [
+                        user_stat['usuario'].nome,
+                        user_stat['usuario'].email,
+                        str(user_stat['total_chamados']),
+                        str(user_stat['abertos']),
+                        str(user_stat['em_andamento']),
+                        str(user_stat['finalizados'])
+                    ]
+                    for user_stat in empresa_data['usuarios_stats'] if user_stat['total_chamados'] > 0
+                ]
                 
-                if len(users_data) > 1:
-                    users_table = Table(users_data)
-                    users_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.blue),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, -1), 8),
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.aliceblue),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                    ]))
-                    story.append(users_table)
+                if users_rows:
+                    yield Spacer(1, 15)
+                    yield Paragraph("<b>Usuários que Abriram Chamados:</b>", self.styles['Normal'])
+                    yield from self._tabelas_em_blocos(
+                        ['Usuário', 'Email', 'Total', 'Abertos', 'Andamento', 'Finalizados'],
+                        users_rows,
+                        [
+                            ('BACKGROUND', (0, 0), (-1, 0), colors.blue),
+                            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                            ('FONTSIZE', (0, 0), (-1, -1), 8),
+                            ('BACKGROUND', (0, 1), (-1, -1), colors.aliceblue),
+                            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+                        ]
+                    )
             
             # Técnicos que atenderam esta empresa
             if 'tecnicos_atenderam' in empresa_data and empresa_data['tecnicos_atenderam']:
-                story.append(Spacer(1, 15))
-                story.append(Paragraph("<b>Técnicos que Atenderam:</b>", self.styles['Normal']))
+                yield Spacer(1, 15)
+                yield Paragraph("<b>Técnicos que Atenderam:</b>", self.styles['Normal'])
                 
-                tecnicos_data = [['Técnico', 'Email', 'Chamados Atendidos', 'Finalizados', 'Taxa (%)']]
+                tecnicos_rows = []
                 for tecnico_stat in empresa_data['tecnicos_atenderam']:
                     taxa = (tecnico_stat['finalizados']/tecnico_stat['chamados_atendidos']*100) if tecnico_stat['chamados_atendidos'] > 0 else 0
-                    tecnicos_data.append([
+                    tecnicos_rows.append([
                         tecnico_stat['tecnico'].nome,
                         tecnico_stat['tecnico'].email,
                         str(tecnico_stat['chamados_atendidos']),
@@ -169,46 +237,43 @@ class ReportExporter:
                         f"{taxa:.1f}%"
                     ])
                 
-                tecnicos_table = Table(tecnicos_data)
-                tecnicos_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.purple),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 8),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.lavender),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                story.append(tecnicos_table)
+                yield from self._tabelas_em_blocos(
+                    ['Técnico', 'Email', 'Chamados Atendidos', 'Finalizados', 'Taxa (%)'],
+                    tecnicos_rows,
+                    [
+                        ('BACKGROUND', (0, 0), (-1, 0), colors.purple),
+                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                        ('FONTSIZE', (0, 0), (-1, -1), 8),
+                        ('BACKGROUND', (0, 1), (-1, -1), colors.lavender),
+                        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+                    ]
+                )
             
-            # Lista detalhada de chamados (últimos 10)
-            if 'chamados_detalhados' in empresa_data and empresa_data['chamados_detalhados']:
-                story.append(Spacer(1, 15))
-                story.append(Paragraph("<b>Últimos 10 Chamados Detalhados:</b>", self.styles['Normal']))
+            # Lista detalhada de chamados, em tabelas de tamanho fixo
+            if not apenas_resumo and empresa_data.get('chamados_detalhados') and limite.disponivel():
+                yield Spacer(1, 15)
+                yield Paragraph("<b>Chamados Detalhados:</b>", self.styles['Normal'])
                 
-                chamados_data = [['Título', 'Status', 'Prioridade', 'Data Abertura', 'Data Finalização', 'Usuário', 'Técnico', 'Tempo (dias)']]
-                # Mostrar apenas os últimos 10 chamados, ordenados por data
-                ultimos_chamados = sorted(empresa_data['chamados_detalhados'], key=lambda x: x['data_abertura'], reverse=True)[:10]
+                linhas = (
+                    [
+                        chamado_detail.titulo[:30] + '...' if len(chamado_detail.titulo) > 30 else chamado_detail.titulo,
+                        chamado_detail.status.replace('_', ' ').title(),
+                        chamado_detail.prioridade.title(),
+                        chamado_detail.data_abertura.strftime('%d/%m/%Y %H:%M') if chamado_detail.data_abertura else 'N/A',
+                        chamado_detail.data_finalizacao.strftime('%d/%m/%Y %H:%M') if chamado_detail.data_finalizacao else 'Em aberto',
+                        chamado_detail.usuario[:20],
+                        chamado_detail.tecnico[:15],
+                        f"{chamado_detail.tempo_resolucao}" if chamado_detail.tempo_resolucao is not None else 'N/A'
+                    ]
+                    for chamado_detail in limite.consumir(empresa_data['chamados_detalhados'])
+                )
                 
-                for chamado_detail in ultimos_chamados:
-                    data_abertura = chamado_detail['data_abertura'].strftime('%d/%m/%Y %H:%M') if chamado_detail['data_abertura'] else 'N/A'
-                    data_finalizacao = chamado_detail['data_finalizacao'].strftime('%d/%m/%Y %H:%M') if chamado_detail['data_finalizacao'] else 'Em aberto'
-                    tempo_resolucao = f"{chamado_detail['tempo_resolucao']}" if chamado_detail['tempo_resolucao'] is not None else 'N/A'
-                    
-                    chamados_data.append([
-                        chamado_detail['titulo'][:30] + '...' if len(chamado_detail['titulo']) > 30 else chamado_detail['titulo'],
-                        chamado_detail['status'].replace('_', ' ').title(),
-                        chamado_detail['prioridade'].title(),
-                        data_abertura,
-                        data_finalizacao,
-                        chamado_detail['usuario'][:20] if len(chamado_detail['usuario']) > 20 else chamado_detail['usuario'],
-                        chamado_detail['tecnico'][:15] if len(chamado_detail['tecnico']) > 15 else chamado_detail['tecnico'],
-                        tempo_resolucao
-                    ])
-                
-                if len(chamados_data) > 1:
-                    chamados_table = Table(chamados_data)
-                    chamados_table.setStyle(TableStyle([
+                yield from self._tabelas_em_blocos(
+                    ['Título', 'Status', 'Prioridade', 'Data Abertura', 'Data Finalização', 'Usuário', 'Técnico', 'Tempo (dias)'],
+                    linhas,
+                    [
                         ('BACKGROUND', (0, 0), (-1, 0), colors.darkred),
                         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
@@ -216,14 +281,14 @@ class ReportExporter:
                         ('FONTSIZE', (0, 0), (-1, -1), 6),
                         ('BACKGROUND', (0, 1), (-1, -1), colors.mistyrose),
                         ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                    ]))
-                    story.append(chamados_table)
+                    ]
+                )
             
-            story.append(Spacer(1, 30))
+            yield Spacer(1, 30)
         
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        if limite.atingido:
+            yield Paragraph(f"<i>Listagem de chamados limitada aos primeiros {max_chamados} registros.</i>",
+                            self.styles['Normal'])
     
     def export_empresas_excel(self, relatorio_data):
         buffer = io.BytesIO()
@@ -379,20 +444,20 @@ class ReportExporter:
             if 'chamados_detalhados' in empresa_data and empresa_data['chamados_detalhados']:
                 for chamado_detail in empresa_data['chamados_detalhados']:
                     chamados_sheet.write(chamado_row, 0, empresa_data['empresa'].nome_empresa, data_format)
-                    chamados_sheet.write(chamado_row, 1, chamado_detail['titulo'], data_format)
-                    chamados_sheet.write(chamado_row, 2, chamado_detail['status'].replace('_', ' ').title(), data_format)
-                    chamados_sheet.write(chamado_row, 3, chamado_detail['prioridade'].title(), data_format)
+                    chamados_sheet.write(chamado_row, 1, chamado_detail.titulo, data_format)
+                    chamados_sheet.write(chamado_row, 2, chamado_detail.status.replace('_', ' ').title(), data_format)
+                    chamados_sheet.write(chamado_row, 3, chamado_detail.prioridade.title(), data_format)
                     
                     # Datas formatadas
-                    data_abertura = chamado_detail['data_abertura'].strftime('%d/%m/%Y %H:%M') if chamado_detail['data_abertura'] else 'N/A'
-                    data_finalizacao = chamado_detail['data_finalizacao'].strftime('%d/%m/%Y %H:%M') if chamado_detail['data_finalizacao'] else 'Em aberto'
+                    data_abertura = chamado_detail.data_abertura.strftime('%d/%m/%Y %H:%M') if chamado_detail.data_abertura else 'N/A'
+                    data_finalizacao = chamado_detail.data_finalizacao.strftime('%d/%m/%Y %H:%M') if chamado_detail.data_finalizacao else 'Em aberto'
                     
                     chamados_sheet.write(chamado_row, 4, data_abertura, data_format)
                     chamados_sheet.write(chamado_row, 5, data_finalizacao, data_format)
-                    chamados_sheet.write(chamado_row, 6, chamado_detail['usuario'], data_format)
-                    chamados_sheet.write(chamado_row, 7, chamado_detail['tecnico'], data_format)
+                    chamados_sheet.write(chamado_row, 6, chamado_detail.usuario, data_format)
+                    chamados_sheet.write(chamado_row, 7, chamado_detail.tecnico, data_format)
                     
-                    tempo_resolucao = chamado_detail['tempo_resolucao'] if chamado_detail['tempo_resolucao'] is not None else 'N/A'
+                    tempo_resolucao = chamado_detail.tempo_resolucao if chamado_detail.tempo_resolucao is not None else 'N/A'
                     chamados_sheet.write(chamado_row, 8, tempo_resolucao, data_format)
                     
                     chamado_row += 1
@@ -409,20 +474,24 @@ class ReportExporter:
         buffer.seek(0)
         return buffer
     
-    def export_tecnicos_pdf(self, relatorio_data):
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        story = []
-        
+    def export_tecnicos_pdf(self, relatorio_data, caminho=None, max_chamados=None, apenas_resumo=False):
+        """
+        Gera o PDF do relatório de técnicos direto em arquivo, com os mesmos
+        blocos sob demanda do relatório de empresas. Retorna o caminho gerado.
+        """
+        caminho = caminho or self._novo_arquivo_pdf('relatorio_tecnicos_')
+        doc = SimpleDocTemplate(caminho, pagesize=A4)
+        doc.build(_StoryStream(self._story_tecnicos(relatorio_data, max_chamados, apenas_resumo)))
+        return caminho
+    
+    def _story_tecnicos(self, relatorio_data, max_chamados, apenas_resumo):
         # Título
-        title = Paragraph("Relatório de Técnicos", self.title_style)
-        story.append(title)
+        yield Paragraph("Relatório de Técnicos", self.title_style)
         
         # Data de geração
         date_str = datetime.now().strftime('%d/%m/%Y às %H:%M')
-        date_p = Paragraph(f"<i>Gerado em: {date_str}</i>", self.styles['Normal'])
-        story.append(date_p)
-        story.append(Spacer(1, 20))
+        yield Paragraph(f"<i>Gerado em: {date_str}</i>", self.styles['Normal'])
+        yield Spacer(1, 20)
         
         # Resumo geral
         total_tecnicos = len(relatorio_data)
@@ -451,18 +520,19 @@ class ReportExporter:
             ('GRID', (0, 0), (-1, -1), 1, colors.black)
         ]))
         
-        story.append(Paragraph("Resumo Geral", self.subtitle_style))
-        story.append(resumo_table)
-        story.append(Spacer(1, 30))
+        yield Paragraph("Resumo Geral", self.subtitle_style)
+        yield resumo_table
+        yield Spacer(1, 30)
         
         # Detalhes por técnico
-        story.append(Paragraph("Detalhes por Técnico", self.subtitle_style))
+        yield Paragraph("Detalhes por Técnico", self.subtitle_style)
+        
+        limite = _LimiteChamados(max_chamados)
         
         for tecnico_data in relatorio_data:
             # Nome do técnico
-            tecnico_title = Paragraph(f"<b>{tecnico_data['tecnico'].nome}</b>", 
-                                    ParagraphStyle('TecnicoTitle', fontSize=12, textColor=colors.darkgreen))
-            story.append(tecnico_title)
+            yield Paragraph(f"<b>{tecnico_data['tecnico'].nome}</b>", 
+                            ParagraphStyle('TecnicoTitle', fontSize=12, textColor=colors.darkgreen))
             
             # Info básica do técnico
             info_lines = [
@@ -472,8 +542,8 @@ class ReportExporter:
                 f"Tipo de Usuário: {tecnico_data['tecnico'].tipo_usuario if hasattr(tecnico_data['tecnico'], 'tipo_usuario') else 'N/A'}"
             ]
             for info_line in info_lines:
-                story.append(Paragraph(info_line, self.styles['Normal']))
-            story.append(Spacer(1, 10))
+                yield Paragraph(info_line, self.styles['Normal'])
+            yield Spacer(1, 10)
             
             # Estatísticas do técnico
             stats_data = [
@@ -496,35 +566,30 @@ class ReportExporter:
                 ('GRID', (0, 0), (-1, -1), 1, colors.black)
             ]))
             
-            story.append(stats_table)
+            yield stats_table
             
-            # Lista detalhada de chamados do técnico (últimos 10)
-            if 'chamados_detalhados' in tecnico_data and tecnico_data['chamados_detalhados']:
-                story.append(Spacer(1, 15))
-                story.append(Paragraph("<b>Últimos 10 Chamados Atendidos:</b>", self.styles['Normal']))
-                
-                chamados_data = [['Título', 'Status', 'Prioridade', 'Data Abertura', 'Data Finalização', 'Usuário', 'Tempo (dias)']]
-                # Mostrar apenas os últimos 10 chamados, ordenados por data
-                ultimos_chamados = sorted(tecnico_data['chamados_detalhados'], key=lambda x: x['data_abertura'], reverse=True)[:10]
+            # Lista detalhada de chamados do técnico, em tabelas de tamanho fixo
+            if not apenas_resumo and tecnico_data.get('chamados_detalhados') and limite.disponivel():
+                yield Spacer(1, 15)
+                yield Paragraph("<b>Chamados Atendidos:</b>", self.styles['Normal'])
                 
-                for chamado_detail in ultimos_chamados:
-                    data_abertura = chamado_detail['data_abertura'].strftime('%d/%m/%Y %H:%M') if chamado_detail['data_abertura'] else 'N/A'
-                    data_finalizacao = chamado_detail['data_finalizacao'].strftime('%d/%m/%Y %H:%M') if chamado_detail['data_finalizacao'] else 'Em aberto'
-                    tempo_resolucao = f"{chamado_detail['tempo_resolucao']}" if chamado_detail['tempo_resolucao'] is not None else 'N/A'
-                    
-                    chamados_data.append([
-                        chamado_detail['titulo'][:35] + '...' if len(chamado_detail['titulo']) > 35 else chamado_detail['titulo'],
-                        chamado_detail['status'].replace('_', ' ').title(),
-                        chamado_detail['prioridade'].title(),
-                        data_abertura,
-                        data_finalizacao,
-                        chamado_detail['usuario'][:25] if len(chamado_detail['usuario']) > 25 else chamado_detail['usuario'],
-                        tempo_resolucao
-                    ])
+                linhas = (
+                    [
+                        chamado_detail.titulo[:35] + '...' if len(chamado_detail.titulo) > 35 else chamado_detail.titulo,
+                        chamado_detail.status.replace('_', ' ').title(),
+                        chamado_detail.prioridade.title(),
+                        chamado_detail.data_abertura.strftime('%d/%m/%Y %H:%M') if chamado_detail.data_abertura else 'N/A',
+                        chamado_detail.data_finalizacao.strftime('%d/%m/%Y %H:%M') if chamado_detail.data_finalizacao else 'Em aberto',
+                        chamado_detail.usuario[:25],
+                        f"{chamado_detail.tempo_resolucao}" if chamado_detail.tempo_resolucao is not None else 'N/A'
+                    ]
+                    for chamado_detail in limite.consumir(tecnico_data['chamados_detalhados'])
+                )
                 
-                if len(chamados_data) > 1:
-                    chamados_table = Table(chamados_data)
-                    chamados_table.setStyle(TableStyle([
+                yield from self._tabelas_em_blocos(
+                    ['Título', 'Status', 'Prioridade', 'Data Abertura', 'Data Finalização', 'Usuário', 'Tempo (dias)'],
+                    linhas,
+                    [
                         ('BACKGROUND', (0, 0), (-1, 0), colors.darkgreen),
                         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
                         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
@@ -532,14 +597,36 @@ class ReportExporter:
                         ('FONTSIZE', (0, 0), (-1, -1), 7),
                         ('BACKGROUND', (0, 1), (-1, -1), colors.lightcyan),
                         ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                    ]))
-                    story.append(chamados_table)
+                    ]
+                )
             
-            story.append(Spacer(1, 30))
+            yield Spacer(1, 30)
         
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        if limite.atingido:
+            yield Paragraph(f"<i>Listagem de chamados limitada aos primeiros {max_chamados} registros.</i>",
+                            self.styles['Normal'])
+    
+    def _tabelas_em_blocos(self, cabecalho, linhas, estilo):
+        """Quebra as linhas em tabelas de até LINHAS_POR_TABELA linhas (cabe em uma página)"""
+        bloco = []
+        for linha in linhas:
+            bloco.append(linha)
+            if len(bloco) == self.LINHAS_POR_TABELA:
+                yield self._tabela(cabecalho, bloco, estilo)
+                bloco = []
+        if bloco:
+            yield self._tabela(cabecalho, bloco, estilo)
+    
+    def _tabela(self, cabecalho, linhas, estilo):
+        tabela = Table([cabecalho] + linhas, repeatRows=1)
+        tabela.setStyle(TableStyle(estilo))
+        return tabela
+    
+    def _novo_arquivo_pdf(self, prefixo):
+        # Prefixo relatorio_* é removido automaticamente pelo CacheCleaner
+        fd, caminho = tempfile.mkstemp(prefix=prefixo, suffix='.pdf')
+        os.close(fd)
+        return caminho
     
     def export_tecnicos_excel(self, relatorio_data):
         buffer = io.BytesIO()
@@ -701,19 +788,19 @@ class ReportExporter:
             if 'chamados_detalhados' in tecnico_data and tecnico_data['chamados_detalhados']:
                 for chamado_detail in tecnico_data['chamados_detalhados']:
                     chamados_tecnicos_sheet.write(chamado_row, 0, tecnico_data['tecnico'].nome, data_format)
-                    chamados_tecnicos_sheet.write(chamado_row, 1, chamado_detail['titulo'], data_format)
-                    chamados_tecnicos_sheet.write(chamado_row, 2, chamado_detail['status'].replace('_', ' ').title(), data_format)
-                    chamados_tecnicos_sheet.write(chamado_row, 3, chamado_detail['prioridade'].title(), data_format)
+                    chamados_tecnicos_sheet.write(chamado_row, 1, chamado_detail.titulo, data_format)
+                    chamados_tecnicos_sheet.write(chamado_row, 2, chamado_detail.status.replace('_', ' ').title(), data_format)
+                    chamados_tecnicos_sheet.write(chamado_row, 3, chamado_detail.prioridade.title(), data_format)
                     
                     # Datas formatadas
-                    data_abertura = chamado_detail['data_abertura'].strftime('%d/%m/%Y %H:%M') if chamado_detail['data_abertura'] else 'N/A'
-                    data_finalizacao = chamado_detail['data_finalizacao'].strftime('%d/%m/%Y %H:%M') if chamado_detail['data_finalizacao'] else 'Em aberto'
+                    data_abertura = chamado_detail.data_abertura.strftime('%d/%m/%Y %H:%M') if chamado_detail.data_abertura else 'N/A'
+                    data_finalizacao = chamado_detail.data_finalizacao.strftime('%d/%m/%Y %H:%M') if chamado_detail.data_finalizacao else 'Em aberto'
                     
                     chamados_tecnicos_sheet.write(chamado_row, 4, data_abertura, data_format)
                     chamados_tecnicos_sheet.write(chamado_row, 5, data_finalizacao, data_format)
-                    chamados_tecnicos_sheet.write(chamado_row, 6, chamado_detail['usuario'], data_format)
+                    chamados_tecnicos_sheet.write(chamado_row, 6, chamado_detail.usuario, data_format)
                     
-                    tempo_resolucao = chamado_detail['tempo_resolucao'] if chamado_detail['tempo_resolucao'] is not None else 'N/A'
+                    tempo_resolucao = chamado_detail.tempo_resolucao if chamado_detail.tempo_resolucao is not None else 'N/A'
                     chamados_tecnicos_sheet.write(chamado_row, 7, tempo_resolucao, data_format)
                     
                     chamado_row += 1
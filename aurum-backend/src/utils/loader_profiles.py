@@ -0,0 +1,56 @@
+"""
+Perfis de carregamento de chamados por tipo de tela.
+Cada perfil define, de uma vez, o que vem junto na consulta (joinedload/selectinload),
+para que os templates não disparem um SELECT por relacionamento a cada linha.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload, load_only, with_expression
+
+from src.models.helpdesk_models import Usuario, Empresa, Servico, Chamado, RespostaChamado
+
+# Caracteres da descrição trazidos nas listagens (os cards mostram 100 e indicam se há mais)
+TAMANHO_DESCRICAO_LISTA = 101
+
+def _perfil_lista():
+    """Cards de listagem: sem a coluna descricao, com resumo e total de respostas calculados no banco"""
+    total_respostas = select(func.count(RespostaChamado.id)).where(
+        RespostaChamado.chamado_id == Chamado.id
+    ).correlate(Chamado).scalar_subquery()
+
+    return [
+        load_only(
+            Chamado.id, Chamado.titulo, Chamado.status, Chamado.prioridade,
+            Chamado.data_criacao, Chamado.data_finalizacao,
+            Chamado.usuario_id, Chamado.empresa_id, Chamado.servico_id, Chamado.tecnico_id
+        ),
+        with_expression(Chamado.descricao_resumo, func.substr(Chamado.descricao, 1, TAMANHO_DESCRICAO_LISTA)),
+        with_expression(Chamado.total_respostas, total_respostas),
+        joinedload(Chamado.usuario).load_only(Usuario.id, Usuario.nome, Usuario.empresa_id)
+            .joinedload(Usuario.empresa).load_only(Empresa.id, Empresa.nome_empresa),
+        joinedload(Chamado.tecnico).load_only(Usuario.id, Usuario.nome),
+        joinedload(Chamado.empresa).load_only(Empresa.id, Empresa.nome_empresa),
+        joinedload(Chamado.servico).load_only(Servico.id, Servico.nome)
+    ]
+
+def _perfil_detalhe():
+    """Tela do chamado: relacionamentos completos e respostas com seus autores"""
+    return [
+        joinedload(Chamado.usuario),
+        joinedload(Chamado.tecnico),
+        joinedload(Chamado.empresa),
+        joinedload(Chamado.servico),
+        selectinload(Chamado.respostas).joinedload(RespostaChamado.usuario)
+    ]
+
+PERFIS = {
+    'lista': _perfil_lista,
+    'detalhe': _perfil_detalhe
+}
+
+def com_perfil(query, perfil):
+    """
+    Aplica o perfil de carregamento à consulta de chamados.
+    populate_existing garante que as expressões do perfil sejam preenchidas
+    mesmo para chamados que já estavam na sessão.
+    """
+    return query.options(*PERFIS[perfil]()).execution_options(populate_existing=True)
@@ -0,0 +1,76 @@
+"""
+Filas publicar/assinar usadas entre processos (mesma URL de SOCKETIO_MESSAGE_QUEUE).
+- redis:// e rediss://: Redis pub/sub (requer o pacote redis);
+- local://nome: fila em memória do próprio processo, para testes e para simular vários
+  processos em um só (cada assinante faz o papel de um worker).
+"""
+import threading
+
+# Esquemas aceitos por abrir_fila
+ESQUEMAS = ('local://', 'redis://', 'rediss://')
+
+class FilaLocal:
+    """Fila em memória: publicar entrega a mensagem a todos os assinantes, na mesma thread"""
+
+    def __init__(self):
+        self._assinantes = []
+        self._lock = threading.Lock()
+
+    def publicar(self, mensagem):
+        with self._lock:
+            assinantes = list(self._assinantes)
+        for callback in assinantes:
+            callback(mensagem)
+
+    def assinar(self, callback):
+        with self._lock:
+            self._assinantes.append(callback)
+        return callback
+
+    def cancelar_assinatura(self, callback):
+        with self._lock:
+            self._assinantes = [c for c in self._assinantes if c is not callback]
+
+class FilaRedis:
+    """Redis pub/sub; a assinatura roda em uma thread própria"""
+
+    def __init__(self, url, canal):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('Pacote redis não instalado (pip install redis)')
+        self._redis = redis.Redis.from_url(url)
+        self._canal = canal
+
+    def publicar(self, mensagem):
+        self._redis.publish(self._canal, mensagem)
+
+    def assinar(self, callback):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._canal)
+
+        def ouvir():
+            for mensagem in pubsub.listen():
+                try:
+                    callback(mensagem['data'])
+                except Exception as e:
+                    print(f"Erro ao processar mensagem da fila {self._canal}: {e}")
+
+        threading.Thread(target=ouvir, daemon=True).start()
+        return callback
+
+# Filas locais por (url, canal): todas as instâncias do processo compartilham a mesma
+_filas_locais = {}
+_filas_lock = threading.Lock()
+
+def fila_suportada(url):
+    return bool(url) and url.startswith(ESQUEMAS)
+
+def abrir_fila(url, canal):
+    """Fila publicar/assinar da URL; ValueError para esquemas não suportados"""
+    if url.startswith('local://'):
+        with _filas_lock:
+            return _filas_locais.setdefault((url, canal), FilaLocal())
+    if url.startswith(('redis://', 'rediss://')):
+        return FilaRedis(url, canal)
+    raise ValueError(f'Fila não suportada: {url} (use {", ".join(ESQUEMAS)})')
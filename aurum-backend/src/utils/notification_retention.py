@@ -0,0 +1,317 @@
+import threading
+import time
+from datetime import timedelta
+
+from sqlalchemy import cast, func, insert, literal, select
+
+from src.models.user import db
+from src.utils.timezone_utils import get_brazil_time
+
+# Tipo das notificações que resumem as não lidas antigas de um usuário
+TIPO_RESUMO = 'resumo'
+
+class NotificationRetentionManager:
+    """
+    Retenção das notificações in-app, no mesmo molde do LogCleanupManager.
+    - Notificações pessoais lidas mais antigas que read_retention_days são apagadas.
+    - Não lidas mais antigas que unread_retention_days viram uma única notificação
+      de resumo por usuário ("Você tinha N notificações não lidas...").
+    - Eventos broadcast (uma linha por evento, não por destinatário) mais antigos que
+      event_retention_days são apagados junto com as marcas de leitura.
+    Tudo em lotes com DELETE/INSERT ... SELECT; os contadores dos usuários afetados são
+    marcados como desatualizados na mesma transação de cada lote.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.scheduler_thread = None
+        self.running = False
+
+        # Configurações padrão
+        self.config = {
+            'enabled': True,
+            'read_retention_days': 30,  # Apagar lidas após 30 dias
+            'unread_retention_days': 180,  # Resumir não lidas após 6 meses
+            'event_retention_days': 180,  # Apagar eventos broadcast após 6 meses
+            'cleanup_interval_hours': 24,  # Executar a cada 24h
+            'batch_size': 1000  # Linhas (ou usuários, no resumo) por lote
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        self.config.update({
+            'enabled': app.config.get('NOTIFICATION_RETENTION_ENABLED', self.config['enabled']),
+            'read_retention_days': app.config.get('NOTIFICATION_READ_RETENTION_DAYS', self.config['read_retention_days']),
+            'unread_retention_days': app.config.get('NOTIFICATION_UNREAD_RETENTION_DAYS',
+                                                    self.config['unread_retention_days']),
+            'event_retention_days': app.config.get('NOTIFICATION_EVENT_RETENTION_DAYS',
+                                                   self.config['event_retention_days']),
+            'cleanup_interval_hours': app.config.get('NOTIFICATION_CLEANUP_INTERVAL_HOURS',
+                                                     self.config['cleanup_interval_hours']),
+            'batch_size': app.config.get('NOTIFICATION_CLEANUP_BATCH_SIZE', self.config['batch_size'])
+        })
+
+        self.register_cli_commands(app)
+
+        if self.config['enabled']:
+            self.start_scheduler()
+
+    def register_cli_commands(self, app):
+        """Registra comandos CLI de limpeza e estatísticas das notificações"""
+        @app.cli.command('cleanup-notifications')
+        def cleanup_notifications_command():
+            """Comando CLI para executar a retenção de notificações manualmente"""
+            with app.app_context():
+                resultado = self.limpar()
+                print(f"Notificações lidas removidas: {resultado['lidas_removidas']}")
+                print(f"Não lidas resumidas: {resultado['nao_lidas_resumidas']} "
+                      f"({resultado['resumos_criados']} resumo(s) criado(s))")
+                print(f"Eventos broadcast removidos: {resultado['eventos_removidos']}")
+
+        @app.cli.command('notification-stats')
+        def notification_stats_command():
+            """Comando CLI para mostrar estatísticas das notificações"""
+            with app.app_context():
+                stats = self.get_statistics()
+                print("=== Estatísticas de Notificações ===")
+                print(f"Notificações pessoais: {stats['total']} ({stats['nao_lidas']} não lidas)")
+                print(f"Lidas mais antigas que {self.config['read_retention_days']} dias: {stats['lidas_antigas']}")
+                print(f"Não lidas mais antigas que {self.config['unread_retention_days']} dias: "
+                      f"{stats['nao_lidas_antigas']}")
+                print(f"Resumos: {stats['resumos']}")
+                print(f"Eventos broadcast: {stats['eventos']} "
+                      f"({stats['eventos_antigos']} mais antigos que {self.config['event_retention_days']} dias)")
+                print(f"Marcas de leitura: {stats['marcas']}")
+                print(f"Cursores de leitura: {stats['cursores']}")
+                print(f"Contadores: {stats['contadores']} ({stats['contadores_desatualizados']} desatualizados)")
+                for item in stats['by_user'][:10]:
+                    print(f"  Usuário {item['usuario_id']}: {item['count']} notificações")
+
+    def start_scheduler(self):
+        """Inicia a thread de retenção periódica"""
+        if self.running:
+            return
+
+        self.running = True
+
+        def run_scheduler():
+            next_cleanup = time.time() + (self.config['cleanup_interval_hours'] * 3600)
+
+            while self.running:
+                if time.time() >= next_cleanup:
+                    self._scheduled_cleanup()
+                    next_cleanup = time.time() + (self.config['cleanup_interval_hours'] * 3600)
+
+                time.sleep(300)  # Verificar a cada 5 minutos
+
+        self.scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
+        self.scheduler_thread.start()
+
+        print(f"Notification retention scheduler iniciado - executará a cada {self.config['cleanup_interval_hours']}h")
+
+    def stop_scheduler(self):
+        """Para a thread de retenção"""
+        self.running = False
+        if self.scheduler_thread:
+            self.scheduler_thread.join(timeout=5)
+
+    def _scheduled_cleanup(self):
+        """Executa a retenção agendada"""
+        if self.app:
+            with self.app.app_context():
+                try:
+                    resultado = self.limpar()
+                    if any(resultado.values()):
+                        print(f"Retenção de notificações automática: {resultado}")
+                except Exception as e:
+                    print(f"Erro na retenção automática de notificações: {e}")
+
+    def _limite(self, dias):
+        return get_brazil_time() - timedelta(days=dias)
+
+    def limpar(self):
+        """Executa as três etapas de retenção; retorna o que cada uma fez"""
+        resultado = {'lidas_removidas': 0, 'nao_lidas_resumidas': 0, 'resumos_criados': 0, 'eventos_removidos': 0}
+        if not self.config['enabled']:
+            return resultado
+
+        try:
+            resultado['lidas_removidas'] = self.remover_lidas()
+            resultado['nao_lidas_resumidas'], resultado['resumos_criados'] = self.resumir_nao_lidas()
+            resultado['eventos_removidos'] = self.remover_eventos()
+        except Exception as e:
+            print(f"Erro durante retenção de notificações: {e}")
+            db.session.rollback()
+            raise
+
+        if any(resultado.values()):
+            from src.utils.activity_logger import activity_logger
+            activity_logger.log_activity(
+                action="CLEANUP",
+                module="system",
+                description=f"Retenção de notificações removeu {resultado['lidas_removidas']} lidas, "
+                            f"resumiu {resultado['nao_lidas_resumidas']} não lidas e "
+                            f"removeu {resultado['eventos_removidos']} eventos",
+                extra_data=dict(resultado, **{
+                    'read_retention_days': self.config['read_retention_days'],
+                    'unread_retention_days': self.config['unread_retention_days'],
+                    'event_retention_days': self.config['event_retention_days']
+                })
+            )
+        return resultado
+
+    def remover_lidas(self):
+        """Apaga as notificações pessoais lidas antigas, em lotes; retorna quantas"""
+        from src.models.helpdesk_models import Notificacao
+        from src.utils.database_logging_hooks import database_logging_hooks
+        from src.utils.notification_store import notification_store
+
+        limite = self._limite(self.config['read_retention_days'])
+        total = 0
+        while True:
+            lote = db.session.execute(
+                select(Notificacao.id, Notificacao.usuario_id)
+                .where(Notificacao.lida == True, Notificacao.data_criacao < limite)
+                .limit(self.config['batch_size'])
+            ).all()
+            if not lote:
+                break
+
+            # Em massa: os eventos do mapper não rodam, os contadores são recontados
+            Notificacao.query.filter(Notificacao.id.in_([id for id, _ in lote])).delete(synchronize_session=False)
+            notification_store.marcar_contadores_desatualizados(sorted({usuario_id for _, usuario_id in lote}))
+            database_logging_hooks.record_bulk_change(Notificacao.__tablename__, 'delete')
+            db.session.commit()
+
+            total += len(lote)
+            print(f"Notificações lidas removidas: {total}")
+            time.sleep(0.1)  # Pequena pausa entre lotes
+
+        return total
+
+    def resumir_nao_lidas(self):
+        """
+        Troca as não lidas antigas de cada usuário por uma notificação de resumo,
+        um lote de usuários por vez. Retorna (não lidas resumidas, resumos criados).
+        """
+        from src.models.helpdesk_models import Notificacao
+        from src.utils.database_logging_hooks import database_logging_hooks
+        from src.utils.notification_store import notification_store
+
+        limite = self._limite(self.config['unread_retention_days'])
+        filtro = (Notificacao.lida == False, Notificacao.data_criacao < limite, Notificacao.tipo != TIPO_RESUMO)
+
+        resumidas = resumos = 0
+        while True:
+            usuarios = db.session.execute(
+                select(Notificacao.usuario_id).where(*filtro).distinct().limit(self.config['batch_size'])
+            ).scalars().all()
+            if not usuarios:
+                break
+
+            mensagem = (literal('Você tinha ') + cast(func.count(Notificacao.id), db.String)
+                        + literal(f" notificações não lidas com mais de {self.config['unread_retention_days']} dias. "
+                                  "Elas foram resumidas nesta notificação."))
+            resumos += db.session.execute(
+                insert(Notificacao).from_select(
+                    ['titulo', 'mensagem', 'tipo', 'lida', 'data_criacao', 'usuario_id'],
+                    select(
+                        literal('Notificações antigas não lidas', db.String),
+                        mensagem,
+                        literal(TIPO_RESUMO, db.String),
+                        literal(False, db.Boolean),
+                        func.max(Notificacao.data_criacao),
+                        Notificacao.usuario_id
+                    ).where(*filtro, Notificacao.usuario_id.in_(usuarios)).group_by(Notificacao.usuario_id)
+                )
+            ).rowcount
+            resumidas += Notificacao.query.filter(
+                *filtro, Notificacao.usuario_id.in_(usuarios)
+            ).delete(synchronize_session=False)
+            notification_store.marcar_contadores_desatualizados(usuarios)
+            database_logging_hooks.record_bulk_change(Notificacao.__tablename__)
+            db.session.commit()
+
+            print(f"Não lidas resumidas: {resumidas} ({resumos} usuário(s))")
+            time.sleep(0.1)
+
+        return resumidas, resumos
+
+    def remover_eventos(self):
+        """Apaga os eventos broadcast antigos e as marcas de leitura deles; retorna quantos"""
+        from src.models.helpdesk_models import EventoNotificacao, LeituraNotificacao, ContadorNotificacao
+        from src.utils.database_logging_hooks import database_logging_hooks
+        from src.utils.notification_store import notification_store
+
+        limite = self._limite(self.config['event_retention_days'])
+        total = 0
+        while True:
+            lote = db.session.execute(
+                select(EventoNotificacao.id).where(EventoNotificacao.data_criacao < limite)
+                .limit(self.config['batch_size'])
+            ).scalars().all()
+            if not lote:
+                break
+
+            # Cursores ficam como estão: continuam valendo como "lido até o id"
+            LeituraNotificacao.query.filter(LeituraNotificacao.evento_id.in_(lote)).delete(synchronize_session=False)
+            EventoNotificacao.query.filter(EventoNotificacao.id.in_(lote)).delete(synchronize_session=False)
+            # Um evento conta para um público inteiro: recontar todos
+            notification_store.marcar_contadores_desatualizados(select(ContadorNotificacao.usuario_id))
+            database_logging_hooks.record_bulk_change(LeituraNotificacao.__tablename__, 'delete')
+            database_logging_hooks.record_bulk_change(EventoNotificacao.__tablename__, 'delete')
+            db.session.commit()
+
+            total += len(lote)
+            print(f"Eventos broadcast removidos: {total}")
+            time.sleep(0.1)
+
+        return total
+
+    def get_statistics(self):
+        """Retorna estatísticas das tabelas de notificações"""
+        from src.models.helpdesk_models import (Notificacao, EventoNotificacao, LeituraNotificacao,
+                                                CursorNotificacao, ContadorNotificacao)
+
+        lidas_limite = self._limite(self.config['read_retention_days'])
+        nao_lidas_limite = self._limite(self.config['unread_retention_days'])
+
+        stats = {
+            'total': Notificacao.query.count(),
+            'nao_lidas': Notificacao.query.filter(Notificacao.lida == False).count(),
+            'lidas_antigas': Notificacao.query.filter(
+                Notificacao.lida == True, Notificacao.data_criacao < lidas_limite
+            ).count(),
+            'nao_lidas_antigas': Notificacao.query.filter(
+                Notificacao.lida == False, Notificacao.data_criacao < nao_lidas_limite,
+                Notificacao.tipo != TIPO_RESUMO
+            ).count(),
+            'resumos': Notificacao.query.filter(Notificacao.tipo == TIPO_RESUMO).count(),
+            'eventos': EventoNotificacao.query.count(),
+            'eventos_antigos': EventoNotificacao.query.filter(
+                EventoNotificacao.data_criacao < self._limite(self.config['event_retention_days'])
+            ).count(),
+            'marcas': LeituraNotificacao.query.count(),
+            'cursores': CursorNotificacao.query.count(),
+            'contadores': ContadorNotificacao.query.count(),
+            'contadores_desatualizados': ContadorNotificacao.query.filter(
+                ContadorNotificacao.sincronizado_em.is_(None)
+            ).count()
+        }
+
+        # Usuários com mais notificações pessoais
+        por_usuario = db.session.query(
+            Notificacao.usuario_id,
+            func.count(Notificacao.id).label('count')
+        ).group_by(Notificacao.usuario_id).order_by(func.count(Notificacao.id).desc()).all()
+
+        stats['by_user'] = [{'usuario_id': usuario_id, 'count': count} for usuario_id, count in por_usuario]
+
+        return stats
+
+# Instância global
+notification_retention_manager = NotificationRetentionManager()
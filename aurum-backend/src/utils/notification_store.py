@@ -0,0 +1,486 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy import and_, case, event, func, insert, literal, or_, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.attributes import get_history
+
+from src.models.user import db
+from src.utils.pagination import paginar_por_chave
+from src.utils.realtime import realtime_notifier
+from src.utils.reference_cache import reference_cache, TIPOS_EQUIPE
+from src.utils.timezone_utils import get_brazil_time
+
+# Item da lista de notificações, venha de uma linha por usuário ou de um evento broadcast
+ItemNotificacao = namedtuple('ItemNotificacao', 'id origem titulo mensagem tipo lida data_criacao chamado_id')
+
+class NotificationStore:
+    """
+    Armazenamento das notificações in-app em dois modos:
+    - fanout_escrita: uma linha em helpdesk_notificacoes por destinatário (modelo original);
+    - broadcast: uma linha em helpdesk_notificacao_eventos por evento, com cursor de leitura
+      por usuário e marcas de leitura esparsas para o que foi lido fora de ordem.
+    O modo vale só para a escrita: a leitura sempre junta as duas origens, então a troca
+    de modo não perde notificações já gravadas.
+    A contagem de não lidas/total de cada usuário fica em helpdesk_notificacao_contadores,
+    ajustada na mesma transação de cada escrita (inclusive inserts/updates de Notificacao
+    feitos pelo ORM em qualquer lugar); a API de não lidas lê só essa linha.
+    """
+
+    MODOS = ('fanout_escrita', 'broadcast')
+
+    def __init__(self, app=None):
+        self.app = app
+
+        # Configurações padrão
+        self.config = {
+            'mode': 'broadcast',  # Uma linha por evento, independente do tamanho da equipe
+            'counter_resync_seconds': 3600  # Recontar contadores parados há mais de 1 hora
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        modo = app.config.get('NOTIFICATION_STORAGE_MODE', self.config['mode'])
+        if modo not in self.MODOS:
+            print(f"NOTIFICATION_STORAGE_MODE inválido ({modo}); usando {self.config['mode']}")
+            modo = self.config['mode']
+        self.config.update({
+            'mode': modo,
+            'counter_resync_seconds': app.config.get('NOTIFICATION_COUNTER_RESYNC_SECONDS',
+                                                     self.config['counter_resync_seconds'])
+        })
+
+        self.register_model_events()
+
+    def register_model_events(self):
+        """Mantém os contadores em dia com as notificações por usuário gravadas pelo ORM"""
+        from src.models.helpdesk_models import Notificacao
+
+        if not event.contains(Notificacao, 'after_insert', self._apos_inserir):
+            event.listen(Notificacao, 'after_insert', self._apos_inserir)
+            event.listen(Notificacao, 'after_update', self._apos_atualizar)
+            event.listen(Notificacao, 'after_delete', self._apos_excluir)
+
+    def _apos_inserir(self, mapper, conexao, notificacao):
+        conexao.execute(self._update_contadores([notificacao.usuario_id], 0 if notificacao.lida else 1, 1))
+        realtime_notifier.agendar(
+            usuarios=[notificacao.usuario_id],
+            notificacao=self._item_para_envio(notificacao, 'notificacao'),
+            session=object_session(notificacao)
+        )
+
+    def _apos_atualizar(self, mapper, conexao, notificacao):
+        historico = get_history(notificacao, 'lida')
+        if historico.added and historico.deleted and bool(historico.added[0]) != bool(historico.deleted[0]):
+            conexao.execute(self._update_contadores([notificacao.usuario_id], -1 if notificacao.lida else 1))
+            realtime_notifier.agendar(usuarios=[notificacao.usuario_id], session=object_session(notificacao))
+
+    def _apos_excluir(self, mapper, conexao, notificacao):
+        conexao.execute(self._update_contadores([notificacao.usuario_id], 0 if notificacao.lida else -1, -1))
+        realtime_notifier.agendar(usuarios=[notificacao.usuario_id], session=object_session(notificacao))
+
+    def _item_para_envio(self, registro, origem):
+        """Dicionário do evento `notification` do socket (mesmos campos de ItemNotificacao)"""
+        data_criacao = getattr(registro, 'data_criacao', None) or get_brazil_time()
+        return {
+            'id': registro.id,
+            'origem': origem,
+            'titulo': registro.titulo,
+            'mensagem': registro.mensagem,
+            'tipo': registro.tipo,
+            'lida': bool(getattr(registro, 'lida', False)),
+            'data_criacao': data_criacao.isoformat(),
+            'chamado_id': registro.chamado_id
+        }
+
+    def _publicos(self, tipo):
+        """Valores de EventoNotificacao.publico que alcançam um tipo de usuário"""
+        publicos = ['todos', tipo]
+        if tipo in TIPOS_EQUIPE:
+            publicos.append('equipe')
+        return publicos
+
+    def _filtro_destinatarios(self, publico, empresa_id, somente_ativos=True):
+        from src.models.helpdesk_models import Usuario
+
+        filtros = [Usuario.ativo == True] if somente_ativos else []
+        if publico == 'equipe':
+            filtros.append(Usuario.tipo_usuario.in_(TIPOS_EQUIPE))
+        elif publico != 'todos':
+            filtros.append(Usuario.tipo_usuario == publico)
+        if empresa_id is not None:
+            filtros.append(Usuario.empresa_id == empresa_id)
+        return and_(*filtros)
+
+    def _filtro_eventos(self, usuario):
+        """Eventos destinados ao usuário, a partir do seu cadastro"""
+        from src.models.helpdesk_models import EventoNotificacao
+
+        filtros = [
+            EventoNotificacao.publico.in_(self._publicos(usuario.tipo)),
+            or_(EventoNotificacao.empresa_id.is_(None), EventoNotificacao.empresa_id == usuario.empresa_id)
+        ]
+        cadastro = reference_cache.usuario(usuario.id)
+        if cadastro is not None and cadastro.data_criacao is not None:
+            filtros.append(EventoNotificacao.data_criacao >= cadastro.data_criacao)
+        return and_(*filtros)
+
+    def _cursor(self, usuario_id):
+        """Subconsulta com o cursor de leitura do usuário (0 sem cursor)"""
+        from src.models.helpdesk_models import CursorNotificacao
+
+        return func.coalesce(
+            select(CursorNotificacao.ultimo_evento_id)
+            .where(CursorNotificacao.usuario_id == usuario_id)
+            .scalar_subquery(),
+            0
+        )
+
+    def publicar(self, titulo, mensagem, tipo, publico='equipe', empresa_id=None, chamado_id=None):
+        """
+        Grava a notificação para o público (equipe, todos ou um tipo_usuario), opcionalmente
+        restrito a uma empresa. Não faz commit. Retorna quantas linhas foram gravadas.
+        """
+        from src.models.helpdesk_models import Usuario, Notificacao, EventoNotificacao
+
+        if self.config['mode'] == 'broadcast':
+            evento = EventoNotificacao(
+                titulo=titulo,
+                mensagem=mensagem,
+                tipo=tipo,
+                publico=publico,
+                empresa_id=empresa_id,
+                chamado_id=chamado_id
+            )
+            db.session.add(evento)
+            db.session.flush()  # id do evento para o envio pelo socket
+            # Eventos não olham Usuario.ativo na leitura, então o contador também não
+            self._ajustar_contadores(
+                select(Usuario.id).where(self._filtro_destinatarios(publico, empresa_id, somente_ativos=False)),
+                nao_lidas=1, total=1
+            )
+            realtime_notifier.agendar(publico=publico, empresa_id=empresa_id,
+                                      notificacao=self._item_para_envio(evento, 'evento'))
+            return 1
+
+        # fanout_escrita: um único INSERT ... SELECT a partir de helpdesk_usuarios
+        from src.utils.database_logging_hooks import database_logging_hooks
+
+        destinatarios = select(
+            literal(titulo, db.String),
+            literal(mensagem, db.Text),
+            literal(tipo, db.String),
+            literal(False, db.Boolean),
+            literal(get_brazil_time(), db.DateTime),
+            Usuario.id,
+            literal(chamado_id, db.Integer)
+        ).where(self._filtro_destinatarios(publico, empresa_id))
+
+        resultado = db.session.execute(
+            insert(Notificacao).from_select(
+                ['titulo', 'mensagem', 'tipo', 'lida', 'data_criacao', 'usuario_id', 'chamado_id'],
+                destinatarios
+            )
+        )
+        database_logging_hooks.record_bulk_change(Notificacao.__tablename__, 'insert')
+        self._ajustar_contadores(
+            select(Usuario.id).where(self._filtro_destinatarios(publico, empresa_id)),
+            nao_lidas=1, total=1
+        )
+        realtime_notifier.agendar(publico=publico, empresa_id=empresa_id, notificacao={
+            'id': None,  # Uma linha por destinatário: cada um tem o seu id
+            'origem': 'notificacao',
+            'titulo': titulo,
+            'mensagem': mensagem,
+            'tipo': tipo,
+            'lida': False,
+            'data_criacao': get_brazil_time().isoformat(),
+            'chamado_id': chamado_id
+        })
+        return resultado.rowcount
+
+    def _update_contadores(self, usuarios, nao_lidas=0, total=0):
+        """
+        UPDATE único que soma aos contadores dos usuários (lista de ids ou subconsulta).
+        Usuários ainda sem contador ficam de fora: a primeira leitura conta do zero.
+        """
+        from src.models.helpdesk_models import ContadorNotificacao as Contador
+
+        valores = {'versao': Contador.versao + 1}
+        if nao_lidas:
+            valores['nao_lidas'] = case((Contador.nao_lidas + nao_lidas < 0, 0), else_=Contador.nao_lidas + nao_lidas)
+        if total:
+            valores['total'] = case((Contador.total + total < 0, 0), else_=Contador.total + total)
+
+        return update(Contador).where(Contador.usuario_id.in_(usuarios)).values(**valores)
+
+    def _ajustar_contadores(self, usuarios, nao_lidas=0, total=0):
+        """Aplica _update_contadores na sessão atual (escritas fora do ORM)"""
+        from src.models.helpdesk_models import ContadorNotificacao
+        from src.utils.database_logging_hooks import database_logging_hooks
+
+        db.session.execute(
+            self._update_contadores(usuarios, nao_lidas, total).execution_options(synchronize_session=False)
+        )
+        database_logging_hooks.record_bulk_change(ContadorNotificacao.__tablename__)
+
+    def contador(self, usuario):
+        """
+        (não lidas, total, versão) do usuário lidos do contador pela chave primária.
+        Recontar só quando o contador não existe, foi marcado como desatualizado ou
+        está parado há mais de counter_resync_seconds (alterações de outros caminhos).
+        """
+        from src.models.helpdesk_models import ContadorNotificacao as Contador
+
+        linha = db.session.query(
+            Contador.nao_lidas, Contador.total, Contador.versao, Contador.sincronizado_em
+        ).filter(Contador.usuario_id == usuario.id).first()
+
+        limite = get_brazil_time() - timedelta(seconds=self.config['counter_resync_seconds'])
+        if linha is not None and linha.sincronizado_em is not None and linha.sincronizado_em > limite:
+            return linha.nao_lidas, linha.total, linha.versao
+
+        return self._recontar(usuario, linha)
+
+    def _recontar(self, usuario, linha):
+        from src.models.helpdesk_models import ContadorNotificacao as Contador
+
+        nao_lidas, total = self.contar(usuario)
+        try:
+            if linha is None:
+                db.session.add(Contador(usuario_id=usuario.id, nao_lidas=nao_lidas, total=total,
+                                        versao=1, sincronizado_em=get_brazil_time()))
+            else:
+                # A versão só muda se a contagem mudou: o cliente continua recebendo 304
+                mudou = (nao_lidas, total) != (linha.nao_lidas, linha.total)
+                db.session.execute(
+                    update(Contador)
+                    .where(Contador.usuario_id == usuario.id)
+                    .values(nao_lidas=nao_lidas, total=total, sincronizado_em=get_brazil_time(),
+                            versao=Contador.versao + 1 if mudou else Contador.versao)
+                    .execution_options(synchronize_session=False)
+                )
+            db.session.commit()
+        except IntegrityError:
+            # Outra requisição criou o contador ao mesmo tempo
+            db.session.rollback()
+
+        return db.session.query(Contador.nao_lidas, Contador.total, Contador.versao).filter(
+            Contador.usuario_id == usuario.id
+        ).one()
+
+    def marcar_contadores_desatualizados(self, usuarios):
+        """Força recontar na próxima leitura (lista de ids ou subconsulta). Não faz commit"""
+        from src.models.helpdesk_models import ContadorNotificacao as Contador
+
+        db.session.execute(
+            update(Contador)
+            .where(Contador.usuario_id.in_(usuarios))
+            .values(sincronizado_em=None)
+            .execution_options(synchronize_session=False)
+        )
+
+    def remover_usuario(self, usuario_id):
+        """Apaga contador, cursor e marcas de leitura de um usuário excluído. Não faz commit"""
+        from src.models.helpdesk_models import CursorNotificacao, LeituraNotificacao, ContadorNotificacao
+        from src.utils.database_logging_hooks import database_logging_hooks
+
+        for modelo in (ContadorNotificacao, CursorNotificacao, LeituraNotificacao):
+            if modelo.query.filter(modelo.usuario_id == usuario_id).delete(synchronize_session=False):
+                database_logging_hooks.record_bulk_change(modelo.__tablename__, 'delete')
+
+    def contar(self, usuario):
+        """(não lidas, total) do usuário, numa única consulta"""
+        from src.models.helpdesk_models import Notificacao, EventoNotificacao, LeituraNotificacao
+
+        cursor = self._cursor(usuario.id)
+        eventos = select(func.count(EventoNotificacao.id)).where(self._filtro_eventos(usuario))
+
+        linha = db.session.execute(select(
+            select(func.count(Notificacao.id))
+            .where(Notificacao.usuario_id == usuario.id, Notificacao.lida == False).scalar_subquery(),
+            select(func.count(Notificacao.id))
+            .where(Notificacao.usuario_id == usuario.id).scalar_subquery(),
+            eventos.where(EventoNotificacao.id > cursor).scalar_subquery(),
+            eventos.scalar_subquery(),
+            # Marcas só existem para eventos do usuário acima do cursor
+            select(func.count())
+            .where(LeituraNotificacao.usuario_id == usuario.id, LeituraNotificacao.evento_id > cursor)
+            .scalar_subquery()
+        )).one()
+
+        nao_lidas_pessoais, total_pessoais, eventos_pendentes, total_eventos, lidos_fora_de_ordem = linha
+        return nao_lidas_pessoais + eventos_pendentes - lidos_fora_de_ordem, total_pessoais + total_eventos
+
+    def _lido_evento(self, usuario_id):
+        """Expressão: o evento já foi lido pelo usuário (coberto pelo cursor ou com marca)"""
+        from src.models.helpdesk_models import EventoNotificacao, LeituraNotificacao
+
+        marca = select(LeituraNotificacao.evento_id).where(
+            LeituraNotificacao.usuario_id == usuario_id,
+            LeituraNotificacao.evento_id == EventoNotificacao.id
+        ).exists()
+        return or_(EventoNotificacao.id <= self._cursor(usuario_id), marca)
+
+    def pagina(self, usuario, cursor=None, por_pagina=20, tipo=None, lida=None):
+        """
+        Página (Pagina de ItemNotificacao) das notificações do usuário, das duas origens,
+        por data decrescente. Filtros opcionais por tipo e por lida (True/False).
+        As duas origens viram um UNION ALL paginado por chave (data, id).
+        """
+        from src.models.helpdesk_models import Notificacao, EventoNotificacao
+
+        lido_evento = self._lido_evento(usuario.id)
+
+        pessoais = select(
+            Notificacao.id.label('id'), literal('notificacao').label('origem'), Notificacao.titulo.label('titulo'),
+            Notificacao.mensagem.label('mensagem'), Notificacao.tipo.label('tipo'), Notificacao.lida.label('lida'),
+            Notificacao.data_criacao.label('data_criacao'), Notificacao.chamado_id.label('chamado_id')
+        ).where(Notificacao.usuario_id == usuario.id)
+
+        eventos = select(
+            EventoNotificacao.id, literal('evento'), EventoNotificacao.titulo, EventoNotificacao.mensagem,
+            EventoNotificacao.tipo, lido_evento, EventoNotificacao.data_criacao, EventoNotificacao.chamado_id
+        ).where(self._filtro_eventos(usuario))
+
+        if tipo:
+            pessoais = pessoais.where(Notificacao.tipo == tipo)
+            eventos = eventos.where(EventoNotificacao.tipo == tipo)
+        if lida is not None:
+            pessoais = pessoais.where(Notificacao.lida == bool(lida))
+            eventos = eventos.where(lido_evento if lida else ~lido_evento)
+
+        uniao = union_all(pessoais, eventos).subquery()
+        pagina = paginar_por_chave(
+            db.session.query(uniao), uniao.c.data_criacao, uniao.c.id, cursor=cursor, por_pagina=por_pagina
+        )
+        return pagina._replace(itens=[
+            ItemNotificacao(item.id, item.origem, item.titulo, item.mensagem, item.tipo, bool(item.lida),
+                            item.data_criacao, item.chamado_id)
+            for item in pagina.itens
+        ])
+
+    def listar(self, usuario, limite=20):
+        """Notificações mais recentes do usuário (ItemNotificacao), das duas origens"""
+        return self.pagina(usuario, por_pagina=limite).itens
+
+    def marcar_lida(self, usuario, id, origem='notificacao'):
+        """Marca uma notificação do usuário como lida. Não faz commit; retorna se encontrou"""
+        from src.models.helpdesk_models import Notificacao, EventoNotificacao, LeituraNotificacao
+
+        if origem != 'evento':
+            notificacao = Notificacao.query.filter_by(id=id, usuario_id=usuario.id).first()
+            if notificacao is None:
+                return False
+            notificacao.lida = True  # O contador é ajustado no flush (_apos_atualizar)
+            return True
+
+        evento = db.session.query(EventoNotificacao.id).filter(
+            EventoNotificacao.id == id, self._filtro_eventos(usuario)
+        ).first()
+        if evento is None:
+            return False
+
+        cursor = db.session.execute(select(self._cursor(usuario.id))).scalar()
+        if id <= cursor or db.session.get(LeituraNotificacao, (usuario.id, id)) is not None:
+            return True
+
+        db.session.add(LeituraNotificacao(usuario_id=usuario.id, evento_id=id))
+        db.session.flush()
+        self._ajustar_contadores([usuario.id], nao_lidas=-1)
+        realtime_notifier.agendar(usuarios=[usuario.id])
+        self._avancar_cursor(usuario, cursor)
+        return True
+
+    def marcar_lidas(self, usuario, selecionadas=None, tipo=None):
+        """
+        Marca em lote como lidas as notificações selecionadas ([(origem, id)]) ou todas
+        (opcionalmente só de um tipo): um UPDATE nas pessoais e um INSERT ... SELECT de
+        marcas para os eventos, com o contador ajustado na mesma transação.
+        Não faz commit. Retorna quantas estavam não lidas.
+        """
+        from src.models.helpdesk_models import Notificacao, EventoNotificacao, LeituraNotificacao
+        from src.utils.database_logging_hooks import database_logging_hooks
+
+        ids_pessoais = ids_eventos = None
+        if selecionadas is not None:
+            ids_pessoais = [id for origem, id in selecionadas if origem != 'evento']
+            ids_eventos = [id for origem, id in selecionadas if origem == 'evento']
+
+        pessoais = 0
+        if ids_pessoais is None or ids_pessoais:
+            filtros = [Notificacao.usuario_id == usuario.id, Notificacao.lida == False]
+            if tipo:
+                filtros.append(Notificacao.tipo == tipo)
+            if ids_pessoais:
+                filtros.append(Notificacao.id.in_(ids_pessoais))
+            # Em massa: não passa pelos eventos do mapper, o contador é ajustado abaixo
+            pessoais = db.session.execute(
+                update(Notificacao).where(*filtros).values(lida=True).execution_options(synchronize_session=False)
+            ).rowcount
+            if pessoais:
+                database_logging_hooks.record_bulk_change(Notificacao.__tablename__, 'update')
+
+        eventos = 0
+        if ids_eventos is None or ids_eventos:
+            cursor = db.session.execute(select(self._cursor(usuario.id))).scalar()
+            filtros = [self._filtro_eventos(usuario), ~self._lido_evento(usuario.id)]
+            if tipo:
+                filtros.append(EventoNotificacao.tipo == tipo)
+            if ids_eventos:
+                filtros.append(EventoNotificacao.id.in_(ids_eventos))
+            eventos = db.session.execute(
+                insert(LeituraNotificacao).from_select(
+                    ['usuario_id', 'evento_id'],
+                    select(literal(usuario.id, db.Integer), EventoNotificacao.id).where(*filtros)
+                )
+            ).rowcount
+            if eventos:
+                database_logging_hooks.record_bulk_change(LeituraNotificacao.__tablename__, 'insert')
+                self._avancar_cursor(usuario, cursor)  # "Marcar todas" vira só o cursor no fim
+
+        marcadas = pessoais + eventos
+        if marcadas:
+            self._ajustar_contadores([usuario.id], nao_lidas=-marcadas)
+            realtime_notifier.agendar(usuarios=[usuario.id])
+        return marcadas
+
+    def _avancar_cursor(self, usuario, cursor):
+        """Leva o cursor até antes do primeiro evento não lido e descarta as marcas cobertas"""
+        from src.models.helpdesk_models import EventoNotificacao, CursorNotificacao, LeituraNotificacao
+        from src.utils.database_logging_hooks import database_logging_hooks
+
+        lido = select(LeituraNotificacao.evento_id).where(
+            LeituraNotificacao.usuario_id == usuario.id,
+            LeituraNotificacao.evento_id == EventoNotificacao.id
+        ).exists()
+        filtro = and_(self._filtro_eventos(usuario), EventoNotificacao.id > cursor)
+
+        primeiro_nao_lido, ultimo = db.session.execute(select(
+            select(func.min(EventoNotificacao.id)).where(filtro, ~lido).scalar_subquery(),
+            select(func.max(EventoNotificacao.id)).where(filtro).scalar_subquery()
+        )).one()
+        novo_cursor = primeiro_nao_lido - 1 if primeiro_nao_lido is not None else ultimo
+        if novo_cursor is None or novo_cursor <= cursor:
+            return
+
+        registro = db.session.get(CursorNotificacao, usuario.id)
+        if registro is None:
+            db.session.add(CursorNotificacao(usuario_id=usuario.id, ultimo_evento_id=novo_cursor))
+        else:
+            registro.ultimo_evento_id = novo_cursor
+
+        removidas = LeituraNotificacao.query.filter(
+            LeituraNotificacao.usuario_id == usuario.id,
+            LeituraNotificacao.evento_id <= novo_cursor
+        ).delete(synchronize_session=False)
+        if removidas:
+            database_logging_hooks.record_bulk_change(LeituraNotificacao.__tablename__, 'delete')
+
+# Instância global
+notification_store = NotificationStore()
@@ -0,0 +1,299 @@
+from datetime import datetime
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from src.models.user import db
+from src.models.helpdesk_models import Usuario, Empresa, Servico, Chamado
+from src.utils.sla_analytics import percentis_por_grupo
+
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+
+# Unidades do NumPy usadas no agrupamento por período
+# (semana: a unidade 'W' do NumPy começa na quinta; ver truncar_periodo)
+PERIODOS = {'dia': 'D', 'semana': 'W', 'mes': 'M', 'ano': 'Y'}
+
+# Uma segunda-feira, base das semanas ISO (segunda a domingo)
+SEGUNDA_REFERENCIA = np.datetime64('1970-01-05', 'D')
+
+def truncar_periodo(datas, periodo):
+    """Início do período de cada data; semanas rotuladas pela segunda-feira"""
+    if periodo == 'semana':
+        dias = (datas.astype('datetime64[D]') - SEGUNDA_REFERENCIA).astype(np.int64)
+        semanas = SEGUNDA_REFERENCIA + ((dias // 7) * 7).astype('timedelta64[D]')
+        semanas[np.isnat(datas)] = np.datetime64('NaT')
+        return semanas
+    return datas.astype(f'datetime64[{PERIODOS[periodo]}]')
+
+class _Coluna:
+    """Dimensão codificada por dicionário: códigos inteiros + vocabulário de valores e rótulos"""
+
+    __slots__ = ('codigos', 'valores', 'rotulos')
+
+    def __init__(self, brutos, rotulos=None, vazio='N/A'):
+        valores, codigos = np.unique(brutos, return_inverse=True)
+        self.codigos = codigos.astype(np.int32)
+        self.valores = valores.tolist()
+        rotulos = rotulos or {}
+        self.rotulos = [rotulos.get(v, vazio if v in (0, '') else str(v)) for v in self.valores]
+
+    def codigo_de(self, valor):
+        """Código do valor no vocabulário (-1 se não existir)"""
+        try:
+            return self.valores.index(valor)
+        except ValueError:
+            return -1
+
+class OLAPSnapshot:
+    """
+    Fotografia colunar de helpdesk_chamados em arrays NumPy, atualizada periodicamente,
+    para consultas ad-hoc (agrupamento, filtros e períodos) sem escrever um laço por relatório.
+    """
+
+    # Dimensões disponíveis e o filtro (query string) correspondente
+    DIMENSOES = {
+        'empresa': 'empresa_id',
+        'servico': 'servico_id',
+        'tecnico': 'tecnico_id',
+        'prioridade': 'prioridade',
+        'status': 'status',
+        'dia_semana': None,
+        'hora': None,
+        **{periodo: None for periodo in PERIODOS}
+    }
+
+    MEDIDAS_CONTAGEM = ['chamados', 'abertos', 'em_andamento', 'finalizados']
+    MEDIDAS = MEDIDAS_CONTAGEM + ['resolucao_media_horas', 'resolucao_p50_horas', 'resolucao_p90_horas']
+
+    def __init__(self, app=None):
+        self.app = app
+        self.scheduler_thread = None
+        self.running = False
+        self._dados = None
+        self._lock = threading.Lock()
+
+        # Configurações padrão
+        self.config = {
+            'enabled': True,
+            'refresh_seconds': 300,  # Atualizar a fotografia a cada 5 minutos
+            'batch_size': 20000  # Linhas lidas do banco por lote
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        self.config.update({
+            'enabled': app.config.get('OLAP_SNAPSHOT_ENABLED', self.config['enabled']),
+            'refresh_seconds': app.config.get('OLAP_REFRESH_SECONDS', self.config['refresh_seconds']),
+            'batch_size': app.config.get('OLAP_BATCH_SIZE', self.config['batch_size'])
+        })
+
+        if self.config['enabled']:
+            self.start_scheduler()
+
+    def start_scheduler(self):
+        """Inicia a atualização periódica da fotografia"""
+        if self.running:
+            return
+
+        self.running = True
+
+        def run_scheduler():
+            while self.running:
+                time.sleep(self.config['refresh_seconds'])
+                self._scheduled_refresh()
+
+        self.scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
+        self.scheduler_thread.start()
+
+        print(f"OLAP snapshot scheduler iniciado - atualiza a cada {self.config['refresh_seconds']}s")
+
+    def stop_scheduler(self):
+        """Para a atualização periódica"""
+        self.running = False
+        if self.scheduler_thread:
+            self.scheduler_thread.join(timeout=5)
+
+    def _scheduled_refresh(self):
+        """Executa atualização agendada"""
+        if self.app:
+            with self.app.app_context():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Erro ao atualizar OLAP snapshot: {e}")
+                finally:
+                    db.session.remove()
+
+    def refresh(self):
+        """Lê os chamados em lotes e troca a fotografia atual pela nova"""
+        consulta = select(
+            Chamado.empresa_id,
+            Chamado.servico_id,
+            Chamado.tecnico_id,
+            Chamado.prioridade,
+            Chamado.status,
+            Chamado.data_criacao,
+            Chamado.data_finalizacao
+        ).execution_options(yield_per=self.config['batch_size'])
+
+        lotes = {nome: [] for nome in ('empresa_id', 'servico_id', 'tecnico_id', 'prioridade', 'status', 'data_criacao', 'data_finalizacao')}
+        for lote in db.session.execute(consulta).partitions():
+            empresa_id, servico_id, tecnico_id, prioridade, status, criacao, finalizacao = zip(*lote)
+            lotes['empresa_id'].append(np.array([v or 0 for v in empresa_id], dtype=np.int64))
+            lotes['servico_id'].append(np.array([v or 0 for v in servico_id], dtype=np.int64))
+            lotes['tecnico_id'].append(np.array([v or 0 for v in tecnico_id], dtype=np.int64))
+            lotes['prioridade'].append(np.array([v or '' for v in prioridade], dtype=object))
+            lotes['status'].append(np.array([v or '' for v in status], dtype=object))
+            lotes['data_criacao'].append(np.array(criacao, dtype='datetime64[s]'))
+            lotes['data_finalizacao'].append(np.array(finalizacao, dtype='datetime64[s]'))
+
+        vazios = {'empresa_id': np.int64, 'servico_id': np.int64, 'tecnico_id': np.int64,
+                  'prioridade': object, 'status': object,
+                  'data_criacao': 'datetime64[s]', 'data_finalizacao': 'datetime64[s]'}
+        colunas = {
+            nome: np.concatenate(partes) if partes else np.array([], dtype=vazios[nome])
+            for nome, partes in lotes.items()
+        }
+
+        criacao = colunas['data_criacao']
+        segundos = criacao.astype(np.int64)
+        resolucao = (colunas['data_finalizacao'] - criacao).astype('timedelta64[s]').astype(np.float64) / 3600.0
+        resolucao[np.isnat(criacao) | np.isnat(colunas['data_finalizacao'])] = np.nan
+
+        dados = {
+            'gerado_em': datetime.now(),
+            'total': len(criacao),
+            'data_criacao': criacao,
+            'resolucao_horas': resolucao,
+            'empresa': _Coluna(colunas['empresa_id'], self._nomes(Empresa.id, Empresa.nome_empresa), 'Sem empresa'),
+            'servico': _Coluna(colunas['servico_id'], self._nomes(Servico.id, Servico.nome), 'Sem serviço'),
+            'tecnico': _Coluna(colunas['tecnico_id'], self._nomes(Usuario.id, Usuario.nome), 'Sem técnico'),
+            'prioridade': _Coluna(colunas['prioridade']),
+            'status': _Coluna(colunas['status']),
+            # 1970-01-01 foi quinta-feira (índice 3 com segunda = 0)
+            'dia_semana': (((segundos // 86400) + 3) % 7).astype(np.int32),
+            'hora': ((segundos % 86400) // 3600).astype(np.int32)
+        }
+
+        with self._lock:
+            self._dados = dados
+        return dados
+
+    def _nomes(self, coluna_id, coluna_nome):
+        return dict(db.session.query(coluna_id, coluna_nome).all())
+
+    def dados(self):
+        """Fotografia atual; gerada na primeira consulta se ainda não existir"""
+        with self._lock:
+            dados = self._dados
+        return dados if dados is not None else self.refresh()
+
+    def consultar(self, dims, medidas, filtros=None, ordenar=None, limite=None):
+        """
+        Agrupa a fotografia pelas dimensões pedidas e calcula as medidas de cada grupo.
+        `filtros` aceita empresa_id, servico_id, tecnico_id, prioridade, status,
+        data_inicio e data_fim (datetime, exclusivo). Lança ValueError para parâmetros inválidos.
+        """
+        invalidas = [d for d in dims if d not in self.DIMENSOES]
+        if invalidas:
+            raise ValueError(f"Dimensões inválidas: {', '.join(invalidas)}")
+        invalidas = [m for m in medidas if m not in self.MEDIDAS]
+        if invalidas:
+            raise ValueError(f"Medidas inválidas: {', '.join(invalidas)}")
+        if ordenar and ordenar not in medidas:
+            raise ValueError('O campo de ordenação deve ser uma das medidas pedidas')
+
+        dados = self.dados()
+        mascara = self._mascara(dados, filtros or {})
+
+        # Códigos e rótulos de cada dimensão pedida, já filtrados
+        codigos, rotulos = [], []
+        for dim in dims:
+            dim_codigos, dim_rotulos = self._dimensao(dados, dim, mascara)
+            codigos.append(dim_codigos)
+            rotulos.append(dim_rotulos)
+
+        # Chave única por combinação de dimensões (mixed radix)
+        if dims:
+            chave = np.ravel_multi_index(codigos, [max(len(r), 1) for r in rotulos])
+        else:
+            chave = np.zeros(int(mascara.sum()), dtype=np.int64)
+        chaves, grupo = np.unique(chave, return_inverse=True)
+        combinacoes = np.unravel_index(chaves, [max(len(r), 1) for r in rotulos]) if dims else []
+
+        resolucao = {}  # Percentis calculados uma única vez para todas as medidas de tempo
+        valores = {medida: self._medida(dados, medida, grupo, len(chaves), mascara, resolucao) for medida in medidas}
+
+        linhas = []
+        for i in range(len(chaves)):
+            linha = {dim: rotulos[j][combinacoes[j][i]] for j, dim in enumerate(dims)}
+            for medida in medidas:
+                valor = valores[medida][i]
+                linha[medida] = None if np.isnan(valor) else (int(valor) if medida in self.MEDIDAS_CONTAGEM else round(float(valor), 2))
+            linhas.append(linha)
+
+        if ordenar:
+            linhas.sort(key=lambda l: (l[ordenar] is None, -(l[ordenar] or 0)))
+        if limite:
+            linhas = linhas[:limite]
+
+        return {
+            'dims': dims,
+            'medidas': medidas,
+            'snapshot_em': dados['gerado_em'].isoformat(),
+            'chamados_no_filtro': int(mascara.sum()),
+            'linhas': linhas
+        }
+
+    def _mascara(self, dados, filtros):
+        mascara = np.ones(dados['total'], dtype=bool)
+        for dim, campo in self.DIMENSOES.items():
+            if campo and filtros.get(campo) not in (None, ''):
+                mascara &= dados[dim].codigos == dados[dim].codigo_de(filtros[campo])
+        if filtros.get('data_inicio'):
+            mascara &= dados['data_criacao'] >= np.datetime64(filtros['data_inicio'], 's')
+        if filtros.get('data_fim'):
+            mascara &= dados['data_criacao'] < np.datetime64(filtros['data_fim'], 's')
+        return mascara
+
+    def _dimensao(self, dados, dim, mascara):
+        """(códigos filtrados, rótulos) de uma dimensão"""
+        if dim in PERIODOS:
+            periodos = truncar_periodo(dados['data_criacao'][mascara], dim)
+            valores, codigos = np.unique(periodos, return_inverse=True)
+            return codigos, [str(v) for v in valores]
+        if dim == 'dia_semana':
+            return dados['dia_semana'][mascara], DIAS_SEMANA
+        if dim == 'hora':
+            return dados['hora'][mascara], [f'{h:02d}h' for h in range(24)]
+        return dados[dim].codigos[mascara], dados[dim].rotulos
+
+    def _medida(self, dados, medida, grupo, total_grupos, mascara, resolucao):
+        if medida == 'chamados':
+            return np.bincount(grupo, minlength=total_grupos).astype(np.float64)
+        if medida in ('abertos', 'em_andamento', 'finalizados'):
+            status = {'abertos': 'aberto', 'em_andamento': 'em_andamento', 'finalizados': 'finalizado'}[medida]
+            no_status = dados['status'].codigos[mascara] == dados['status'].codigo_de(status)
+            return np.bincount(grupo, weights=no_status.astype(np.float64), minlength=total_grupos)
+
+        # Medidas de tempo de resolução
+        if not resolucao:
+            grupos, _, medias, percentis = percentis_por_grupo(grupo, dados['resolucao_horas'][mascara], (50, 90))
+            resolucao.update(grupos=grupos, medias=medias, percentis=percentis)
+        grupos, medias, percentis = resolucao['grupos'], resolucao['medias'], resolucao['percentis']
+
+        resultado = np.full(total_grupos, np.nan)
+        if medida == 'resolucao_media_horas':
+            resultado[grupos] = medias
+        else:
+            resultado[grupos] = percentis[50 if medida == 'resolucao_p50_horas' else 90]
+        return resultado
+
+# Instância global
+olap_snapshot = OLAPSnapshot()
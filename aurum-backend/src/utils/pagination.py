@@ -0,0 +1,51 @@
+"""
+Paginação por chave (keyset) para listagens ordenadas por data decrescente.
+O cursor guarda (data, id) do último item entregue; a página seguinte começa
+logo depois dele, então o custo não cresce com o número da página.
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+Pagina = namedtuple('Pagina', 'itens proximo_cursor tem_mais')
+
+def codificar_cursor(data, id):
+    """Cursor opaco para a posição (data, id)"""
+    return urlsafe_b64encode(f'{data.isoformat()}|{id}'.encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor):
+    """Retorna (data, id) do cursor, ou None se ausente/inválido"""
+    if not cursor:
+        return None
+    try:
+        texto = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        data, id = texto.rsplit('|', 1)
+        return datetime.fromisoformat(data), int(id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+def paginar_por_chave(query, coluna_data, coluna_id, cursor=None, por_pagina=30):
+    """
+    Aplica ORDER BY data DESC, id DESC e o filtro do cursor, buscando uma linha a mais
+    para saber se existe próxima página. Os itens precisam expor os atributos das colunas.
+    """
+    posicao = decodificar_cursor(cursor)
+    if posicao:
+        data, id = posicao
+        query = query.filter(or_(
+            coluna_data < data,
+            and_(coluna_data == data, coluna_id < id)
+        ))
+
+    itens = query.order_by(coluna_data.desc(), coluna_id.desc()).limit(por_pagina + 1).all()
+    tem_mais = len(itens) > por_pagina
+    itens = itens[:por_pagina]
+
+    proximo_cursor = None
+    if tem_mais:
+        ultimo = itens[-1]
+        proximo_cursor = codificar_cursor(getattr(ultimo, coluna_data.key), getattr(ultimo, coluna_id.key))
+
+    return Pagina(itens, proximo_cursor, tem_mais)
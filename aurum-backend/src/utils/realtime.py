@@ -0,0 +1,487 @@
+import atexit
+import os
+import pickle
+import queue
+import threading
+import time
+import uuid
+from collections import Counter
+
+import socketio as python_socketio
+from flask import request
+from flask_socketio import SocketIO, join_room, emit, ConnectionRefusedError
+from sqlalchemy import event, select
+
+from src.models.user import db
+from src.utils.current_user import usuario_atual
+
+# Tipos de usuário com sala própria (role:<tipo>)
+TIPOS_USUARIO = ('administrador', 'tecnico', 'cliente')
+
+class LocalManager(python_socketio.PubSubManager):
+    """
+    Gerenciador do Socket.IO sobre a fila local:// (src.utils.message_queue): substitui o
+    Redis em testes, com o mesmo caminho de publicar/assinar dos processos reais.
+    Só para async_mode threading (a leitura da fila bloqueia a thread).
+    """
+
+    name = 'local'
+
+    def __init__(self, url='local://', channel='socketio', write_only=False, logger=None):
+        from src.utils.message_queue import abrir_fila
+
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self._fila = abrir_fila(url, channel)
+        self._entrada = queue.Queue()
+
+    def initialize(self):
+        if not self.write_only:
+            self._fila.assinar(self._entrada.put)
+        super().initialize()
+
+    def _publish(self, data):
+        self._fila.publicar(pickle.dumps(data))
+
+    def _listen(self):
+        while True:
+            yield self._entrada.get()
+
+def opcoes_fila(message_queue, channel, write_only=False):
+    """Argumentos do SocketIO para a fila configurada (local:// usa o LocalManager)"""
+    if not message_queue:
+        return {}
+    opcoes = {'message_queue': message_queue, 'channel': channel}
+    if message_queue.startswith('local://'):
+        opcoes['client_manager'] = LocalManager(message_queue, channel=channel, write_only=write_only)
+    return opcoes
+
+class EventCoalescer:
+    """
+    Junta os eventos emitidos para o mesmo destino (sala ou lista de salas) numa janela curta.
+    No fim da janela cada destino recebe um único `batch` com a quantidade, a contagem por
+    evento e os itens mais recentes (até max_itens); um evento sozinho segue sem alteração.
+    Eventos de estado (unread_count) não entram no lote: vai só o último.
+    Em rajadas (importações, mudanças em massa, POST /api/tickets em sequência) o navegador
+    recebe um evento por janela em vez de um por chamado.
+    """
+
+    # Eventos em que só o valor mais recente importa
+    SUBSTITUIVEIS = ('unread_count',)
+
+    def __init__(self, socketio=None, janela_ms=250, max_itens=20):
+        self.socketio = socketio
+        self.janela_ms = janela_ms
+        self.max_itens = max_itens
+        self._pendentes = {}  # destino -> [(evento, dados)]
+        self._agendado = False
+        self._lock = threading.Lock()
+
+        # Processos curtos (jobs, CLI) não perdem o que ficou na janela
+        atexit.register(self.esvaziar)
+
+    def emitir(self, evento, dados, to):
+        """Emite agora (janela 0) ou guarda para o fim da janela"""
+        if self.janela_ms <= 0:
+            self.socketio.emit(evento, dados, to=to)
+            return
+
+        destino = tuple(sorted(to)) if isinstance(to, (list, tuple)) else (to,)
+        with self._lock:
+            self._pendentes.setdefault(destino, []).append((evento, dados))
+            agendar = not self._agendado
+            self._agendado = True
+
+        if agendar:
+            self.socketio.start_background_task(self._esvaziar_apos_janela)
+
+    def _esvaziar_apos_janela(self):
+        self.socketio.sleep(self.janela_ms / 1000)
+        self.esvaziar()
+
+    def esvaziar(self):
+        """Envia tudo o que está guardado"""
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+            self._agendado = False
+
+        for destino, eventos in pendentes.items():
+            try:
+                self._enviar(list(destino) if len(destino) > 1 else destino[0], eventos)
+            except Exception as e:
+                print(f"Erro ao enviar lote de eventos para {destino}: {e}")
+
+    def _enviar(self, to, eventos):
+        ultimos = {}
+        itens = []
+        for evento, dados in eventos:
+            if evento in self.SUBSTITUIVEIS:
+                ultimos[evento] = dados
+            else:
+                itens.append((evento, dados))
+
+        if len(itens) == 1:
+            self.socketio.emit(itens[0][0], itens[0][1], to=to)
+        elif itens:
+            self.socketio.emit('batch', {
+                'count': len(itens),
+                'events': dict(Counter(evento for evento, _ in itens)),
+                'items': [{'event': evento, 'data': dados} for evento, dados in itens[-self.max_itens:]],
+                'truncated': len(itens) > self.max_itens
+            }, to=to)
+
+        # Estado por último: reflete tudo o que veio antes
+        for evento, dados in ultimos.items():
+            self.socketio.emit(evento, dados, to=to)
+
+class PresenceRegistry:
+    """
+    Quem está com o sistema aberto, alimentado por connect/disconnect e heartbeats do socket.
+    Online = socket conectado com heartbeat recente, ou desconectado há menos do período
+    de tolerância (troca de página reconecta em seguida). Em memória; com vários workers
+    cada processo publica seus eventos na fila (compartilhar) e aplica os dos outros.
+    """
+
+    def __init__(self, tolerancia_segundos=60, heartbeat_timeout_segundos=90):
+        self.tolerancia_segundos = tolerancia_segundos
+        self.heartbeat_timeout_segundos = heartbeat_timeout_segundos
+        self._usuarios = {}  # usuario_id -> {'sids': set, 'visto_em': timestamp}
+        self._lock = threading.Lock()
+        self._fila = None
+        self._origem = uuid.uuid4().hex  # Identifica as mensagens deste processo
+
+    def compartilhar(self, fila):
+        """Publica connect/heartbeat/disconnect na fila e aplica os dos outros processos"""
+        self._fila = fila
+        fila.assinar(self._receber)
+
+    def conectar(self, usuario_id, sid):
+        self._aplicar('conectar', usuario_id, sid)
+        self._publicar('conectar', usuario_id, sid)
+
+    def heartbeat(self, usuario_id, sid):
+        self._aplicar('heartbeat', usuario_id, sid)
+        self._publicar('heartbeat', usuario_id, sid)
+
+    def desconectar(self, usuario_id, sid):
+        self._aplicar('desconectar', usuario_id, sid)
+        self._publicar('desconectar', usuario_id, sid)
+
+    def _aplicar(self, acao, usuario_id, sid):
+        # visto_em é sempre o relógio de quem aplica: não depende do relógio dos outros servidores
+        with self._lock:
+            registro = self._usuarios.get(usuario_id)
+            if registro is None:
+                if acao == 'desconectar':
+                    return
+                registro = self._usuarios[usuario_id] = {'sids': set(), 'visto_em': 0}
+            if acao == 'desconectar':
+                registro['sids'].discard(sid)
+            else:
+                registro['sids'].add(sid)
+            registro['visto_em'] = time.time()
+
+    def _publicar(self, acao, usuario_id, sid):
+        if self._fila is None:
+            return
+        try:
+            self._fila.publicar(pickle.dumps({'origem': self._origem, 'acao': acao,
+                                              'usuario_id': usuario_id, 'sid': sid}))
+        except Exception as e:
+            print(f"Erro ao publicar presença na fila: {e}")
+
+    def _receber(self, mensagem):
+        """Aplica o evento de presença de outro processo"""
+        dados = pickle.loads(mensagem)
+        if dados['origem'] == self._origem:
+            return
+        self._aplicar(dados['acao'], dados['usuario_id'], dados['sid'])
+
+    def _online(self, registro, agora):
+        if registro is None:
+            return False
+        limite = self.heartbeat_timeout_segundos if registro['sids'] else self.tolerancia_segundos
+        return agora - registro['visto_em'] <= limite
+
+    def online(self, usuario_id):
+        with self._lock:
+            return self._online(self._usuarios.get(usuario_id), time.time())
+
+    def separar(self, usuarios):
+        """(online, offline) de uma lista de usuários (qualquer objeto com .id)"""
+        agora = time.time()
+        online, offline = [], []
+        with self._lock:
+            for usuario in usuarios:
+                (online if self._online(self._usuarios.get(usuario.id), agora) else offline).append(usuario)
+        return online, offline
+
+    def estatisticas(self):
+        agora = time.time()
+        with self._lock:
+            online = sum(1 for registro in self._usuarios.values() if self._online(registro, agora))
+            sockets = sum(len(registro['sids']) for registro in self._usuarios.values())
+        return {'online': online, 'sockets': sockets, 'tracked': len(self._usuarios)}
+
+class RealtimeNotifier:
+    """
+    Envio das notificações in-app pelo Socket.IO.
+    As escritas de notificação agendam o envio na sessão do banco (agendar); depois do
+    commit o notifier lê os contadores dos destinatários numa única consulta e envia
+    `unread_count` para a sala de cada usuário e `notification` (quando há item novo)
+    para as salas do público, passando pelo EventCoalescer. Rollback descarta o que foi agendado.
+    Só conexões com login são aceitas; cada uma entra em user:<id>, role:<tipo> e
+    empresa:<id>, e todo envio é direcionado a essas salas (nada vai para todos).
+    """
+
+    # Chave em session.info com os envios aguardando o commit
+    CHAVE_PENDENTES = 'realtime_pendentes'
+
+    def __init__(self, app=None, socketio=None):
+        self.app = app
+        self.socketio = socketio
+        self.coalescer = EventCoalescer(socketio)
+        self.presenca = PresenceRegistry()
+
+        # Configurações padrão
+        self.config = {
+            'enabled': True,  # Enviar contagens e notificações pelo socket
+            'coalesce_ms': 250,  # Janela para juntar eventos do mesmo destino (0 = sem lote)
+            'batch_max_items': 20,  # Itens mais recentes enviados em cada lote
+            'email_policy': 'offline',  # Emails de novo chamado: 'offline' (só quem não está online) ou 'todos'
+            'presence_grace_seconds': 60,  # Continua online por 1 minuto após desconectar
+            'presence_heartbeat_timeout_seconds': 90,  # Socket sem heartbeat há 90s conta como offline
+            'presence_channel': 'aurum-socketio-presenca'  # Canal da fila com a presença dos outros workers
+        }
+
+        if app is not None and socketio is not None:
+            self.init_app(app, socketio)
+
+    def init_app(self, app, socketio):
+        """
+        Inicializa com a aplicação Flask e o servidor Socket.IO (ou um emissor externo,
+        ver criar_emissor_externo, em processos que só publicam na fila)
+        """
+        self.app = app
+        self.socketio = socketio
+        self.config.update({
+            'enabled': app.config.get('REALTIME_ENABLED', self.config['enabled']),
+            'coalesce_ms': app.config.get('REALTIME_COALESCE_MS', self.config['coalesce_ms']),
+            'batch_max_items': app.config.get('REALTIME_BATCH_MAX_ITEMS', self.config['batch_max_items']),
+            'email_policy': app.config.get('NOTIFICATION_EMAIL_POLICY', self.config['email_policy']),
+            'presence_grace_seconds': app.config.get('PRESENCE_GRACE_SECONDS', self.config['presence_grace_seconds']),
+            'presence_heartbeat_timeout_seconds': app.config.get('PRESENCE_HEARTBEAT_TIMEOUT_SECONDS',
+                                                                 self.config['presence_heartbeat_timeout_seconds']),
+            'presence_channel': app.config.get('PRESENCE_CHANNEL',
+                                               f"{app.config.get('SOCKETIO_CHANNEL', 'aurum-socketio')}-presenca")
+        })
+        self.coalescer.socketio = socketio
+        self.coalescer.janela_ms = self.config['coalesce_ms']
+        self.coalescer.max_itens = self.config['batch_max_items']
+        self.presenca.tolerancia_segundos = self.config['presence_grace_seconds']
+        self.presenca.heartbeat_timeout_segundos = self.config['presence_heartbeat_timeout_seconds']
+        self._compartilhar_presenca(app.config.get('SOCKETIO_MESSAGE_QUEUE'))
+
+        event.listen(db.session, 'after_commit', self._apos_commit)
+        event.listen(db.session, 'after_rollback', self._apos_rollback)
+
+        self.register_socket_events(socketio)
+
+    def _compartilhar_presenca(self, url):
+        """
+        Com vários workers cada um só vê os próprios sockets: a presença passa pela fila.
+        Sem fila suportada para isso, ninguém pode ser dado como online com segurança e
+        todos recebem email (email_policy 'todos').
+        """
+        from src.utils.message_queue import abrir_fila, fila_suportada
+
+        if not url:
+            return  # Um processo só: a presença local já está completa
+
+        if not fila_suportada(url):
+            print(f"Fila {url} não compartilha presença entre processos: "
+                  f"emails de novo chamado vão para todos")
+            self.config['email_policy'] = 'todos'
+            return
+
+        self.presenca.compartilhar(abrir_fila(url, self.config['presence_channel']))
+
+    def register_socket_events(self, socketio):
+        """Registra os eventos de conexão do Socket.IO"""
+        @socketio.on('connect')
+        def handle_connect(auth=None):
+            usuario = usuario_atual()
+            if usuario is None:
+                # Sem sessão do helpdesk: recusar a conexão
+                raise ConnectionRefusedError('login necessário')
+
+            self._entrar_nas_salas(usuario)
+            self.presenca.conectar(usuario.id, request.sid)
+            print(f'Usuário {usuario.id} ({usuario.tipo}) conectado ao WebSocket')
+
+            # Contagem atual logo na conexão: o cliente não precisa buscar por HTTP
+            emit('unread_count', self._contagem_usuario(usuario))
+
+        @socketio.on('disconnect')
+        def handle_disconnect():
+            usuario = usuario_atual()
+            if usuario is not None:
+                self.presenca.desconectar(usuario.id, request.sid)
+            print('Cliente desconectado do WebSocket')
+
+        @socketio.on('heartbeat')
+        def handle_heartbeat(data=None):
+            """Enviado pelo navegador a cada 30s enquanto a página está aberta"""
+            usuario = usuario_atual()
+            if usuario is not None:
+                self.presenca.heartbeat(usuario.id, request.sid)
+
+        @socketio.on('join_notifications')
+        def handle_join_notifications(data=None):
+            """
+            Mantido para clientes antigos. As salas vêm da sessão, nunca do tipo
+            informado pelo cliente; responde com as salas em que o socket está.
+            """
+            usuario = usuario_atual()
+            if usuario is None:
+                return
+            emit('joined', {'rooms': self._entrar_nas_salas(usuario)})
+
+    def _entrar_nas_salas(self, usuario):
+        salas = self.salas(usuario)
+        for sala in salas:
+            join_room(sala)
+        return salas
+
+    def salas(self, usuario):
+        """Salas de um usuário logado (UsuarioAtual)"""
+        salas = [self.sala_usuario(usuario.id), self.sala_perfil(usuario.tipo)]
+        if usuario.empresa_id is not None:
+            salas.append(self.sala_empresa(usuario.empresa_id))
+        return salas
+
+    def sala_usuario(self, usuario_id):
+        return f'user:{usuario_id}'
+
+    def sala_perfil(self, tipo):
+        return f'role:{tipo}'
+
+    def sala_empresa(self, empresa_id):
+        return f'empresa:{empresa_id}'
+
+    def salas_do_publico(self, publico):
+        """Salas de perfil que cobrem um público de notification_store.publicar"""
+        from src.utils.reference_cache import TIPOS_EQUIPE
+
+        if publico == 'equipe':
+            return [self.sala_perfil(tipo) for tipo in TIPOS_EQUIPE]
+        if publico == 'todos':
+            return [self.sala_perfil(tipo) for tipo in TIPOS_USUARIO]
+        return [self.sala_perfil(publico)]
+
+    def emitir_novo_chamado(self, ticket_data):
+        """Evento `new_ticket` para administradores e técnicos conectados"""
+        if not self.config['enabled'] or self.socketio is None:
+            return
+        self.coalescer.emitir('new_ticket', {
+            'message': 'Novo chamado aberto!',
+            'ticket': ticket_data,
+            'timestamp': ticket_data.get('created_at')
+        }, to=self.salas_do_publico('equipe'))
+
+    def destinatarios_email(self, usuarios):
+        """
+        Política de roteamento: quem está online já recebeu o push e não recebe email.
+        Com email_policy 'todos' (ou o socket desligado) todos recebem.
+        """
+        if self.config['email_policy'] == 'todos' or not self.config['enabled'] or self.socketio is None:
+            return list(usuarios)
+        return self.presenca.separar(usuarios)[1]
+
+    def _contagem_usuario(self, usuario):
+        from src.utils.notification_store import notification_store
+
+        nao_lidas, total, versao = notification_store.contador(usuario)
+        return {'count': nao_lidas, 'total': total, 'versao': versao}
+
+    def agendar(self, usuarios=None, publico=None, empresa_id=None, notificacao=None, session=None):
+        """
+        Agenda o envio para depois do commit da sessão: aos usuários informados (ids)
+        ou ao público (como em notification_store.publicar). `notificacao` é o item
+        enviado no evento `notification`; sem ele só a contagem é enviada.
+        """
+        if not self.config['enabled'] or self.socketio is None:
+            return
+        session = session or db.session
+        session.info.setdefault(self.CHAVE_PENDENTES, []).append({
+            'usuarios': list(usuarios) if usuarios is not None else None,
+            'publico': publico,
+            'empresa_id': empresa_id,
+            'notificacao': notificacao
+        })
+
+    def _apos_rollback(self, session):
+        session.info.pop(self.CHAVE_PENDENTES, None)
+
+    def _apos_commit(self, session):
+        pendentes = session.info.pop(self.CHAVE_PENDENTES, None)
+        if not pendentes:
+            return
+        try:
+            self.enviar(pendentes)
+        except Exception as e:
+            print(f"Erro ao enviar notificações pelo WebSocket: {e}")
+
+    def _destinatarios(self, pendente):
+        """Contadores dos destinatários de um envio agendado"""
+        from src.models.helpdesk_models import Usuario, ContadorNotificacao as Contador
+        from src.utils.notification_store import notification_store
+
+        consulta = select(Contador.usuario_id, Contador.nao_lidas, Contador.total, Contador.versao)
+        if pendente['usuarios'] is not None:
+            return consulta.where(Contador.usuario_id.in_(pendente['usuarios']))
+        return consulta.join(Usuario, Usuario.id == Contador.usuario_id).where(
+            notification_store._filtro_destinatarios(pendente['publico'], pendente['empresa_id'], somente_ativos=False)
+        )
+
+    def enviar(self, pendentes):
+        """
+        Envia os eventos agendados. A contagem só vai para usuários com contador: ele é
+        criado na conexão do socket (ou na primeira leitura), então quem nunca se conectou
+        fica de fora.
+        """
+        contagens = {}
+        # Conexão própria: a sessão acabou de fazer commit e não abre nova transação aqui
+        with db.engine.connect() as conexao:
+            for pendente in pendentes:
+                linhas = conexao.execute(self._destinatarios(pendente)).all()
+                for usuario_id, nao_lidas, total, versao in linhas:
+                    contagens[usuario_id] = {'count': nao_lidas, 'total': total, 'versao': versao}
+
+                if pendente['notificacao'] is None:
+                    continue
+                if pendente['usuarios'] is None and pendente['empresa_id'] is None:
+                    # Público inteiro de um perfil: um envio por sala, não por usuário
+                    salas = self.salas_do_publico(pendente['publico'])
+                else:
+                    salas = [self.sala_usuario(usuario_id) for usuario_id, *_ in linhas]
+                if salas:
+                    self.coalescer.emitir('notification', pendente['notificacao'], to=salas)
+
+        for usuario_id, contagem in contagens.items():
+            self.coalescer.emitir('unread_count', contagem, to=self.sala_usuario(usuario_id))
+
+# Instância global
+realtime_notifier = RealtimeNotifier()
+
+def criar_emissor_externo(message_queue=None, channel=None):
+    """
+    Emissor para processos que não servem sockets (jobs, comandos CLI, workers): publica na
+    fila de mensagens e os processos web entregam às salas. Usa SOCKETIO_MESSAGE_QUEUE e
+    SOCKETIO_CHANNEL do ambiente quando não informados.
+    Ex.: criar_emissor_externo().emit('unread_count', dados, to='user:5')
+    """
+    message_queue = message_queue or os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    if not message_queue:
+        raise ValueError('SOCKETIO_MESSAGE_QUEUE não configurada: sem fila não há como alcançar os processos web')
+    return SocketIO(**opcoes_fila(message_queue, channel or os.getenv('SOCKETIO_CHANNEL', 'aurum-socketio'),
+                                  write_only=True))
@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from src.models.user import db
+
+# Fotografias imutáveis dos cadastros; os nomes dos campos são os mesmos dos modelos
+UsuarioRef = namedtuple('UsuarioRef', 'id nome email telefone tipo_usuario empresa_id ativo data_criacao')
+EmpresaRef = namedtuple('EmpresaRef', 'id nome_empresa organizador telefone cnpj ativa data_criacao')
+ServicoRef = namedtuple('ServicoRef', 'id nome descricao ativo data_criacao')
+
+# Itens das listas de cadastros ativos (selects dos formulários e endpoints /helpdesk/dados/*)
+EmpresaOpcao = namedtuple('EmpresaOpcao', 'id nome_empresa')
+ServicoOpcao = namedtuple('ServicoOpcao', 'id nome')
+UsuarioOpcao = namedtuple('UsuarioOpcao', 'id nome email tipo_usuario')
+
+# Tipos de usuário que atendem chamados
+TIPOS_EQUIPE = ('tecnico', 'administrador')
+
+class ReferenceCache:
+    """
+    Cache entre requisições de usuários, empresas e serviços buscados por id.
+    Guarda fotografias (namedtuple), não objetos ORM, então pode ser compartilhado
+    entre threads e sessões. Limitado por quantidade (LRU) e por tempo (TTL), e
+    invalidado linha a linha pelos hooks de commit do banco.
+    Também mantém as listas de cadastros ativos, descartadas a cada alteração na tabela.
+    """
+
+    # Tabela -> fotografia
+    TABELAS = {
+        'helpdesk_usuarios': UsuarioRef,
+        'helpdesk_empresas': EmpresaRef,
+        'helpdesk_servicos': ServicoRef
+    }
+
+    # Lista de ativos -> tabela que a invalida
+    LISTAS = {
+        'empresas': 'helpdesk_empresas',
+        'servicos': 'helpdesk_servicos',
+        'usuarios': 'helpdesk_usuarios'
+    }
+
+    def __init__(self, app=None):
+        self.app = app
+        self._itens = OrderedDict()  # (tabela, id) -> (fotografia, expira_em)
+        self._listas = {}  # nome da lista -> (itens, expira_em)
+        self._lock = threading.Lock()
+        self._estatisticas = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+        # Configurações padrão
+        self.config = {
+            'max_entries': 2000,  # Linhas mantidas em memória
+            'ttl_seconds': 300  # Rebuscar no banco após 5 minutos
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        from src.utils.database_logging_hooks import database_logging_hooks
+
+        self.app = app
+        self.config.update({
+            'max_entries': app.config.get('REFERENCE_CACHE_MAX_ENTRIES', self.config['max_entries']),
+            'ttl_seconds': app.config.get('REFERENCE_CACHE_TTL_SECONDS', self.config['ttl_seconds'])
+        })
+
+        database_logging_hooks.register_commit_listener(self.aplicar_alteracoes)
+
+    def _modelo(self, tabela):
+        from src.models.helpdesk_models import Usuario, Empresa, Servico
+        return {'helpdesk_usuarios': Usuario, 'helpdesk_empresas': Empresa, 'helpdesk_servicos': Servico}[tabela]
+
+    def _buscar(self, tabela, ids):
+        """Uma consulta projetada para todos os ids ausentes"""
+        modelo = self._modelo(tabela)
+        fotografia = self.TABELAS[tabela]
+        colunas = [getattr(modelo, campo) for campo in fotografia._fields]
+        linhas = db.session.query(*colunas).filter(modelo.id.in_(ids)).all()
+        return {linha.id: fotografia._make(linha) for linha in linhas}
+
+    def obter_varios(self, tabela, ids):
+        """Retorna {id: fotografia} dos ids existentes, buscando no banco só os ausentes"""
+        agora = time.time()
+        encontrados, ausentes = {}, []
+
+        with self._lock:
+            for id in dict.fromkeys(i for i in ids if i is not None):
+                item = self._itens.get((tabela, id))
+                if item is not None and item[1] > agora:
+                    self._itens.move_to_end((tabela, id))
+                    encontrados[id] = item[0]
+                    self._estatisticas['hits'] += 1
+                else:
+                    ausentes.append(id)
+                    self._estatisticas['misses'] += 1
+
+        if ausentes:
+            buscados = self._buscar(tabela, ausentes)
+            expira_em = time.time() + self.config['ttl_seconds']
+            with self._lock:
+                for id, fotografia in buscados.items():
+                    self._itens[(tabela, id)] = (fotografia, expira_em)
+                    self._itens.move_to_end((tabela, id))
+                while len(self._itens) > self.config['max_entries']:
+                    self._itens.popitem(last=False)
+                    self._estatisticas['evictions'] += 1
+            encontrados.update(buscados)
+
+        return encontrados
+
+    def obter(self, tabela, id):
+        """Fotografia da linha, ou None se não existir"""
+        if id is None:
+            return None
+        return self.obter_varios(tabela, [int(id)]).get(int(id))
+
+    def usuario(self, id):
+        return self.obter('helpdesk_usuarios', id)
+
+    def empresa(self, id):
+        return self.obter('helpdesk_empresas', id)
+
+    def servico(self, id):
+        return self.obter('helpdesk_servicos', id)
+
+    def usuarios(self, ids):
+        """UsuarioRef dos ids informados, na ordem de id"""
+        return [u for _, u in sorted(self.obter_varios('helpdesk_usuarios', ids).items())]
+
+    def _consulta_lista(self, nome):
+        from src.models.helpdesk_models import Usuario, Empresa, Servico
+        return {
+            'empresas': (EmpresaOpcao, db.session.query(Empresa.id, Empresa.nome_empresa)
+                         .filter(Empresa.ativa == True).order_by(Empresa.nome_empresa)),
+            'servicos': (ServicoOpcao, db.session.query(Servico.id, Servico.nome)
+                         .filter(Servico.ativo == True).order_by(Servico.nome)),
+            'usuarios': (UsuarioOpcao, db.session.query(Usuario.id, Usuario.nome, Usuario.email, Usuario.tipo_usuario)
+                         .filter(Usuario.ativo == True).order_by(Usuario.tipo_usuario, Usuario.nome))
+        }[nome]
+
+    def _lista(self, nome):
+        with self._lock:
+            item = self._listas.get(nome)
+            if item is not None and item[1] > time.time():
+                self._estatisticas['hits'] += 1
+                return item[0]
+            self._estatisticas['misses'] += 1
+
+        fotografia, consulta = self._consulta_lista(nome)
+        itens = tuple(fotografia._make(linha) for linha in consulta)
+        with self._lock:
+            self._listas[nome] = (itens, time.time() + self.config['ttl_seconds'])
+        return itens
+
+    def empresas_ativas(self):
+        """EmpresaOpcao das empresas ativas, por nome"""
+        return self._lista('empresas')
+
+    def servicos_ativos(self):
+        """ServicoOpcao dos serviços ativos, por nome"""
+        return self._lista('servicos')
+
+    def usuarios_ativos(self):
+        """UsuarioOpcao dos usuários ativos, por tipo e nome"""
+        return self._lista('usuarios')
+
+    def tecnicos_ativos(self):
+        """UsuarioOpcao de técnicos e administradores ativos, por nome"""
+        return tuple(sorted((u for u in self.usuarios_ativos() if u.tipo_usuario in TIPOS_EQUIPE),
+                            key=lambda u: u.nome))
+
+    def invalidar(self, tabela=None, id=None):
+        """Remove uma linha, uma tabela inteira ou tudo (e as listas da tabela)"""
+        with self._lock:
+            for nome, tabela_lista in self.LISTAS.items():
+                if tabela is None or tabela_lista == tabela:
+                    self._listas.pop(nome, None)
+
+            if tabela is None:
+                self._itens.clear()
+            elif id is None:
+                for chave in [chave for chave in self._itens if chave[0] == tabela]:
+                    del self._itens[chave]
+            else:
+                self._itens.pop((tabela, id), None)
+            self._estatisticas['invalidations'] += 1
+
+    def aplicar_alteracoes(self, alteracoes):
+        """Ouvinte de commit: descarta as linhas alteradas (ou a tabela, em alterações em massa)"""
+        for alteracao in alteracoes:
+            if alteracao['table'] in self.TABELAS:
+                self.invalidar(alteracao['table'], alteracao['id'])
+
+    def estatisticas(self):
+        """Contadores de acertos/erros e ocupação do cache"""
+        with self._lock:
+            estatisticas = dict(self._estatisticas)
+            estatisticas['entries'] = len(self._itens)
+            estatisticas['lists'] = len(self._listas)
+        consultas = estatisticas['hits'] + estatisticas['misses']
+        estatisticas['hit_rate'] = round(estatisticas['hits'] / consultas, 4) if consultas else 0.0
+        estatisticas['max_entries'] = self.config['max_entries']
+        estatisticas['ttl_seconds'] = self.config['ttl_seconds']
+        return estatisticas
+
+# Instância global
+reference_cache = ReferenceCache()
@@ -0,0 +1,123 @@
+"""
+Linhas leves (namedtuple) usadas pelos relatórios e pelo ReportExporter.
+São montadas a partir de consultas com colunas projetadas, sem manter objetos
+ORM nem relacionamentos lazy vivos durante a renderização.
+"""
+from collections import namedtuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from src.models.user import db
+from src.models.helpdesk_models import Usuario, Empresa, Chamado
+
+EmpresaLinha = namedtuple('EmpresaLinha', 'id nome_empresa cnpj organizador telefone data_criacao')
+UsuarioLinha = namedtuple('UsuarioLinha', 'id nome email telefone tipo_usuario data_criacao')
+ChamadoDetalhe = namedtuple(
+    'ChamadoDetalhe',
+    'id titulo status prioridade data_abertura data_finalizacao usuario tecnico tempo_resolucao'
+)
+ChamadoResumo = namedtuple(
+    'ChamadoResumo',
+    'id titulo descricao_inicio status data_criacao data_finalizacao usuario_nome usuario_tipo empresa_nome'
+)
+
+# Caracteres da descrição carregados no resumo (o template mostra 80 e indica se há mais)
+TAMANHO_DESCRICAO_RESUMO = 81
+
+def _colunas(modelo, linha):
+    return [getattr(modelo, campo) for campo in linha._fields]
+
+def empresas(*criterios):
+    """EmpresaLinha das empresas que atendem aos critérios"""
+    consulta = db.session.query(*_colunas(Empresa, EmpresaLinha)).filter(*criterios).order_by(Empresa.id)
+    return [EmpresaLinha._make(linha) for linha in consulta]
+
+def usuarios(*criterios):
+    """UsuarioLinha dos usuários que atendem aos critérios"""
+    consulta = db.session.query(*_colunas(Usuario, UsuarioLinha)).filter(*criterios).order_by(Usuario.id)
+    return [UsuarioLinha._make(linha) for linha in consulta]
+
+class ChamadosDetalhados:
+    """
+    ChamadoDetalhe dos chamados da consulta, mais recentes primeiro, lidos do banco só
+    ao iterar e em lotes (yield_per): a memória não cresce com o número de chamados.
+    limitar(n) leva o limite para o SQL (LIMIT), sem buscar linhas que não serão usadas.
+    """
+
+    # Linhas buscadas por vez ao iterar
+    LOTE = 500
+
+    def __init__(self, consulta, total=None, limite=None):
+        self._consulta = consulta
+        self._total = total
+        self._limite = limite
+
+    def limitar(self, limite):
+        """Mesma listagem com no máximo `limite` linhas"""
+        if self._limite is not None:
+            limite = min(limite, self._limite)
+        return ChamadosDetalhados(self._consulta, self._total, max(limite, 0))
+
+    def __bool__(self):
+        if self._limite == 0:
+            return False
+        if self._total is not None:
+            return self._total > 0
+        return self._consulta.limit(1).first() is not None
+
+    def __iter__(self):
+        consulta = self._consulta if self._limite is None else self._consulta.limit(self._limite)
+        for id, titulo, status, prioridade, data_criacao, data_finalizacao, usuario_nome, tecnico_nome in \
+                consulta.yield_per(self.LOTE):
+            yield ChamadoDetalhe(
+                id, titulo, status, prioridade, data_criacao, data_finalizacao,
+                usuario_nome or 'N/A',
+                tecnico_nome or 'N/A',
+                (data_finalizacao - data_criacao).days if data_finalizacao and data_criacao else None
+            )
+
+def chamados_detalhados(query_chamados, total=None):
+    """
+    ChamadosDetalhados (iterável sob demanda) dos chamados da consulta.
+    `total`, quando já contado, evita uma consulta extra para saber se há chamados.
+    """
+    solicitante = aliased(Usuario)
+    tecnico = aliased(Usuario)
+    consulta = query_chamados.order_by(None).outerjoin(
+        solicitante, Chamado.usuario_id == solicitante.id
+    ).outerjoin(
+        tecnico, Chamado.tecnico_id == tecnico.id
+    ).with_entities(
+        Chamado.id,
+        Chamado.titulo,
+        Chamado.status,
+        Chamado.prioridade,
+        Chamado.data_criacao,
+        Chamado.data_finalizacao,
+        solicitante.nome,
+        tecnico.nome
+    ).order_by(Chamado.data_criacao.desc(), Chamado.id.desc())
+
+    return ChamadosDetalhados(consulta, total)
+
+def chamados_recentes(query_chamados, limite=5):
+    """ChamadoResumo dos chamados mais recentes, com solicitante e empresa já resolvidos"""
+    solicitante = aliased(Usuario)
+    consulta = query_chamados.order_by(None).outerjoin(
+        solicitante, Chamado.usuario_id == solicitante.id
+    ).outerjoin(
+        Empresa, solicitante.empresa_id == Empresa.id
+    ).with_entities(
+        Chamado.id,
+        Chamado.titulo,
+        func.substr(Chamado.descricao, 1, TAMANHO_DESCRICAO_RESUMO),
+        Chamado.status,
+        Chamado.data_criacao,
+        Chamado.data_finalizacao,
+        solicitante.nome,
+        solicitante.tipo_usuario,
+        Empresa.nome_empresa
+    ).order_by(Chamado.data_criacao.desc()).limit(limite)
+
+    return [ChamadoResumo._make(linha) for linha in consulta]
@@ -0,0 +1,179 @@
+from sqlalchemy import func, or_, select, text
+
+from src.models.user import db
+
+class SchemaMigrations:
+    """
+    Migrações versionadas de índices do helpdesk.
+    db.create_all() não cria nem altera índices em tabelas que já existem; cada migração
+    remove/cria índices declarados nos modelos e grava a versão em PRAGMA user_version,
+    então só as migrações pendentes rodam em cada inicialização.
+    """
+
+    # (versão, descrição, índices a remover, índices a criar) - nomes declarados nos modelos
+    MIGRACOES = (
+        (1, 'Índices de relatórios, fila e SLA',
+         (),
+         ('idx_chamado_usuario_data', 'idx_chamado_empresa_data', 'idx_chamado_tecnico_data',
+          'idx_chamado_data', 'idx_chamado_status_data', 'idx_resposta_chamado_data')),
+        (2, 'Desempate por id nos índices por solicitante e empresa',
+         ('idx_chamado_usuario_data', 'idx_chamado_empresa_data'),
+         ('idx_chamado_usuario_data', 'idx_chamado_empresa_data')),
+        (3, 'Índices de notificações e índices parciais dos cadastros ativos',
+         (),
+         ('idx_notificacao_usuario_lida_data', 'idx_notificacao_usuario_data', 'idx_usuario_empresa_ativo',
+          'idx_usuario_nome_ativo', 'idx_empresa_nome_ativa', 'idx_servico_nome_ativo')),
+        (4, 'Índice da retenção de notificações',
+         (),
+         ('idx_notificacao_lida_data',)),
+    )
+
+    def __init__(self, app=None):
+        self.app = app
+
+        # Configurações padrão
+        self.config = {
+            'analyze': True  # Atualizar estatísticas do planejador após migrar
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        self.config.update({
+            'analyze': app.config.get('SCHEMA_ANALYZE_AFTER_MIGRATION', self.config['analyze'])
+        })
+
+        self.register_cli_commands(app)
+
+    def register_cli_commands(self, app):
+        """Registra comandos CLI de migração e diagnóstico de consultas"""
+        @app.cli.command('migrate-schema')
+        def migrate_schema_command():
+            """Comando CLI para aplicar as migrações pendentes"""
+            with app.app_context():
+                aplicadas = self.migrar()
+                print(f"Migrações aplicadas: {aplicadas}")
+                print(f"Versão do esquema: {self.versao_atual()}")
+
+        @app.cli.command('explain-queries')
+        def explain_queries_command():
+            """Comando CLI para mostrar o plano das consultas mais usadas"""
+            with app.app_context():
+                resultados = self.explicar_consultas()
+                print("=== Plano das Consultas ===")
+                for nome, plano, alertas in resultados:
+                    print(f"\n{nome}")
+                    for linha in plano:
+                        print(f"  {linha}")
+                    for alerta in alertas:
+                        print(f"  [ALERTA] {alerta}")
+                com_alerta = sum(1 for _, _, alertas in resultados if alertas)
+                print(f"\nConsultas com alerta: {com_alerta} de {len(resultados)}")
+
+    def _sqlite(self):
+        return db.engine.dialect.name == 'sqlite'
+
+    def versao_atual(self, conexao=None):
+        """Versão gravada em PRAGMA user_version (0 fora do SQLite)"""
+        if not self._sqlite():
+            return 0
+        if conexao is not None:
+            return conexao.exec_driver_sql('PRAGMA user_version').scalar()
+        with db.engine.connect() as conexao:
+            return conexao.exec_driver_sql('PRAGMA user_version').scalar()
+
+    def _indices(self):
+        return {indice.name: indice for tabela in db.metadata.tables.values() for indice in tabela.indexes}
+
+    def migrar(self):
+        """Aplica as migrações pendentes, cada uma em sua transação; retorna quantas rodaram"""
+        indices = self._indices()
+        aplicadas = 0
+
+        for versao, descricao, remover, criar in self.MIGRACOES:
+            with db.engine.begin() as conexao:
+                # Fora do SQLite não há versão gravada: as migrações são idempotentes
+                if self._sqlite() and versao <= self.versao_atual(conexao):
+                    continue
+                for nome in remover:
+                    conexao.execute(text(f'DROP INDEX IF EXISTS {nome}'))
+                for nome in criar:
+                    indices[nome].create(bind=conexao, checkfirst=True)
+                if self._sqlite():
+                    conexao.exec_driver_sql(f'PRAGMA user_version = {versao}')
+            aplicadas += 1
+            print(f"Migração {versao} aplicada: {descricao}")
+
+        if self.config['analyze']:
+            with db.engine.begin() as conexao:
+                if aplicadas:
+                    conexao.execute(text('ANALYZE'))
+                elif self._sqlite():
+                    # Sem migração nova: o SQLite reanalisa só as tabelas que mudaram muito
+                    conexao.exec_driver_sql('PRAGMA optimize')
+
+        return aplicadas
+
+    def _consultas_quentes(self):
+        """Consultas das telas mais acessadas, no mesmo formato das rotas (parâmetros de exemplo)"""
+        from src.models.helpdesk_models import Usuario, Empresa, Servico, Chamado, RespostaChamado, Notificacao, EventoNotificacao
+
+        fila = select(Chamado.id).order_by(Chamado.data_criacao.desc(), Chamado.id.desc()).limit(31)
+        return [
+            ('Fila de chamados', fila),
+            ('Fila filtrada por status', fila.where(Chamado.status == 'aberto')),
+            ('Fila do técnico', fila.where(Chamado.tecnico_id == 1)),
+            ('Fila da empresa (cliente)', fila.where(or_(Chamado.empresa_id == 1, Chamado.usuario_id == 1))),
+            ('Contagem por status', select(Chamado.status, func.count(Chamado.id)).group_by(Chamado.status)),
+            ('Relatório da empresa por solicitante',
+             select(Chamado.usuario_id, Chamado.status, func.count(Chamado.id))
+             .where(Chamado.empresa_id == 1).group_by(Chamado.usuario_id, Chamado.status)),
+            ('Respostas do chamado',
+             select(RespostaChamado.id).where(RespostaChamado.chamado_id == 1).order_by(RespostaChamado.data_resposta)),
+            ('Notificações não lidas',
+             select(func.count(Notificacao.id)).where(Notificacao.usuario_id == 1, Notificacao.lida == False)),
+            ('Notificações recentes',
+             select(Notificacao.id).where(Notificacao.usuario_id == 1)
+             .order_by(Notificacao.data_criacao.desc()).limit(20)),
+            ('Retenção de notificações lidas',
+             select(Notificacao.id).where(Notificacao.lida == True, Notificacao.data_criacao < '2000-01-01')
+             .limit(1000)),
+            ('Notificações da equipe (broadcast)',
+             select(EventoNotificacao.id).where(EventoNotificacao.publico.in_(['todos', 'tecnico', 'equipe']),
+                                                EventoNotificacao.id > 0)),
+            ('Usuários ativos da empresa',
+             select(Usuario.id).where(Usuario.empresa_id == 1, Usuario.ativo == True)),
+            ('Técnicos ativos',
+             select(Usuario.id).where(Usuario.ativo == True, Usuario.tipo_usuario.in_(['tecnico', 'administrador']))
+             .order_by(Usuario.nome)),
+            ('Empresas ativas', select(Empresa.id).where(Empresa.ativa == True).order_by(Empresa.nome_empresa)),
+            ('Serviços ativos', select(Servico.id).where(Servico.ativo == True).order_by(Servico.nome)),
+        ]
+
+    def explicar_consultas(self):
+        """
+        Retorna [(nome, linhas do plano, alertas)] usando EXPLAIN QUERY PLAN.
+        Alerta em varredura completa de tabela e em ordenação feita fora de índice.
+        """
+        if not self._sqlite():
+            return []
+
+        resultados = []
+        with db.engine.connect() as conexao:
+            for nome, consulta in self._consultas_quentes():
+                sql = str(consulta.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+                plano = [linha[-1] for linha in conexao.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+                alertas = []
+                for detalhe in plano:
+                    if detalhe.startswith('SCAN') and 'INDEX' not in detalhe:
+                        alertas.append(f'varredura completa: {detalhe}')
+                    elif 'TEMP B-TREE' in detalhe:
+                        alertas.append(f'ordenação sem índice: {detalhe}')
+                resultados.append((nome, plano, alertas))
+        return resultados
+
+# Instância global
+schema_migrations = SchemaMigrations()
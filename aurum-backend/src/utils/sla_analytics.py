@@ -0,0 +1,262 @@
+from datetime import datetime
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import func, select
+
+from src.models.user import db
+from src.models.helpdesk_models import Usuario, Empresa, Servico, Chamado, RespostaChamado
+
+def percentis_por_grupo(codigos, valores, percentis):
+    """
+    Percentis (interpolação linear, como np.percentile) de cada grupo sem laço por linha:
+    ordena por (grupo, valor) e lê as posições de cada percentil dentro do bloco do grupo.
+    Valores NaN são ignorados. Retorna (grupos, quantidades, medias, {p: valores}).
+    """
+    validos = ~np.isnan(valores)
+    codigos, valores = codigos[validos], valores[validos]
+    if len(valores) == 0:
+        vazio = np.array([], dtype=np.float64)
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64), vazio, {p: vazio for p in percentis}
+
+    ordem = np.lexsort((valores, codigos))
+    codigos, valores = codigos[ordem], valores[ordem]
+    grupos, inicios, quantidades = np.unique(codigos, return_index=True, return_counts=True)
+    medias = np.add.reduceat(valores, inicios) / quantidades
+
+    resultado = {}
+    for p in percentis:
+        posicao = inicios + (quantidades - 1) * (p / 100.0)
+        abaixo = np.floor(posicao).astype(np.int64)
+        acima = np.ceil(posicao).astype(np.int64)
+        resultado[p] = valores[abaixo] + (valores[acima] - valores[abaixo]) * (posicao - abaixo)
+
+    return grupos, quantidades, medias, resultado
+
+class SLAAnalytics:
+    """
+    Métricas de SLA (tempo de resolução e de primeira resposta) calculadas em
+    colunas NumPy a partir de uma única consulta, com cache em memória.
+    """
+
+    PERCENTIS = (50, 90, 99)
+
+    # Tabelas cujas alterações mudam as métricas
+    TABELAS = ('helpdesk_chamados', 'helpdesk_respostas_chamados')
+
+    # Dimensões do relatório: nome -> coluna de agrupamento
+    DIMENSOES = {
+        'empresa': 'empresa_id',
+        'tecnico': 'tecnico_id',
+        'servico': 'servico_id',
+        'prioridade': 'prioridade'
+    }
+
+    def __init__(self, app=None):
+        self.app = app
+        self._cache = {}
+        self._lock = threading.Lock()
+
+        # Configurações padrão
+        self.config = {
+            'cache_ttl_seconds': 300,  # Resultados reaproveitados por 5 minutos
+            'metas_horas': {'alta': 8, 'media': 24, 'baixa': 72}  # Meta de resolução por prioridade
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        self.app = app
+        self.config.update({
+            'cache_ttl_seconds': app.config.get('SLA_CACHE_TTL_SECONDS', self.config['cache_ttl_seconds']),
+            'metas_horas': app.config.get('SLA_METAS_HORAS', self.config['metas_horas'])
+        })
+
+        from src.utils.database_logging_hooks import database_logging_hooks
+        database_logging_hooks.register_commit_listener(self.aplicar_alteracoes)
+
+    def invalidar_cache(self):
+        """Descarta todos os resultados em cache"""
+        with self._lock:
+            self._cache.clear()
+
+    def aplicar_alteracoes(self, alteracoes):
+        """Ouvinte de commit: chamados ou respostas alterados descartam o cache"""
+        if any(alteracao['table'] in self.TABELAS for alteracao in alteracoes):
+            self.invalidar_cache()
+
+    def calcular(self, query_chamados, chave_cache=None):
+        """
+        Calcula as métricas de SLA para os chamados da consulta.
+        `chave_cache` identifica a consulta (ex.: filtros aplicados); sem ela não há cache.
+        """
+        if chave_cache is not None:
+            with self._lock:
+                em_cache = self._cache.get(chave_cache)
+            if em_cache and time.time() - em_cache[0] < self.config['cache_ttl_seconds']:
+                return em_cache[1]
+
+        resultado = self._calcular(self._carregar_colunas(query_chamados))
+
+        if chave_cache is not None:
+            with self._lock:
+                self._cache[chave_cache] = (time.time(), resultado)
+        return resultado
+
+    def _carregar_colunas(self, query_chamados):
+        """Busca apenas as colunas necessárias e devolve arrays NumPy"""
+        # Primeira resposta de alguém que não seja o solicitante
+        primeira_resposta = select(func.min(RespostaChamado.data_resposta)).where(
+            RespostaChamado.chamado_id == Chamado.id,
+            RespostaChamado.usuario_id != Chamado.usuario_id
+        ).correlate(Chamado).scalar_subquery()
+
+        linhas = query_chamados.order_by(None).with_entities(
+            Chamado.empresa_id,
+            Chamado.tecnico_id,
+            Chamado.servico_id,
+            Chamado.prioridade,
+            Chamado.data_criacao,
+            Chamado.data_finalizacao,
+            primeira_resposta
+        ).all()
+
+        empresa_id, tecnico_id, servico_id, prioridade, criacao, finalizacao, resposta = (
+            zip(*linhas) if linhas else ([],) * 7
+        )
+
+        # None vira NaN no array float e 0 (sem empresa/técnico/serviço) no nan_to_num
+        def ids(valores):
+            return np.nan_to_num(np.array(valores, dtype=float), nan=0).astype(np.int64)
+
+        # Prioridade ausente vira '' (np.unique não ordena None junto com texto)
+        prioridades = np.array(prioridade, dtype=object)
+        prioridades[np.equal(prioridades, None)] = ''
+
+        return {
+            'empresa_id': ids(empresa_id),
+            'tecnico_id': ids(tecnico_id),
+            'servico_id': ids(servico_id),
+            'prioridade': prioridades,
+            'data_criacao': np.array(criacao, dtype='datetime64[s]'),
+            'data_finalizacao': np.array(finalizacao, dtype='datetime64[s]'),
+            'primeira_resposta': np.array(resposta, dtype='datetime64[s]')
+        }
+
+    def _horas_entre(self, inicio, fim):
+        """Diferença em horas; NaN quando alguma das datas não existe"""
+        horas = (fim - inicio).astype('timedelta64[s]').astype(np.float64) / 3600.0
+        horas[np.isnat(inicio) | np.isnat(fim)] = np.nan
+        return horas
+
+    def _calcular(self, colunas):
+        resolucao = self._horas_entre(colunas['data_criacao'], colunas['data_finalizacao'])
+        primeira_resposta = self._horas_entre(colunas['data_criacao'], colunas['primeira_resposta'])
+
+        # Prioridade codificada uma vez; a meta é buscada só para cada valor distinto e
+        # espalhada pelos códigos (NaN se prioridade desconhecida)
+        prioridades, codigos_prioridade = np.unique(colunas['prioridade'], return_inverse=True)
+        metas_por_prioridade = np.array(
+            [self.config['metas_horas'].get(p, np.nan) for p in prioridades.tolist()],
+            dtype=np.float64
+        )
+        metas = metas_por_prioridade[codigos_prioridade]
+        codificadas = {'prioridade': (prioridades, codigos_prioridade)}
+
+        total = len(resolucao)
+        resultado = {
+            'gerado_em': datetime.now().isoformat(),
+            'total_chamados': total,
+            'metas_horas': dict(self.config['metas_horas']),
+            'geral': self._resumo_grupos(np.zeros(total, dtype=np.int64), resolucao, primeira_resposta, metas).get(0)
+                     or self._resumo_vazio(),
+        }
+
+        for dimensao, coluna in self.DIMENSOES.items():
+            chaves, codigos = codificadas.get(coluna) or np.unique(colunas[coluna], return_inverse=True)
+            por_codigo = self._resumo_grupos(codigos, resolucao, primeira_resposta, metas)
+            nomes = self._nomes(dimensao, chaves)
+            resultado[f'por_{dimensao}'] = [
+                dict(por_codigo[codigo], id=chave, nome=nomes.get(chave, 'N/A'))
+                for codigo, chave in enumerate(chaves.tolist())
+            ]
+
+        return resultado
+
+    def _resumo_grupos(self, codigos, resolucao, primeira_resposta, metas):
+        """Contagens, percentis e cumprimento de meta de todos os grupos de uma vez"""
+        grupos = {}
+        if len(codigos) == 0:
+            return grupos
+
+        chamados = np.bincount(codigos)
+        finalizados_no_prazo = np.bincount(
+            codigos, weights=(resolucao <= metas).astype(np.float64)
+        )
+        finalizados_com_meta = np.bincount(
+            codigos, weights=(~np.isnan(resolucao) & ~np.isnan(metas)).astype(np.float64)
+        )
+        estatisticas_resolucao = self._percentis_por_grupo(codigos, resolucao)
+        estatisticas_resposta = self._percentis_por_grupo(codigos, primeira_resposta)
+
+        for codigo in range(len(chamados)):
+            if chamados[codigo] == 0:
+                continue
+            com_meta = finalizados_com_meta[codigo]
+            grupos[codigo] = {
+                'chamados': int(chamados[codigo]),
+                'resolucao': estatisticas_resolucao.get(codigo, self._estatisticas_vazias()),
+                'primeira_resposta': estatisticas_resposta.get(codigo, self._estatisticas_vazias()),
+                'dentro_meta_pct': round(finalizados_no_prazo[codigo] / com_meta * 100, 1) if com_meta else None
+            }
+        return grupos
+
+    def _percentis_por_grupo(self, codigos, valores):
+        """Estatísticas de tempo de cada grupo, indexadas pelo código do grupo"""
+        grupos, quantidades, medias, percentis = percentis_por_grupo(codigos, valores, self.PERCENTIS)
+
+        estatisticas = {}
+        for i, grupo in enumerate(grupos.tolist()):
+            estatisticas[grupo] = {
+                'amostras': int(quantidades[i]),
+                'media_horas': round(float(medias[i]), 2),
+                **{f'p{p}_horas': round(float(percentis[p][i]), 2) for p in self.PERCENTIS}
+            }
+        return estatisticas
+
+    def _estatisticas_vazias(self):
+        return {
+            'amostras': 0,
+            'media_horas': None,
+            **{f'p{p}_horas': None for p in self.PERCENTIS}
+        }
+
+    def _resumo_vazio(self):
+        return {
+            'chamados': 0,
+            'resolucao': self._estatisticas_vazias(),
+            'primeira_resposta': self._estatisticas_vazias(),
+            'dentro_meta_pct': None
+        }
+
+    def _nomes(self, dimensao, chaves):
+        """Nomes legíveis para as chaves de cada dimensão"""
+        ids = [int(chave) for chave in chaves.tolist() if chave] if dimensao != 'prioridade' else []
+        if dimensao == 'empresa':
+            nomes = dict(db.session.query(Empresa.id, Empresa.nome_empresa).filter(Empresa.id.in_(ids)).all()) if ids else {}
+            nomes[0] = 'Sem empresa'
+        elif dimensao == 'tecnico':
+            nomes = dict(db.session.query(Usuario.id, Usuario.nome).filter(Usuario.id.in_(ids)).all()) if ids else {}
+            nomes[0] = 'Sem técnico'
+        elif dimensao == 'servico':
+            nomes = dict(db.session.query(Servico.id, Servico.nome).filter(Servico.id.in_(ids)).all()) if ids else {}
+            nomes[0] = 'Sem serviço'
+        else:
+            nomes = {chave: (chave.replace('_', ' ').title() if chave else 'Sem prioridade') for chave in chaves.tolist()}
+        return nomes
+
+# Instância global
+sla_analytics = SLAAnalytics()
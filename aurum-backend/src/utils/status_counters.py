@@ -0,0 +1,113 @@
+import threading
+import time
+
+from sqlalchemy import func
+
+from src.models.user import db
+
+class StatusCounters:
+    """
+    Contagem de chamados por status mantida em memória.
+    Carregada com um único GROUP BY e atualizada a cada commit pelos hooks do banco,
+    sem consultar a tabela de novo. Uma ressincronização periódica cobre alterações
+    feitas por outros processos.
+    """
+
+    # Tabela -> status conhecidos (sempre presentes no resultado, mesmo com zero)
+    TABELAS = {
+        'helpdesk_chamados': ('aberto', 'em_andamento', 'finalizado'),
+        'tickets': ('aberto', 'em_andamento', 'fechado')
+    }
+
+    def __init__(self, app=None):
+        self.app = app
+        self._contagens = {}
+        self._carregado_em = {}
+        self._lock = threading.Lock()
+
+        # Configurações padrão
+        self.config = {
+            'resync_seconds': 300  # Recarregar do banco a cada 5 minutos
+        }
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Inicializa com a aplicação Flask"""
+        from src.utils.database_logging_hooks import database_logging_hooks
+
+        self.app = app
+        self.config.update({
+            'resync_seconds': app.config.get('STATUS_COUNTERS_RESYNC_SECONDS', self.config['resync_seconds'])
+        })
+
+        database_logging_hooks.register_commit_listener(self.aplicar_alteracoes)
+
+    def _modelo(self, tabela):
+        from src.models.helpdesk_models import Chamado
+        from src.models.ticket import Ticket
+        return {'helpdesk_chamados': Chamado, 'tickets': Ticket}[tabela]
+
+    def _carregar(self, tabela):
+        modelo = self._modelo(tabela)
+        linhas = db.session.query(modelo.status, func.count(modelo.id)).group_by(modelo.status).all()
+        return {status: quantidade for status, quantidade in linhas}
+
+    def contagens(self, tabela='helpdesk_chamados'):
+        """Retorna {'total': n, <status>: n, ...} da tabela"""
+        with self._lock:
+            contagens = self._contagens.get(tabela)
+            expirado = time.time() - self._carregado_em.get(tabela, 0) > self.config['resync_seconds']
+
+        if contagens is None or expirado:
+            contagens = self._carregar(tabela)
+            with self._lock:
+                self._contagens[tabela] = contagens
+                self._carregado_em[tabela] = time.time()
+
+        with self._lock:
+            resultado = {status: 0 for status in self.TABELAS[tabela]}
+            resultado.update(contagens)
+        resultado['total'] = sum(resultado.values())
+        return resultado
+
+    def invalidar(self, tabela=None):
+        """Força recarregar do banco na próxima leitura"""
+        with self._lock:
+            if tabela is None:
+                self._contagens.clear()
+            else:
+                self._contagens.pop(tabela, None)
+
+    def aplicar_alteracoes(self, alteracoes):
+        """Ouvinte de commit: ajusta as contagens conforme inserções, exclusões e mudanças de status"""
+        with self._lock:
+            for alteracao in alteracoes:
+                contagens = self._contagens.get(alteracao['table'])
+                if contagens is None:
+                    continue
+
+                if alteracao['id'] is None:
+                    # Alteração em massa: valores desconhecidos
+                    self._contagens.pop(alteracao['table'], None)
+                    continue
+
+                operacao = alteracao['operation']
+                if operacao == 'update' and 'status' not in alteracao['new']:
+                    continue
+                anterior = alteracao['old'].get('status')
+                if operacao in ('update', 'delete') and anterior is None:
+                    # Status anterior não estava carregado: recarregar na próxima leitura
+                    self._contagens.pop(alteracao['table'], None)
+                    continue
+                if operacao in ('update', 'delete'):
+                    contagens[anterior] = contagens.get(anterior, 0) - 1
+                    if contagens[anterior] <= 0:
+                        contagens.pop(anterior)
+                if operacao in ('update', 'insert'):
+                    novo = alteracao['new'].get('status')
+                    contagens[novo] = contagens.get(novo, 0) + 1
+
+# Instância global
+status_counters = StatusCounters()
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# Os testes importam o pacote src a partir da raiz do backend
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """Aplicação completa sobre um SQLite temporário, com os dados padrão criados na importação"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('banco') / 'app.db'}"
+
+    from src.main import app
+    from src.utils.realtime import realtime_notifier
+    app.config['TESTING'] = True
+    realtime_notifier.coalescer.janela_ms = 0  # Envio imediato, sem a thread do lote
+    return app
+
+@pytest.fixture
+def contexto(app):
+    from src.models.user import db
+
+    with app.app_context():
+        yield
+        db.session.rollback()
@@ -0,0 +1,91 @@
+import pytest
+from flask import Flask, jsonify
+
+from src.utils.change_tracking import change_tracking, etag_condicional
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'teste'
+
+    @app.route('/dados')
+    @etag_condicional('tabela_teste')
+    def dados():
+        app.chamadas += 1
+        return jsonify({'ok': True})
+
+    @app.route('/negado')
+    @etag_condicional('tabela_teste')
+    def negado():
+        return jsonify({'error': 'Acesso negado'}), 403
+
+    app.chamadas = 0
+    return app
+
+def _logar(cliente, usuario_id=1, tipo='administrador'):
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = usuario_id
+        sessao['user_type'] = tipo
+
+def test_if_none_match_responde_304_sem_executar_a_view(app):
+    cliente = app.test_client()
+    _logar(cliente)
+
+    primeira = cliente.get('/dados')
+    etag = primeira.headers['ETag']
+    segunda = cliente.get('/dados', headers={'If-None-Match': etag})
+
+    assert primeira.status_code == 200
+    assert segunda.status_code == 304
+    assert segunda.headers['ETag'] == etag
+    assert app.chamadas == 1
+
+def test_cabecalhos_de_cache(app):
+    cliente = app.test_client()
+    _logar(cliente)
+
+    completa = cliente.get('/dados')
+    nao_modificada = cliente.get('/dados', headers={'If-None-Match': completa.headers['ETag']})
+
+    for resposta in (completa, nao_modificada):
+        assert 'Cookie' in resposta.headers['Vary']
+        assert 'private' in resposta.headers['Cache-Control']
+        assert 'no-cache' in resposta.headers['Cache-Control']
+
+def test_etag_muda_com_a_tabela_e_com_o_usuario(app):
+    cliente = app.test_client()
+    _logar(cliente)
+    etag = cliente.get('/dados').headers['ETag']
+
+    change_tracking.aplicar_alteracoes([{'table': 'tabela_teste', 'id': 1, 'operation': 'UPDATE'}])
+    depois = cliente.get('/dados', headers={'If-None-Match': etag})
+
+    assert depois.status_code == 200
+    assert depois.headers['ETag'] != etag
+
+    outro = app.test_client()
+    _logar(outro, usuario_id=2, tipo='tecnico')
+    assert outro.get('/dados', headers={'If-None-Match': depois.headers['ETag']}).status_code == 200
+
+def test_sem_login_nao_usa_etag(app):
+    resposta = app.test_client().get('/dados')
+
+    assert resposta.status_code == 200
+    assert 'ETag' not in resposta.headers
+
+def test_resposta_de_erro_sem_etag(app):
+    cliente = app.test_client()
+    _logar(cliente)
+
+    resposta = cliente.get('/negado')
+
+    assert resposta.status_code == 403
+    assert 'ETag' not in resposta.headers
+
+def test_conditional_get_desligado(app, monkeypatch):
+    monkeypatch.setitem(change_tracking.config, 'conditional_get', False)
+    cliente = app.test_client()
+    _logar(cliente)
+    etag = cliente.get('/dados').headers['ETag']
+
+    assert cliente.get('/dados', headers={'If-None-Match': etag}).status_code == 200
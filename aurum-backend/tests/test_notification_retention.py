@@ -0,0 +1,66 @@
+import uuid
+from datetime import timedelta
+
+from src.models.user import db
+from src.models.helpdesk_models import Usuario, Notificacao
+from src.utils.current_user import UsuarioAtual
+from src.utils.notification_retention import notification_retention_manager, TIPO_RESUMO
+from src.utils.notification_store import notification_store
+from src.utils.timezone_utils import get_brazil_time
+
+def _novo_usuario():
+    cadastro = Usuario(nome='Teste retenção', email=f'{uuid.uuid4().hex}@teste.com', telefone='0',
+                       tipo_usuario='tecnico')
+    cadastro.set_password('teste123')
+    db.session.add(cadastro)
+    db.session.commit()
+    return UsuarioAtual(cadastro.id, cadastro.tipo_usuario, None, cadastro.nome, cadastro.email)
+
+def _notificar(usuario, dias, lida=False, tipo='novo_chamado'):
+    db.session.add(Notificacao(titulo='Título', mensagem='Mensagem', tipo=tipo, lida=lida,
+                               usuario_id=usuario.id, data_criacao=get_brazil_time() - timedelta(days=dias)))
+
+def _notificacoes(usuario):
+    return Notificacao.query.filter_by(usuario_id=usuario.id).order_by(Notificacao.data_criacao).all()
+
+def test_nao_lidas_antigas_viram_um_resumo(contexto, monkeypatch):
+    monkeypatch.setitem(notification_retention_manager.config, 'batch_size', 1)
+    usuarios = [_novo_usuario(), _novo_usuario()]
+    for usuario in usuarios:
+        for dias in (400, 300, 200):
+            _notificar(usuario, dias)
+        _notificar(usuario, 10)
+    db.session.commit()
+    for usuario in usuarios:
+        assert notification_store.contador(usuario)[:2] == (4, 4)
+
+    resumidas, resumos = notification_retention_manager.resumir_nao_lidas()
+
+    assert resumidas >= 6 and resumos >= 2
+    for usuario in usuarios:
+        resumo, recente = _notificacoes(usuario)
+        assert resumo.tipo == TIPO_RESUMO and not resumo.lida
+        assert resumo.mensagem.startswith('Você tinha 3 notificações não lidas com mais de 180 dias')
+        # Data da mais recente das resumidas
+        assert abs(resumo.data_criacao - (get_brazil_time() - timedelta(days=200))) < timedelta(minutes=1)
+        assert recente.tipo == 'novo_chamado'
+        # Contador marcado como desatualizado: a próxima leitura reconta
+        assert notification_store.contador(usuario)[:2] == (2, 2)
+
+    # O resumo não é resumido de novo
+    notification_retention_manager.resumir_nao_lidas()
+    assert len(_notificacoes(usuarios[0])) == 2
+
+def test_remove_so_lidas_antigas(contexto):
+    usuario = _novo_usuario()
+    _notificar(usuario, 40, lida=True)
+    _notificar(usuario, 5, lida=True)
+    _notificar(usuario, 40)
+    db.session.commit()
+    assert notification_store.contador(usuario)[:2] == (1, 3)
+
+    assert notification_retention_manager.remover_lidas() >= 1
+
+    restantes = _notificacoes(usuario)
+    assert [(n.lida, (get_brazil_time() - n.data_criacao).days) for n in restantes] == [(False, 40), (True, 5)]
+    assert notification_store.contador(usuario)[:2] == (1, 2)
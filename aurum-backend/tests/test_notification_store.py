@@ -0,0 +1,93 @@
+import uuid
+
+import pytest
+
+from src.models.user import db
+from src.models.helpdesk_models import Usuario, Empresa
+from src.utils.current_user import UsuarioAtual
+from src.utils.notification_store import notification_store
+
+def _novo_usuario(tipo='tecnico', empresa_id=None):
+    cadastro = Usuario(nome=f'Teste {tipo}', email=f'{uuid.uuid4().hex}@teste.com', telefone='0',
+                       tipo_usuario=tipo, empresa_id=empresa_id)
+    cadastro.set_password('teste123')
+    db.session.add(cadastro)
+    db.session.commit()
+    return UsuarioAtual(cadastro.id, tipo, empresa_id, cadastro.nome, cadastro.email)
+
+def _publicar(tipo='novo_chamado', publico='equipe', empresa_id=None):
+    notification_store.publicar('Título', 'Mensagem', tipo, publico=publico, empresa_id=empresa_id)
+    db.session.commit()
+
+def _contagem(usuario):
+    """(não lidas, total) do contador, conferidos com a recontagem"""
+    nao_lidas, total, _ = notification_store.contador(usuario)
+    assert (nao_lidas, total) == notification_store.contar(usuario)
+    return nao_lidas, total
+
+@pytest.fixture(params=['broadcast', 'fanout_escrita'])
+def modo(request, monkeypatch):
+    monkeypatch.setitem(notification_store.config, 'mode', request.param)
+    return request.param
+
+def test_publicar_ajusta_so_os_destinatarios(contexto, modo):
+    empresa_id = Empresa.query.first().id
+    tecnico = _novo_usuario('tecnico')
+    cliente = _novo_usuario('cliente', empresa_id)
+    assert _contagem(tecnico) == (0, 0)
+    assert _contagem(cliente) == (0, 0)
+    versao = notification_store.contador(tecnico)[2]
+
+    _publicar()
+    _publicar(publico='cliente', empresa_id=empresa_id)
+
+    assert _contagem(tecnico) == (1, 1)
+    assert notification_store.contador(tecnico)[2] > versao
+    assert _contagem(cliente) == (1, 1)
+
+def test_marcar_lida_desconta_uma_vez(contexto, modo):
+    tecnico = _novo_usuario('tecnico')
+    _contagem(tecnico)
+    _publicar()
+    _publicar()
+    item = notification_store.listar(tecnico)[0]
+
+    assert notification_store.marcar_lida(tecnico, item.id, item.origem)
+    db.session.commit()
+    assert _contagem(tecnico) == (1, 2)
+
+    # Marcar de novo não desconta outra vez
+    assert notification_store.marcar_lida(tecnico, item.id, item.origem)
+    db.session.commit()
+    assert _contagem(tecnico) == (1, 2)
+
+def test_marcar_lidas_em_lote(contexto, modo):
+    tecnico = _novo_usuario('tecnico')
+    _contagem(tecnico)
+    for tipo in ('novo_chamado', 'novo_chamado', 'chamado_atualizado', 'chamado_atualizado'):
+        _publicar(tipo)
+    itens = notification_store.listar(tecnico)
+
+    selecionada = [(itens[-1].origem, itens[-1].id)]
+    assert notification_store.marcar_lidas(tecnico, selecionada) == 1
+    db.session.commit()
+    assert _contagem(tecnico) == (3, 4)
+
+    assert notification_store.marcar_lidas(tecnico, tipo='chamado_atualizado') == 2
+    db.session.commit()
+    assert _contagem(tecnico) == (1, 4)
+
+    assert notification_store.marcar_lidas(tecnico) == 1
+    db.session.commit()
+    assert _contagem(tecnico) == (0, 4)
+    assert notification_store.marcar_lidas(tecnico) == 0
+
+def test_marcar_de_outro_usuario_nao_altera(contexto):
+    tecnico = _novo_usuario('tecnico')
+    cliente = _novo_usuario('cliente', Empresa.query.first().id)
+    _contagem(tecnico)
+    _publicar()
+    item = notification_store.listar(tecnico)[0]
+
+    assert not notification_store.marcar_lida(cliente, item.id, item.origem)
+    assert _contagem(tecnico) == (1, 1)
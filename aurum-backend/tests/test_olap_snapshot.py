@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.utils.olap_snapshot import truncar_periodo
+
+def test_semana_comeca_na_segunda():
+    # 2024-01-01 é uma segunda-feira; 1969 cobre datas antes da referência
+    inicio = date(1969, 12, 20)
+    dias = [inicio + timedelta(days=i) for i in range(60)] + [date(2024, 1, 1) + timedelta(days=i) for i in range(14)]
+    datas = np.array(dias, dtype='datetime64[s]') + np.timedelta64(15, 'h')
+
+    semanas = truncar_periodo(datas, 'semana')
+
+    for dia, semana in zip(dias, semanas.astype('datetime64[D]').tolist()):
+        assert semana == dia - timedelta(days=dia.weekday())
+        assert semana.weekday() == 0
+
+def test_semana_preserva_nat():
+    datas = np.array(['2024-01-03T10:00', 'NaT'], dtype='datetime64[s]')
+
+    semanas = truncar_periodo(datas, 'semana')
+
+    assert semanas[0] == np.datetime64('2024-01-01')
+    assert np.isnat(semanas[1])
+
+def test_outros_periodos():
+    datas = np.array(['2024-03-17T08:30'], dtype='datetime64[s]')
+
+    assert truncar_periodo(datas, 'dia')[0] == np.datetime64('2024-03-17')
+    assert truncar_periodo(datas, 'mes')[0] == np.datetime64('2024-03')
+    assert truncar_periodo(datas, 'ano')[0] == np.datetime64('2024')
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, Column, Integer, DateTime
+from sqlalchemy.orm import declarative_base, Session
+
+from src.utils.pagination import codificar_cursor, decodificar_cursor, paginar_por_chave
+
+Base = declarative_base()
+
+class Item(Base):
+    __tablename__ = 'itens'
+    id = Column(Integer, primary_key=True)
+    data = Column(DateTime, nullable=False)
+
+def _sessao(datas):
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    sessao = Session(engine)
+    sessao.add_all(Item(id=i + 1, data=data) for i, data in enumerate(datas))
+    sessao.commit()
+    return sessao
+
+def test_cursor_ida_e_volta():
+    data = datetime(2024, 5, 17, 13, 45, 12, 345678)
+
+    cursor = codificar_cursor(data, 1234)
+
+    assert '=' not in cursor
+    assert decodificar_cursor(cursor) == (data, 1234)
+
+def test_cursor_invalido():
+    assert decodificar_cursor(None) is None
+    assert decodificar_cursor('') is None
+    assert decodificar_cursor('nao-e-um-cursor') is None
+    assert decodificar_cursor(codificar_cursor(datetime(2024, 1, 1), 1)[:-3]) is None
+
+def test_paginas_percorrem_tudo_com_empates():
+    base = datetime(2024, 1, 1)
+    # Várias linhas com a mesma data: o id desempata e nenhuma se repete ou se perde
+    datas = [base + timedelta(hours=i // 4) for i in range(23)]
+    sessao = _sessao(datas)
+
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        pagina = paginar_por_chave(sessao.query(Item), Item.data, Item.id, cursor=cursor, por_pagina=5)
+        vistos.extend((item.data, item.id) for item in pagina.itens)
+        paginas += 1
+        if not pagina.tem_mais:
+            assert pagina.proximo_cursor is None
+            break
+        cursor = pagina.proximo_cursor
+
+    esperado = sorted(((item.data, item.id) for item in sessao.query(Item)), reverse=True)
+    assert vistos == esperado
+    assert paginas == 5
+
+def test_ultima_pagina_exata():
+    sessao = _sessao([datetime(2024, 1, 1)] * 4)
+
+    pagina = paginar_por_chave(sessao.query(Item), Item.data, Item.id, por_pagina=4)
+
+    assert [item.id for item in pagina.itens] == [4, 3, 2, 1]
+    assert not pagina.tem_mais and pagina.proximo_cursor is None
@@ -0,0 +1,167 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils import realtime
+from src.utils.message_queue import abrir_fila
+from src.utils.realtime import EventCoalescer, PresenceRegistry, RealtimeNotifier
+
+class SocketIOFalso:
+    """Guarda os emits; a tarefa do fim da janela só roda quando o teste chama esvaziar"""
+
+    def __init__(self):
+        self.emitidos = []
+        self.tarefas = []
+
+    def emit(self, evento, dados, to=None):
+        self.emitidos.append((evento, dados, to))
+
+    def start_background_task(self, alvo):
+        self.tarefas.append(alvo)
+
+    def sleep(self, segundos):
+        pass
+
+def _coalescer(**opcoes):
+    socketio = SocketIOFalso()
+    return EventCoalescer(socketio, **opcoes), socketio
+
+def test_janela_zero_emite_na_hora():
+    coalescer, socketio = _coalescer(janela_ms=0)
+
+    coalescer.emitir('notification', {'id': 1}, to='user:1')
+
+    assert socketio.emitidos == [('notification', {'id': 1}, 'user:1')]
+    assert socketio.tarefas == []
+
+def test_eventos_do_mesmo_destino_viram_um_lote():
+    coalescer, socketio = _coalescer(janela_ms=250, max_itens=2)
+
+    for id in range(3):
+        coalescer.emitir('notification', {'id': id}, to='role:tecnico')
+    coalescer.emitir('ticket_updated', {'id': 9}, to='role:tecnico')
+
+    assert socketio.emitidos == []
+    assert len(socketio.tarefas) == 1  # Uma tarefa por janela
+
+    coalescer.esvaziar()
+
+    assert len(socketio.emitidos) == 1
+    evento, lote, to = socketio.emitidos[0]
+    assert (evento, to) == ('batch', 'role:tecnico')
+    assert lote['count'] == 4
+    assert lote['events'] == {'notification': 3, 'ticket_updated': 1}
+    assert lote['items'] == [{'event': 'notification', 'data': {'id': 2}},
+                             {'event': 'ticket_updated', 'data': {'id': 9}}]
+    assert lote['truncated']
+
+def test_evento_sozinho_segue_sem_lote_e_destinos_separados():
+    coalescer, socketio = _coalescer()
+
+    coalescer.emitir('notification', {'id': 1}, to='user:1')
+    coalescer.emitir('notification', {'id': 2}, to=['empresa:3', 'role:administrador'])
+    coalescer.emitir('notification', {'id': 3}, to=['role:administrador', 'empresa:3'])
+    coalescer.esvaziar()
+
+    assert ('notification', {'id': 1}, 'user:1') in socketio.emitidos
+    lote = [dados for evento, dados, to in socketio.emitidos if to == ['empresa:3', 'role:administrador']]
+    assert len(lote) == 1 and lote[0]['count'] == 2
+
+def test_unread_count_vai_so_o_ultimo_depois_do_lote():
+    coalescer, socketio = _coalescer()
+
+    coalescer.emitir('unread_count', {'count': 1}, to='user:1')
+    coalescer.emitir('notification', {'id': 1}, to='user:1')
+    coalescer.emitir('unread_count', {'count': 2}, to='user:1')
+    coalescer.esvaziar()
+
+    assert socketio.emitidos == [
+        ('notification', {'id': 1}, 'user:1'),
+        ('unread_count', {'count': 2}, 'user:1')
+    ]
+
+def test_nova_janela_depois_de_esvaziar():
+    coalescer, socketio = _coalescer()
+
+    coalescer.emitir('notification', {'id': 1}, to='user:1')
+    coalescer.esvaziar()
+    coalescer.emitir('notification', {'id': 2}, to='user:1')
+
+    assert len(socketio.tarefas) == 2
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def time(self):
+        return self.agora
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(realtime, 'time', relogio)
+    return relogio
+
+def test_tolerancia_apos_desconectar(relogio):
+    presenca = PresenceRegistry(tolerancia_segundos=60, heartbeat_timeout_segundos=90)
+    presenca.conectar(1, 'sid-a')
+    presenca.desconectar(1, 'sid-a')
+
+    relogio.agora += 60
+    assert presenca.online(1)
+    relogio.agora += 1
+    assert not presenca.online(1)
+
+    # Reconectar (troca de página) volta a contar como online
+    presenca.conectar(1, 'sid-b')
+    assert presenca.online(1)
+
+def test_socket_sem_heartbeat_expira(relogio):
+    presenca = PresenceRegistry(tolerancia_segundos=60, heartbeat_timeout_segundos=90)
+    presenca.conectar(1, 'sid-a')
+
+    relogio.agora += 80
+    presenca.heartbeat(1, 'sid-a')
+    relogio.agora += 90
+    assert presenca.online(1)
+    relogio.agora += 1
+    assert not presenca.online(1)
+
+def test_outra_aba_mantem_online(relogio):
+    presenca = PresenceRegistry(tolerancia_segundos=0)
+    presenca.conectar(1, 'sid-a')
+    presenca.conectar(1, 'sid-b')
+    presenca.desconectar(1, 'sid-a')
+
+    relogio.agora += 30
+    online, offline = presenca.separar([SimpleNamespace(id=1), SimpleNamespace(id=2)])
+
+    assert [usuario.id for usuario in online] == [1]
+    assert [usuario.id for usuario in offline] == [2]
+    assert presenca.estatisticas() == {'online': 1, 'sockets': 1, 'tracked': 1}
+
+def test_presenca_compartilhada_pela_fila(relogio):
+    fila = abrir_fila('local://teste-presenca', uuid.uuid4().hex)
+    worker_a, worker_b = PresenceRegistry(tolerancia_segundos=60), PresenceRegistry(tolerancia_segundos=60)
+    worker_a.compartilhar(fila)
+    worker_b.compartilhar(fila)
+
+    worker_a.conectar(1, 'sid-a')
+    assert worker_b.online(1)
+    assert worker_a.estatisticas()['sockets'] == 1
+
+    worker_a.desconectar(1, 'sid-a')
+    relogio.agora += 61
+    assert not worker_b.online(1)
+
+def test_fila_sem_presenca_envia_email_para_todos():
+    notifier = RealtimeNotifier()
+    notifier.socketio = SocketIOFalso()
+    usuarios = [SimpleNamespace(id=1)]
+    notifier.presenca.conectar(1, 'sid-a')
+
+    assert notifier.destinatarios_email(usuarios) == []
+
+    notifier._compartilhar_presenca('amqp://fila')
+    assert notifier.destinatarios_email(usuarios) == usuarios
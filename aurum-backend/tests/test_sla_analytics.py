@@ -0,0 +1,57 @@
+import numpy as np
+
+from src.utils.sla_analytics import percentis_por_grupo, SLAAnalytics
+
+def test_percentis_iguais_ao_np_percentile():
+    rng = np.random.default_rng(42)
+    codigos = rng.integers(0, 7, size=2000)
+    valores = rng.exponential(24.0, size=2000)
+    valores[rng.random(2000) < 0.1] = np.nan
+    percentis = (50, 90, 99)
+
+    grupos, quantidades, medias, resultado = percentis_por_grupo(codigos, valores, percentis)
+
+    for i, grupo in enumerate(grupos.tolist()):
+        do_grupo = valores[(codigos == grupo) & ~np.isnan(valores)]
+        assert quantidades[i] == len(do_grupo)
+        assert np.isclose(medias[i], do_grupo.mean())
+        for p in percentis:
+            assert np.isclose(resultado[p][i], np.percentile(do_grupo, p))
+
+def test_percentis_grupo_com_um_valor_e_sem_valores():
+    codigos = np.array([0, 1, 1, 2])
+    valores = np.array([5.0, np.nan, np.nan, 3.0])
+
+    grupos, quantidades, _, resultado = percentis_por_grupo(codigos, valores, (50, 99))
+
+    # Grupo 1 só tem NaN e fica de fora
+    assert grupos.tolist() == [0, 2]
+    assert quantidades.tolist() == [1, 1]
+    assert resultado[99].tolist() == [5.0, 3.0]
+
+    grupos, _, _, resultado = percentis_por_grupo(codigos, np.full(4, np.nan), (50,))
+    assert len(grupos) == 0 and len(resultado[50]) == 0
+
+def test_metas_por_prioridade_codificada():
+    analytics = SLAAnalytics()
+    criacao = np.array(['2024-01-01T00:00'] * 4, dtype='datetime64[s]')
+    colunas = {
+        'empresa_id': np.array([1, 1, 2, 0]),
+        'tecnico_id': np.zeros(4, dtype=np.int64),
+        'servico_id': np.zeros(4, dtype=np.int64),
+        'prioridade': np.array(['alta', 'baixa', 'alta', ''], dtype=object),
+        'data_criacao': criacao,
+        # alta: 4h (no prazo) e 10h (fora); baixa: 80h (fora); sem prioridade: sem meta
+        'data_finalizacao': criacao + np.array([4, 80, 10, 1], dtype='timedelta64[h]'),
+        'primeira_resposta': np.array(['NaT'] * 4, dtype='datetime64[s]')
+    }
+
+    analytics._nomes = lambda dimensao, chaves: {}
+    resultado = analytics._calcular(colunas)
+
+    por_prioridade = {grupo['id']: grupo for grupo in resultado['por_prioridade']}
+    assert por_prioridade['alta']['dentro_meta_pct'] == 50.0
+    assert por_prioridade['baixa']['dentro_meta_pct'] == 0.0
+    assert por_prioridade['']['dentro_meta_pct'] is None
+    assert resultado['geral']['dentro_meta_pct'] == round(1 / 3 * 100, 1)
+    assert resultado['geral']['resolucao']['p50_horas'] == 7.0